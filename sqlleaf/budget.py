@@ -0,0 +1,113 @@
+import contextvars
+import logging
+import time
+import tracemalloc
+import typing as t
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from sqlleaf import exception
+
+logger = logging.getLogger("sqlleaf")
+
+"""
+Limits the CPU time and memory that processing a single statement may use.
+"""
+
+# The limit on the statement being processed in the current thread, if any (see Budget.limit())
+_active: contextvars.ContextVar[t.Optional["_Limit"]] = contextvars.ContextVar("sqlleaf_budget", default=None)
+
+
+@dataclass(frozen=True)
+class QuarantinedStatement:
+    statement_index: str  # e.g. 1/5 for the 6th statement of the 2nd file
+    stage: str  # The stage the statement was in when it exceeded its budget, e.g. "transform"
+    reason: str  # The budget that was exceeded: "time" or "memory"
+    elapsed: float  # The CPU time in seconds spent on the statement before it was aborted
+
+
+class Budget:
+    """
+    The CPU time (in seconds) and the memory (in bytes allocated at once) that processing a statement may use.
+
+    A statement is only aborted at a checkpoint (see checkpoint()), e.g. between stages or optimizer rules, so
+    that it never leaves the object mapping or the shape cache half-updated. A statement is therefore found to
+    have exceeded its budget at the first checkpoint after it did. Memory is measured with tracemalloc, which
+    slows processing down while it's enabled (see tracing()).
+    """
+
+    def __init__(self, time: t.Optional[float] = None, memory: t.Optional[int] = None):
+        self.time = time
+        self.memory = memory
+        self.stage = ""  # The current stage of the statement being processed, set by the caller
+
+    @property
+    def enabled(self) -> bool:
+        return self.time is not None or self.memory is not None
+
+    @contextmanager
+    def tracing(self) -> t.Generator[None]:
+        """
+        Trace memory allocations while a batch of statements is processed, if there's a memory budget.
+        """
+        started = self.memory is not None and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            if started:
+                tracemalloc.stop()
+
+    @contextmanager
+    def limit(self) -> t.Generator[None]:
+        """
+        Limit the code within the block to the budget. It raises SqlLeafBudgetException from the first checkpoint
+        it reaches after exceeding the budget.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        with self.tracing():
+            limit = _Limit(self)
+            token = _active.set(limit)
+            try:
+                yield
+            finally:
+                _active.reset(token)
+
+
+class _Limit:
+    """
+    The CPU time and memory that the statement being processed has used.
+    """
+
+    def __init__(self, budget: Budget):
+        self.budget = budget
+        self.start = time.process_time()
+        self.baseline = 0
+        if budget.memory is not None:
+            tracemalloc.reset_peak()
+            self.baseline = tracemalloc.get_traced_memory()[0]
+
+    def check(self):
+        budget = self.budget
+        elapsed = time.process_time() - self.start
+        if budget.time is not None and elapsed > budget.time:
+            message = f"Statement exceeded its time budget of {budget.time}s"
+            raise exception.SqlLeafBudgetException(message, reason="time", stage=budget.stage, elapsed=elapsed)
+        if budget.memory is not None and tracemalloc.get_traced_memory()[1] - self.baseline > budget.memory:
+            message = f"Statement exceeded its memory budget of {budget.memory} bytes"
+            raise exception.SqlLeafBudgetException(message, reason="memory", stage=budget.stage, elapsed=elapsed)
+
+
+def checkpoint():
+    """
+    Raise SqlLeafBudgetException if the statement being processed has exceeded its budget.
+
+    Only called where aborting leaves no shared state half-updated.
+    """
+    limit = _active.get()
+    if limit is not None:
+        limit.check()
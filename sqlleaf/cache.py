@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import typing as t
+
+import sqlglot
+
+logger = logging.getLogger("sqlleaf")
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024  # 512MB
+
+"""
+Stores parsed statements on disk so that unchanged statements aren't parsed again.
+"""
+
+
+class ParseCache:
+    """
+    A directory of parsed statements, keyed by the statement's fingerprint.
+
+    Keys include the dialect and the versions of sqlglot and sqlleaf, so entries written
+    by other versions are never read. The directory can be shared by concurrent processes:
+    entries are written to a temporary file and then renamed into place, so a reader sees
+    either a complete entry or none at all.
+
+    When the directory grows beyond `max_size` bytes, the least recently used entries are removed.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.size: t.Optional[int] = None  # The estimated size of the directory, once it's been scanned
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, dialect: str, fingerprint: str) -> str:
+        """
+        Create the key for a statement's fingerprint.
+        """
+        from sqlleaf import __version__
+
+        text = "\0".join([dialect or "", sqlglot.__version__, __version__, fingerprint])
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, key: str) -> t.Optional[t.Any]:
+        """
+        Get an entry, or None if it doesn't exist. Reading an entry marks it as recently used.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            # Treat a corrupt or unreadable entry as missing, so it will be rewritten
+            logger.debug(f"Ignoring unreadable cache entry: {path}: {e}")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: t.Any):
+        """
+        Store an entry, replacing any existing entry with the same key.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                written = f.tell()
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        if self.size is None:
+            self.size = self._scan_size()
+        else:
+            self.size += written
+
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the directory is below 90% of its maximum size.
+        Other processes may remove the same entries at the same time, which is harmless.
+        """
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(e[1] for e in entries)
+        target = self.max_size * 0.9
+        removed = 0
+
+        for _, entry_size, path in sorted(entries):
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+        logger.debug(f"Evicted {removed} entries from the parse cache")
+        self.size = size
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        for path in self._entry_paths():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.size = 0
+
+    def stats(self) -> t.Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".pickle")
+
+    def _entry_paths(self) -> t.Generator[str]:
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".pickle"):
+                    yield os.path.join(root, name)
+
+    def _scan_size(self) -> int:
+        size = 0
+        for path in self._entry_paths():
+            try:
+                size += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return size
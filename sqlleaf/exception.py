@@ -38,3 +38,18 @@ class SqlLeafStoredProcedureException(Exception):
                 self.stored_procedure_name,
             )
         return "%s" % (self.message,)
+
+
+class SqlLeafBudgetException(Exception):
+    def __init__(self, message, reason="", stage="", elapsed=0.0):
+        super().__init__(message)
+
+        self.message = message
+        self.reason = reason  # The budget that was exceeded: "time" or "memory"
+        self.stage = stage
+        self.elapsed = elapsed  # The CPU time in seconds spent before the budget was exceeded
+
+    def __str__(self):
+        if self.stage:
+            return "%s (Stage=%s)" % (self.message, self.stage)
+        return "%s" % (self.message,)
@@ -1,13 +1,19 @@
+import bisect
+import contextlib
+import itertools
 import logging
 import json
 import typing as t
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import networkx as nx
+from sqlglot import exp
 
-from sqlleaf import mappings, util, path, types
+from sqlleaf import budget, cache, exception, mappings, util, path, types
 from sqlleaf.objects.query_types import Query, InsertQuery, UpdateQuery, ViewQuery, CopyQuery, PutQuery, CTASQuery, ProcedureQuery, TableQuery
 from sqlleaf.objects.node_types import EdgeAttributes, NodeAttributes, GraphAttributes
 from sqlleaf.path import LineagePath
-from sqlleaf.processors import collector, transformer, generator
+from sqlleaf.processors import catalog, collector, dbt, transformer, generator, pgdump, querylog, reader, shapes, splitter, targeting
 
 logger = logging.getLogger("sqlleaf")
 
@@ -19,59 +25,509 @@ class Lineage:
     Holds the lineage as a networkx graph.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache_dir: t.Optional[str] = None,
+        cache_max_size: int = cache.DEFAULT_MAX_SIZE,
+        prefilter: bool = False,
+        reuse_shapes: bool = False,
+        lazy_bodies: bool = False,
+        statement_time_budget: t.Optional[float] = None,
+        statement_memory_budget: t.Optional[int] = None,
+        count_sql_calls: bool = False,
+    ):
+        """
+        If a cache directory is given, parsed statements are stored there and reused by later runs.
+
+        If `prefilter` is set, statements that can't contribute to lineage (e.g. GRANT, SET, VACUUM, COMMIT,
+        or a SELECT without INTO) are recognised from their leading keywords and aren't parsed. They are
+        counted by category in `skipped`, and have no queries.
+
+        If `reuse_shapes` is set, statements that differ from an earlier statement only in their literals
+        have their lineage copied from it, rather than being transformed and generated (see shapes.ShapeCache).
+        They are counted in stats["reused_shapes"].
+
+        If `lazy_bodies` is set, the statements inside procedures and functions are only parsed and have their
+        lineage generated when expand_all() is called, rather than along with the procedure or function.
+
+        If a statement takes more CPU time (in seconds) or allocates more memory (in bytes) than its budget
+        while its lineage is generated, it's aborted and added to `quarantine`, and the remaining statements
+        are processed as usual (see budget.Budget).
+
+        If `count_sql_calls` is set, the calls to Expression.sql() made while lineage is generated are counted
+        in stats["sql_calls"]. This is a diagnostic: it patches Expression.sql() for the whole process while
+        lineage is generated, so calls made by other threads at the same time are counted too.
+        """
         self.graph = new_graph()  # The graph that contains all lineage
         self.subgraphs: t.List[nx.MultiDiGraph] = []  # The subgraphs that make up the main graph
         self.paths: t.Dict[str, t.List[LineagePath]] = {}  # The paths throughout the graph
+        self.sources: t.List[str] = []  # The files that statements were read from, in order
         self.object_mapping = None
-
-    def generate(self, sql: str, dialect: str):
+        self.mapping_views: t.Dict[str, mappings.ObjectMapping] = {}  # The views of the object mapping for other dialects, by dialect
+        self.parse_cache = cache.ParseCache(cache_dir, max_size=cache_max_size) if cache_dir else None
+        self.stats: t.Counter[str] = Counter()  # e.g. the number of statements whose lineage was reused ("reused_shapes")
+        self.prefilter = prefilter
+        self.skipped: t.Counter[str] = Counter()  # The number of statements skipped by the prefilter, by category (e.g. "grant")
+        self.shape_cache = shapes.ShapeCache() if reuse_shapes else None
+        self.lazy_bodies = lazy_bodies
+        self.budget = budget.Budget(time=statement_time_budget, memory=statement_memory_budget)
+        self.quarantine: t.List[budget.QuarantinedStatement] = []  # The statements that exceeded their budget
+        self.count_sql_calls = count_sql_calls
+
+    def generate(
+        self,
+        sql: str,
+        dialect: str,
+        workers: t.Optional[int] = None,
+        resolve_dependencies: bool = False,
+        targets: t.Optional[t.Iterable[str]] = None,
+        direction: str = "upstream",
+    ):
         """
         Generate lineage for one or more SQL statements.
+
+        If `workers` is greater than 1, the statements are parsed in that many processes.
+        The results are identical to parsing them serially.
+
+        Statements must appear in the order in which they depend on each other, unless `resolve_dependencies`
+        is set. In that case they are processed in an order where every table, view, sequence, stage and
+        function is created before the statements that use it. Statement indexes are unaffected.
+
+        If target tables are given (e.g. ["fruit.processed"]), lineage is only generated for the queries that
+        write into them and into the tables they're derived from ("upstream") or that are derived from them
+        ("downstream"), as found from the tables each query reads and writes (see targeting.select_queries()).
+        Every statement is still collected, so that all tables and views are known, and the remaining
+        queries are counted in stats["untargeted_queries"].
+        """
+        object_mapping = self.init_mapping(dialect=dialect)
+
+        with self._counting_sql_calls():
+            parent_queries = collector.collect_queries(
+                sql,
+                dialect,
+                object_mapping,
+                workers=workers,
+                parse_cache=self.parse_cache,
+                resolve_dependencies=resolve_dependencies,
+                skipped=self._skipped(),
+                expand_bodies=not self.lazy_bodies,
+            )
+
+            selected = None
+            if targets is not None:
+                queries = [q for parent_query in parent_queries for q in parent_query.get_all_queries() if query_has_lineage(q)]
+                selected = targeting.select_queries(queries, targets, direction)
+                self.stats["untargeted_queries"] += len(queries) - len(selected)
+
+            self.generate_for_queries(parent_queries, selected=selected)
+
+    def generate_batch(self, batch: t.Iterable[t.Tuple[str, str]], workers: t.Optional[int] = None, resolve_dependencies: bool = False):
+        """
+        Generate lineage for SQL in several dialects, given as (sql, dialect) pairs, e.g. [(ddl, "snowflake"), (dml, "postgres")].
+
+        The items are processed in order, as if generate() were called for each of them. Every dialect sees the same
+        tables, views and other objects, whichever dialect created them (see get_mapping()), and the setup for each
+        dialect is only done once.
+
+        If `workers` is greater than 1, the statements of every item are parsed in one pool of that many processes.
+        """
+        with contextlib.ExitStack() as stack:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers)) if workers is not None and workers > 1 else None
+
+            for sql, dialect in batch:
+                object_mapping = self.get_mapping(dialect)
+
+                with self._counting_sql_calls():
+                    parent_queries = collector.collect_queries(
+                        sql,
+                        dialect,
+                        object_mapping,
+                        workers=workers,
+                        executor=executor,
+                        parse_cache=self.parse_cache,
+                        resolve_dependencies=resolve_dependencies,
+                        skipped=self._skipped(),
+                        expand_bodies=not self.lazy_bodies,
+                    )
+                    self.generate_for_queries(parent_queries)
+
+    def generate_from_files(self, paths: reader.PathsType, dialect: str, resolve_dependencies: bool = False):
+        """
+        Generate lineage for the SQL statements in one or more files.
+
+        Paths may be files, directories or glob patterns (e.g. "migrations/**/*.sql").
+        Gzipped files (.sql.gz) are decompressed transparently.
+
+        The files are read and processed one statement at a time, so memory use is bounded
+        by the largest statement rather than by the size of all the files. As with generate(),
+        statements must appear in the order in which they depend on each other across all files.
+
+        If `resolve_dependencies` is set, the files may be in any order: all of them are read first,
+        and their statements are processed in dependency order (see generate()).
+        """
+        paths = reader.expand_paths(paths)
+
+        if not resolve_dependencies:
+            for path in paths:
+                logger.info(f"Reading statements from file: {path}")
+                self.sources.append(path)
+
+                with reader.open_sql_file(path) as f:
+                    self.generate_from_stream(f, dialect=dialect, source_index=len(self.sources) - 1)
+            return
+
+        object_mapping = self.init_mapping(dialect=dialect)
+        texts = []
+        for path in paths:
+            logger.info(f"Reading statements from file: {path}")
+            with reader.open_sql_file(path) as f:
+                texts.append(f.read())
+
+        # Queries are indexed by their file's position in self.sources
+        first_source = len(self.sources)
+        self.sources.extend(paths)
+
+        with self._counting_sql_calls():
+            parent_queries = collector.collect_sources(
+                texts,
+                dialect,
+                object_mapping,
+                parse_cache=self.parse_cache,
+                skipped=self._skipped(),
+                expand_bodies=not self.lazy_bodies,
+            )
+            for parent_query in parent_queries:
+                parent_query.source_index += first_source
+            self.generate_for_queries(parent_queries)
+
+    def generate_from_stream(self, stream: t.Iterable[str], dialect: str, source_index: t.Optional[int] = None):
+        """
+        Generate lineage for the SQL statements read from a file object, or any iterable of text.
+
+        Each statement is collected and has its lineage generated before the next statement is read.
+        If a source index is given, it prefixes the statement indexes (e.g. 2/5 is the 6th statement of the 3rd source).
         """
-        self.init_mapping(dialect=dialect)
+        self._generate_from_statements(splitter.split_statements(stream, dialect), dialect, source_index, self._skipped())
 
-        parent_queries = collector.collect_queries(sql, dialect, self.object_mapping)
+    def generate_from_pg_dump(self, path: str, dialect: str = "postgres"):
+        """
+        Generate lineage for a plain-text dump created by pg_dump, including dumps with data.
+
+        The file is memory-mapped and processed one statement at a time, as with generate_from_files().
+        Data is skipped without being parsed: both the data following COPY ... FROM stdin, and all but the
+        first of each run of INSERTs into the same table and columns (pg_dump --inserts), whose lineage is
+        the same. Statements without lineage (e.g. SET, ALTER ... OWNER TO, GRANT) are always prefiltered.
+        Skipped statements, and the number of rows of COPY data, are counted in `skipped`.
+        """
+        logger.info(f"Reading statements from pg_dump file: {path}")
+        self.sources.append(path)
 
-        for parent_query in parent_queries:
-            graph = new_graph()
-            queries = parent_query.get_all_queries()
+        statements = pgdump.split_dump(path, self.skipped)
+        self._generate_from_statements(statements, dialect, len(self.sources) - 1, self.skipped)
 
-            for query in queries:
-                # Transform every query, but only produce lineage for certain ones
-                if query_has_lineage(query):
-                    transformer.transform_query(query, self.object_mapping)
-                    generator.generate_column_lineage_for_query(query, graph, self.object_mapping)
-                query.set_to_original()
+    def generate_from_query_log(self, path: str, dialect: str, text_column: str = "query_text", count_column: t.Optional[str] = None):
+        """
+        Generate lineage for the queries in a query history, exported as CSV or JSON Lines (see querylog.read_query_log()).
 
-            graph.graph["attrs"].add_query(parent_query)
+        Query logs repeat the same queries many times with different literals. Each distinct template
+        (see querylog.template_fingerprint()) is only processed the first time it appears. Later rows with
+        the same template add to its execution count, which is available from each query and edge as
+        `execution_count`. Each row is counted as one execution, unless `count_column` is given.
+
+        Queries are indexed by their row within the log.
+        """
+        logger.info(f"Reading queries from query log: {path}")
+        object_mapping = self.init_mapping(dialect=dialect)
+        self.sources.append(path)
+        source_index = len(self.sources) - 1
+        templates: t.Dict[str, t.List[Query]] = {}
+
+        with self._counting_sql_calls():
+            for logged in querylog.read_query_log(path, text_column=text_column, count_column=count_column):
+                template = querylog.template_fingerprint(logged.text, dialect)
+                if template in templates:
+                    for parent_query in templates[template]:
+                        parent_query.execution_count += logged.count
+                    continue
+
+                parent_queries = collector.collect_queries(
+                    logged.text,
+                    dialect,
+                    object_mapping,
+                    statement_index=logged.index,
+                    parse_cache=self.parse_cache,
+                    skipped=self._skipped(),
+                    expand_bodies=not self.lazy_bodies,
+                )
+                for parent_query in parent_queries:
+                    parent_query.source_index = source_index
+                    parent_query.execution_count = logged.count
+
+                templates[template] = parent_queries
+                self.generate_for_queries(parent_queries)
+
+        logger.debug(f"Found {len(templates)} query templates")
+
+    def load_catalog(self, path: str, dialect: str, include_catalog: bool = False):
+        """
+        Register the tables of a catalog export, such as information_schema.columns saved as CSV or JSON Lines
+        (see catalog.read_catalog()), so that statements can use them without their CREATE TABLE statements.
+
+        No DDL is parsed: each table is registered directly with its columns, data types and defaults.
+        Catalog names are omitted unless `include_catalog` is set (see catalog.load_catalog()).
+        The tables have no lineage and aren't included in get_queries().
+        """
+        logger.info(f"Loading tables from catalog export: {path}")
+        object_mapping = self.init_mapping(dialect=dialect)
+
+        count = catalog.load_catalog(catalog.read_catalog(path), object_mapping, dialect, include_catalog=include_catalog)
+        self.stats["catalog_tables"] += count
+
+    def generate_from_dbt_manifest(self, path: str, dialect: t.Optional[str] = None, workers: t.Optional[int] = None):
+        """
+        Generate lineage for the models of a compiled dbt project, from its manifest (e.g. target/manifest.json).
+
+        Each model becomes a CREATE VIEW/TABLE ... AS statement for its relation, and models are processed in
+        dependency order (see dbt.read_manifest()). Sources and seeds are created from their documented columns,
+        unless they're already known (e.g. from an earlier call to generate()). The dialect defaults to the
+        project's adapter. If `workers` is greater than 1, the models are parsed in that many processes.
+
+        If the Lineage has a cache directory, the lineage of each model is stored there, and later runs reuse it
+        as long as the model's checksum and compiled SQL and the columns of the relations it selects from are
+        unchanged (see dbt.lineage_key()). Models are still collected, so that their columns are known to the
+        models that depend on them. Reused models are counted in stats["reused_models"].
+
+        Statements are indexed by their position in dependency order.
+        """
+        logger.info(f"Reading models from dbt manifest: {path}")
+        manifest = dbt.read_manifest(path)
+        dialect = dialect or manifest.dialect
+        if not dialect:
+            raise exception.SqlLeafException(message=f"The dbt manifest has no adapter type, so a dialect must be given: {path}")
+
+        object_mapping = self.init_mapping(dialect=dialect)
+        self.sources.append(path)
+        source_index = len(self.sources) - 1
+
+        nodes = [
+            node
+            for node in manifest.nodes
+            if node.resource_type not in dbt.DOCUMENTED_NODE_TYPES
+            or not object_mapping.find_query(kind="table", table=exp.to_table(node.relation, dialect=dialect), raise_on_missing=False)
+        ]
+
+        # Statements are separated by newlines too, in case they end with a line comment
+        separator = "\n;\n"
+        starts = list(itertools.accumulate((len(node.sql) + len(separator) for node in nodes[:-1]), initial=0))
+
+        with self._counting_sql_calls(), self.budget.tracing():
+            parent_queries = collector.collect_queries(
+                separator.join(node.sql for node in nodes),
+                dialect,
+                object_mapping,
+                workers=workers,
+                parse_cache=self.parse_cache,
+                expand_bodies=not self.lazy_bodies,
+            )
+
+            # Each model's query is found from its offset, as a model's SQL may contain empty statements (e.g. '; -- note')
+            node_queries: t.List[t.List[Query]] = [[] for _ in nodes]
+            for parent_query in parent_queries:
+                node_queries[bisect.bisect_right(starts, parent_query.get_span()[0]) - 1].append(parent_query)
+
+            for node, queries in zip(nodes, node_queries):
+                if len(queries) != 1:
+                    message = f"The SQL of dbt node '{node.unique_id}' must contain exactly one statement, but it contains {len(queries)}"
+                    raise exception.SqlLeafException(message=message)
+
+            for i, (node, (parent_query,)) in enumerate(zip(nodes, node_queries)):
+                parent_query.source_index = source_index
+                parent_query.statement_index = i
+                key = None
+                if self.parse_cache and node.resource_type in dbt.COMPILED_NODE_TYPES:
+                    key = self.parse_cache.key(dialect, dbt.lineage_key(node, manifest, object_mapping))
+                stored = self.parse_cache.get(key) if key else None
+
+                graph = new_graph()
+                if stored and dbt.instantiate_lineage(stored, parent_query, graph):
+                    self.stats["reused_models"] += 1
+                else:
+                    graph = self.generate_for_query(parent_query)
+                    if graph is None:
+                        continue
+                    if key:
+                        self.parse_cache.put(key, dbt.record_lineage(parent_query, graph))
+
+                self.add_query_graph(parent_query, graph)
+
+    def _generate_from_statements(
+        self,
+        statements: t.Iterable[splitter.RawStatement],
+        dialect: str,
+        source_index: t.Optional[int],
+        skipped: t.Optional[t.Counter[str]],
+    ):
+        object_mapping = self.init_mapping(dialect=dialect)
+        seen = set()
+
+        with self._counting_sql_calls():
+            for statement in statements:
+                parent_queries = collector.collect_queries(
+                    statement.text,
+                    dialect,
+                    object_mapping,
+                    statement_index=statement.index,
+                    seen=seen,
+                    parse_cache=self.parse_cache,
+                    offset=statement.start,
+                    skipped=skipped,
+                    expand_bodies=not self.lazy_bodies,
+                )
+                for parent_query in parent_queries:
+                    parent_query.source_index = source_index
+
+                self.generate_for_queries(parent_queries)
+
+    def generate_for_queries(self, parent_queries: t.List[Query], selected: t.Optional[t.List[Query]] = None):
+        """
+        Generate lineage for a list of collected queries and merge it into the main graph.
+
+        If a list of selected queries is given, the other queries are added to the graph without lineage.
+        """
+        selected_ids = {id(query) for query in selected} if selected is not None else None
+
+        with self.budget.tracing():
+            for parent_query in parent_queries:
+                graph = self.generate_for_query(parent_query, selected_ids)
+                if graph is not None:
+                    self.add_query_graph(parent_query, graph)
+
+    def generate_for_query(self, parent_query: Query, selected_ids: t.Optional[t.Set[int]] = None) -> t.Optional[nx.MultiDiGraph]:
+        """
+        Generate the lineage of a collected query and its child queries, without merging it into the main graph.
+        Return None if the query exceeded its budget and was quarantined.
+        """
+        graph = new_graph()
+
+        self.budget.stage = "transform"
+        try:
+            with self.budget.limit():
+                # A reused shape would include the lineage of every query of the statement
+                object_mapping = self.get_mapping(parent_query.dialect)
+                if self.shape_cache and selected_ids is None and self.shape_cache.instantiate(parent_query, graph, object_mapping):
+                    self.stats["reused_shapes"] += 1
+                else:
+                    self._generate_lineage(parent_query.get_all_queries(), graph, selected_ids)
+                    if self.shape_cache and selected_ids is None:
+                        self.shape_cache.record(parent_query, graph, object_mapping)
+        except exception.SqlLeafBudgetException as e:
+            self._quarantine(parent_query, e)
+            return None
+
+        return graph
+
+    def add_query_graph(self, parent_query: Query, graph: nx.MultiDiGraph):
+        """
+        Merge the lineage of a query into the main graph.
+        """
+        graph.graph["attrs"].add_query(parent_query)
+
+        # Associate the query with the graph even if it has no lineage
+        self.merge_graph(graph)
+        self.graph.graph["attrs"].add_query(parent_query)
+        types.update_column_data_types(self.graph)
+
+    def expand_all(self, tables: t.Optional[t.Iterable[str]] = None):
+        """
+        Collect the statements inside procedures and functions whose bodies haven't been expanded yet
+        (see `lazy_bodies`), and merge their lineage into the main graph.
+
+        If tables are given (e.g. ["fruit.processed"]), only the bodies that mention one of them are expanded.
+        Names are compared as for `targets` in generate(), so "processed" matches a table of any schema with that name.
+        """
+        tables = list(tables) if tables is not None else None
+        expanded = 0
+
+        with self._counting_sql_calls(), self.budget.tracing():
+            for parent_query in self.get_queries():
+                for query in parent_query.get_all_queries():
+                    if not query.has_unexpanded_body():
+                        continue
+                    if tables is not None:
+                        names = {name for s in query.body_statements for name in targeting.find_table_names(s.text, query.dialect)}
+                        if not targeting.mentions_tables(names, tables):
+                            continue
+
+                    body_queries = collector.expand_body(query, self.get_mapping(query.dialect), parse_cache=self.parse_cache)
+                    expanded += 1
+                    graph = new_graph()
+
+                    self.budget.stage = "transform"
+                    try:
+                        with self.budget.limit():
+                            self._generate_lineage([q for body_query in body_queries for q in body_query.get_all_queries()], graph)
+                    except exception.SqlLeafBudgetException as e:
+                        self._quarantine(query, e)
+                        continue
+
+                    self.merge_graph(graph)
 
-            # Associate the query with the graph even if it has no lineage
-            self.merge_graph(graph)
-            self.graph.graph["attrs"].add_query(parent_query)
             types.update_column_data_types(self.graph)
 
+        logger.debug(f"Expanded the bodies of {expanded} procedures and functions")
+
+    def _generate_lineage(self, queries: t.List[Query], graph: nx.MultiDiGraph, selected_ids: t.Optional[t.Set[int]] = None):
+        for query in queries:
+            # Transform every query, but only produce lineage for certain ones
+            if query_has_lineage(query) and (selected_ids is None or id(query) in selected_ids):
+                object_mapping = self.get_mapping(query.dialect)
+                self.budget.stage = "transform"
+                budget.checkpoint()
+                transformer.transform_query(query, object_mapping)
+                budget.checkpoint()
+                self.budget.stage = "generate"
+                generator.generate_column_lineage_for_query(query, graph, object_mapping)
+                budget.checkpoint()
+            query.set_to_original()
+
+    def _quarantine(self, parent_query: Query, e: exception.SqlLeafBudgetException):
+        """
+        Record a statement that exceeded its budget. Its partial lineage is discarded.
+        """
+        for query in parent_query.get_all_queries():
+            query.set_to_original()
+
+        statement = budget.QuarantinedStatement(
+            statement_index=parent_query.get_statement_index(),
+            stage=e.stage,
+            reason=e.reason,
+            elapsed=e.elapsed,
+        )
+        logger.warning(f"Quarantined statement {statement.statement_index} after {statement.elapsed:.2f}s in stage '{statement.stage}': {e}")
+        self.quarantine.append(statement)
+
     def merge_graph(self, subgraph: nx.MultiDiGraph):
         """
         Merge the subgraph into the main graph, and also track the individual subgraphs.
         """
         self.subgraphs.append(subgraph)
+        existing_nodes = {}
 
         for n, data in subgraph.nodes(data=True):
             if self.graph.has_node(n):
-                old_node_attrs = self.graph.nodes[n]["attrs"]
-
-                # The incoming graph's edges must have their NodeAttributes updated to match the existing graph's NodeAttributes.
-                # This is because different graphs with identical Nodes will have different NodeAttributes Python objects.
-                for par, chi, edge_data in subgraph.edges(data=True):
-                    # Overwrite the new edge's Node to be the old Node
-                    if edge_data["attrs"].parent.full_name == n:
-                        edge_data["attrs"].parent = old_node_attrs
-                    if edge_data["attrs"].child.full_name == n:
-                        edge_data["attrs"].child = old_node_attrs
+                existing_nodes[n] = self.graph.nodes[n]["attrs"]
             else:
                 self.graph.add_node(n, **data)
 
+        if existing_nodes:
+            # The incoming graph's edges must have their NodeAttributes updated to match the existing graph's NodeAttributes.
+            # This is because different graphs with identical Nodes will have different NodeAttributes Python objects.
+            for par, chi, edge_data in subgraph.edges(data=True):
+                # Overwrite the new edge's Node to be the old Node
+                edge_attrs = edge_data["attrs"]
+                edge_attrs.parent = existing_nodes.get(edge_attrs.parent.full_name, edge_attrs.parent)
+                edge_attrs.child = existing_nodes.get(edge_attrs.child.full_name, edge_attrs.child)
+
         self.graph.add_edges_from(subgraph.edges(data=True))
 
     def get_edges(self) -> t.List[EdgeAttributes]:
@@ -214,10 +670,32 @@ class Lineage:
                 else:
                     print("\n")
 
-    def init_mapping(self, dialect: str):
+    def _counting_sql_calls(self) -> t.ContextManager:
+        return util.count_sql_calls(self.stats) if self.count_sql_calls else contextlib.nullcontext()
+
+    def _skipped(self) -> t.Optional[t.Counter[str]]:
+        return self.skipped if self.prefilter else None
+
+    def init_mapping(self, dialect: str) -> mappings.ObjectMapping:
+        return self.get_mapping(dialect)
+
+    def get_mapping(self, dialect: str) -> mappings.ObjectMapping:
+        """
+        Get the object mapping for the statements of a dialect.
+
+        The mapping is created for the first dialect that's used. Other dialects share its objects through a view
+        of it (see ObjectMapping.view()), which is only created once for each dialect.
+        """
         if not self.object_mapping:
             self.object_mapping = mappings.ObjectMapping(dialect=dialect)
-            return
+
+        if dialect == self.object_mapping.dialect_name:
+            return self.object_mapping
+
+        view = self.mapping_views.get(dialect)
+        if view is None or view.base is not self.object_mapping:
+            view = self.mapping_views[dialect] = self.object_mapping.view(dialect)
+        return view
 
 
 def new_graph() -> nx.MultiDiGraph:
@@ -1,15 +1,52 @@
+import copy
+import functools
+import gc
+import os
+import pickle
+import tempfile
 import typing as t
+from dataclasses import dataclass
 
+import sqlglot
 from sqlglot import exp, MappingSchema
-from sqlglot.dialects.dialect import DialectType
-from sqlglot.schema import nested_set
-from sqlglot.trie import new_trie
+from sqlglot.dialects.dialect import Dialect, DialectType
+from sqlglot.schema import flatten_schema, nested_get, nested_set
+from sqlglot.trie import TrieResult, in_trie, new_trie
 
-from sqlleaf import exception
-from sqlleaf.objects.query_types import Query
+from sqlleaf import exception, util
+from sqlleaf.objects.query_types import CatalogTableQuery, CTASQuery, Query, TableColumn, TableQuery, ViewQuery
 
 ColumnMapping = t.Union[t.Dict, str, t.List]
 
+SNAPSHOT_FORMAT = 4  # Incremented whenever the format of saved mappings changes
+SAVED_SCHEMA_ATTRIBUTES = ("visible", "mapping", "mapping_trie", "udf_mapping", "udf_trie")  # The MappingSchema's state
+SAVED_TABLE_TYPES = (TableQuery, CTASQuery, ViewQuery)
+
+ObjectKey = t.Tuple[str, t.Tuple[str, ...]]  # An object's kind and its name's parts, e.g. ("table", ("fruit", "raw"))
+AMBIGUOUS = ()  # A partial name that can't be resolved from the index
+
+
+@dataclass(frozen=True)
+class SavedTable:
+    """
+    A table, view or CTAS in a saved mapping, which is restored as a CatalogTableQuery when it's first looked up.
+
+    Its details are only unpickled when it's restored, so that loading a mapping doesn't build every table's columns.
+    """
+
+    kind: str  # "table", "view" or "ctas"
+    path: t.Tuple[str, ...]  # The table's key within the mapping, e.g. ("raw", "fruit")
+    details: bytes  # The fields of the table's SavedTableDetails, pickled
+
+
+class SavedTableDetails(t.NamedTuple):
+    table: t.Tuple[str, str, str]  # The table's catalog, schema and name
+    property: str  # e.g. "temporary" or "external"
+    columns: t.Tuple[t.Tuple[str, str, t.Optional[t.List[t.Tuple]]], ...]  # The name, data type and default (see util.dump_expression()) of each column
+    system_columns: int  # The position of the table's system columns within those of the mapping, which tables share
+    inherits: t.Tuple[t.Tuple[str, str, str], ...]  # The tables that the table inherits from
+    inherited_by: t.Tuple[t.Tuple[str, str, str], ...]  # The tables that inherit from the table
+
 
 class ObjectMapping(MappingSchema):
     """
@@ -17,15 +54,35 @@ class ObjectMapping(MappingSchema):
 
     Specifically, we need to track the exp.Table inside the exp.Create statements, as they contain more information
     than the exp.Table that we encounter later when parsing INSERT statements.
+
+    A mapping can be frozen and shared by several Lineage instances, each of which registers its own objects
+    in an overlay of it (see overlay()).
     """
 
     def __init__(self, dialect: str):
         """
         Initialize a mapping of tables parts to exp.Table
         """
+        self.base: t.Optional["ObjectMapping"] = None  # The frozen mapping that this mapping overlays, if any (set before `empty` is used)
         super().__init__(dialect=dialect, normalize=False)  # Set `normalize=False` to prevent an unnecessary second parse.
+        self.dialect_name = dialect
         self.kind_mapping = {}
         self.kind_mapping_trie = {}
+        self.object_index: t.Dict[ObjectKey, t.Any] = {}  # Every object by its full name, e.g. fruit.raw
+        self.partial_index: t.Dict[ObjectKey, t.Optional[t.Tuple[str, ...]]] = {}  # The full names of partial names, as resolved
+        self.saved_data_types: t.Dict[str, exp.DataType] = {}  # The data types of restored tables, shared by type
+        self.saved_system_column_types: t.List[t.Tuple[t.Tuple[str, str], ...]] = []  # The name and data type of each set of saved system columns
+        self.saved_system_columns: t.Dict[int, t.List[exp.ColumnDef]] = {}  # The system columns of restored tables, shared by table
+        self.data_types: t.Dict[t.Tuple, exp.DataType] = {}  # The data type of each distinct column type, by its key (see util.expression_key())
+        self.data_type_names: t.Dict[t.Tuple, str] = {}  # The SQL of each distinct data type, by its key
+        # The tables that inherit from each table (e.g. 'CREATE TABLE b INHERITS (a)'), and the columns they inherit, by full name
+        self.inheritance: t.Dict[t.Tuple[str, ...], t.Dict[t.Tuple[str, ...], t.FrozenSet[str]]] = {}
+        self.version = 0  # Incremented whenever an object is added or replaced
+        self.object_versions: t.Dict[ObjectKey, int] = {}  # The latest version of the objects that each full or partial name may match
+        self.frozen = False  # Whether objects can no longer be added (see freeze())
+        self.is_view = False  # Whether objects are added to the base mapping rather than this one (see view())
+        self.view_columns: t.Dict[int, t.Tuple[t.Dict, t.Dict]] = {}  # In a view, the base's columns of each table and their names in the view
+        self.translated_queries: t.Dict[int, t.Tuple] = {}  # The tables of other dialects, as this dialect names them (see _translate_query())
 
     def add_query(
         self,
@@ -48,16 +105,27 @@ class ObjectMapping(MappingSchema):
             normalize: whether to normalize identifiers according to the dialect of interest.
             match_depth: whether to enforce that the table must match the schema's depth or not.
         """
-        table = query.child_table
-        normalized_table = self._normalize_table(table, dialect=dialect, normalize=normalize)
-        parts = self.table_parts(normalized_table)
+        if self.is_view:
+            return self.base.add_query(kind, query, column_mapping, dialect=dialect, normalize=normalize, match_depth=match_depth)
 
-        if kind not in self.kind_mapping:
-            self.kind_mapping[kind] = {}
-            self.kind_mapping_trie[kind] = new_trie({})
+        self._check_writable()
+        table = query.child_table
+        path = self._query_path(query)
+        parts = list(reversed(path))
 
-        nested_set(self.kind_mapping[kind], tuple(reversed(parts)), query)
+        self._add_kind(kind)
+        nested_set(self.kind_mapping[kind], path, query)
         new_trie([parts], self.kind_mapping_trie[kind])
+        self._index_object(kind, path, query)
+
+        if isinstance(column_mapping, dict):
+            column_mapping = {name: self.intern_data_type(data_type, dialect=query.dialect) for name, data_type in column_mapping.items()}
+
+        if query.dialect != self.dialect_name:
+            # A query added through a view is stored by the names that this mapping's dialect gives it
+            table = self._table_from_parts(parts)
+            if isinstance(column_mapping, dict):
+                column_mapping = {_translate_name(name, query.dialect, self.dialect_name): value for name, value in column_mapping.items()}
 
         if kind == "table" and column_mapping is not None:
             # Track the table's columns
@@ -85,6 +153,34 @@ class ObjectMapping(MappingSchema):
             match_depth=match_depth,
         )
 
+    def intern_data_type(self, data_type: t.Union[exp.DataType, str, None], dialect: DialectType = None) -> t.Union[exp.DataType, str, None]:
+        """
+        Get the data type that the schema uses for a column type, which is shared by every column of that type.
+
+        Each distinct type is only converted to SQL and parsed once (as sqlglot does when a type is given as a string),
+        rather than once per column. Types given as strings are left to sqlglot. The SQL is parsed in the dialect of
+        the column's statement (by default this mapping's), which may have types that this mapping's dialect lacks.
+        """
+        if not isinstance(data_type, exp.DataType):
+            return data_type
+
+        key = util.expression_key(data_type)
+        if key not in self.data_types:
+            self.data_types[key] = self._to_data_type(self.data_type_name(data_type), dialect=dialect)
+        return self.data_types[key]
+
+    def data_type_name(self, data_type: t.Optional[exp.DataType]) -> str:
+        """
+        Get the SQL of a data type (e.g. for a node's name), which is only generated once for each distinct type.
+        """
+        if not isinstance(data_type, exp.DataType):
+            return str(data_type)
+
+        key = util.expression_key(data_type)
+        if key not in self.data_type_names:
+            self.data_type_names[key] = str(data_type)
+        return self.data_type_names[key]
+
     def find_columns_for_table(
         self,
         table: exp.Table,
@@ -94,12 +190,49 @@ class ObjectMapping(MappingSchema):
         """
         A nicer name for the parent's function.
         """
-        return super().find(
+        return self.find(
             table,
             raise_on_missing=raise_on_missing,
             ensure_data_types=ensure_data_types,
         )
 
+    def find(self, table: exp.Table, raise_on_missing: bool = True, ensure_data_types: bool = False) -> t.Optional[t.Dict]:
+        """
+        Returns the column mapping of a table (see MappingSchema.find()), which sqlglot uses to qualify and annotate columns.
+
+        In an overlay, the columns are taken from the overlay if it has them, or else from its base.
+        A view returns the base's columns by the names that its own dialect gives them.
+        """
+        if self.base is None:
+            return super().find(table, raise_on_missing=raise_on_missing, ensure_data_types=ensure_data_types)
+
+        if self.is_view:
+            columns = self.base.find(table=self._base_table(table), raise_on_missing=False, ensure_data_types=ensure_data_types)
+            if columns is None or ensure_data_types:
+                return {self._view_name(col): dtype for col, dtype in columns.items()} if columns else columns
+
+            # The columns are only renamed once for each version of the table
+            cached = self.view_columns.get(id(columns))
+            if cached is None or cached[0] is not columns:
+                cached = self.view_columns[id(columns)] = (columns, {self._view_name(col): dtype for col, dtype in columns.items()})
+            return cached[1]
+
+        path = self._find_path("table", self.table_parts(table)[0 : len(self.supported_table_args)])
+        if path is None:
+            return None
+
+        for layer in reversed(self._layers()):
+            columns = nested_get(layer.mapping, *zip(path, path), raise_on_missing=False)
+            if columns is not None:
+                if ensure_data_types:
+                    columns = {col: self._to_data_type(dtype) if isinstance(dtype, str) else dtype for col, dtype in columns.items()}
+                return columns
+        return None
+
+    @property
+    def empty(self) -> bool:
+        return not self.mapping and (self.base is None or self.base.empty)
+
     def find_query(
         self,
         kind: str,
@@ -120,11 +253,64 @@ class ObjectMapping(MappingSchema):
         Returns:
             The schema of the target table.
         """
+        parts = self.table_parts(table)[0 : len(self.supported_table_args)]
+        return self.find_query_by_parts(kind, parts, raise_on_missing=raise_on_missing)
+
+    def find_query_by_parts(self, kind: str, parts: t.List[str], raise_on_missing: bool = True) -> t.Optional[Query]:
+        """
+        Returns the Query for a given object kind and the parts of a table's name, in reverse (e.g. ["raw", "fruit"]).
+
+        Names are looked up in a hash index. A partial name (e.g. "raw" for "fruit.raw") is resolved
+        from the trie once, and the trie is only searched again if the name is ambiguous.
+
+        A table of another dialect (e.g. added through a view) is returned with the names that this mapping's dialect gives it.
+        """
+        return self._translate_query(self._find_query_by_parts(kind, parts, raise_on_missing=raise_on_missing))
+
+    def _find_query_by_parts(self, kind: str, parts: t.List[str], raise_on_missing: bool = True) -> t.Optional[Query]:
+        if self.base is not None:
+            path = self._find_path(kind, parts)
+            return self._get_object(kind, path) if path else None
+
         if kind not in self.kind_mapping:
             return None
 
-        parts = self.table_parts(table)[0 : len(self.supported_table_args)]
-        resolved_parts = self._find_in_trie(parts, self.kind_mapping_trie[kind], raise_on_missing)
+        key = (kind, tuple(reversed(parts)))
+        result = self.object_index.get(key)
+
+        if result is None:
+            if key not in self.partial_index:
+                self.partial_index[key] = self._resolve_partial_name(kind, parts)
+            full_name = self.partial_index[key]
+
+            if full_name is None:
+                return None
+            elif full_name is AMBIGUOUS:
+                return self._find_query_in_trie(kind, parts, raise_on_missing)
+            result = self.object_index[(kind, full_name)]
+
+        if isinstance(result, SavedTable):
+            return self._restore_table(kind, result)
+        return result
+
+    def _resolve_partial_name(self, kind: str, parts: t.List[str]) -> t.Optional[t.Tuple[str, ...]]:
+        """
+        Find the only full name that a partial name matches, None if it matches none, or AMBIGUOUS.
+        """
+        value, trie = in_trie(self.kind_mapping_trie[kind], parts)
+        if value == TrieResult.FAILED:
+            return None
+        elif value == TrieResult.PREFIX:
+            possibilities = flatten_schema(trie)
+            if len(possibilities) == 1:
+                full_name = tuple(reversed(parts + possibilities[0]))
+                if (kind, full_name) in self.object_index:
+                    return full_name
+
+        return AMBIGUOUS
+
+    def _find_query_in_trie(self, kind: str, parts: t.List[str], raise_on_missing: bool) -> t.Optional[Query]:
+        resolved_parts = self._find_in_trie(list(parts), self.kind_mapping_trie[kind], raise_on_missing)
 
         if resolved_parts is None:
             return None
@@ -134,14 +320,282 @@ class ObjectMapping(MappingSchema):
             return None
         elif isinstance(result, dict):
             # The mapping table has varying depth if some tables use a catalog and others don't
-            if table.name in result:
-                return result[table.name]
+            if parts[0] in result:
+                result = result[parts[0]]
+                return self._restore_table(kind, result) if isinstance(result, SavedTable) else result
             else:
                 return None
+        elif isinstance(result, SavedTable):
+            return self._restore_table(kind, result)
         else:
             # Must be exp.Table
             return result
 
+    def find_query_to_modify(self, kind: str, table: exp.Table) -> t.Optional[Query]:
+        """
+        Returns the Query for an object that is about to be modified (e.g. a table that another table inherits from).
+
+        In an overlay, an object of the base mapping is first copied into the overlay, so that neither the base
+        nor any other overlay of it sees the change.
+        """
+        if self.is_view:
+            return self.base.find_query_to_modify(kind, self._base_table(table))
+
+        # The query itself is modified, rather than its translation (see find_query_by_parts())
+        query = self._find_query_by_parts(kind, self.table_parts(table)[0 : len(self.supported_table_args)])
+        if query is None or self.base is None:
+            return query
+
+        path = self._query_path(query)
+        if (kind, path) in self.object_index:
+            return query
+
+        query = copy.copy(query)
+        for name, value in vars(query).items():
+            if isinstance(value, list):
+                setattr(query, name, list(value))
+
+        self._check_writable()
+        self._add_kind(kind)
+        nested_set(self.kind_mapping[kind], path, query)
+        new_trie([list(reversed(path))], self.kind_mapping_trie[kind])
+        self._index_object(kind, path, query)
+        return query
+
+    def add_inheritance(self, parent_query: Query, query: Query, column_names: t.Iterable[str]):
+        """
+        Record that a table inherits columns from another table.
+        """
+        if self.is_view:
+            return self.base.add_inheritance(parent_query, query, column_names)
+
+        self._check_writable()
+        children = self.inheritance.setdefault(self._query_path(parent_query), {})
+        path = self._query_path(query)
+        column_names = {_translate_name(name, parent_query.dialect, self.dialect_name) for name in column_names}
+        children[path] = children.get(path, frozenset()) | frozenset(column_names)
+
+    def find_inheritors(self, parts: t.List[str], column: str) -> t.List[Query]:
+        """
+        Find the tables that inherit a column from a table, given the parts of its name in reverse (see find_query_by_parts()).
+
+        Without any inheritance in the mapping, nothing is looked up.
+        """
+        if self.is_view:
+            column = self._base_name(column)
+
+        layers = self._layers()
+        if not any(layer.inheritance for layer in layers):
+            return []
+
+        path = self._find_path("table", parts[0 : len(self.supported_table_args)])
+        if not path:
+            return []
+
+        children = {}
+        for layer in layers:
+            children.update(layer.inheritance.get(path, {}))
+        return [self._translate_query(self._get_object("table", child)) for child, columns in children.items() if column in columns]
+
+    def _find_path(self, kind: str, parts: t.List[str]) -> t.Optional[t.Tuple[str, ...]]:
+        """
+        Get the full name of the object that the (reversed) parts of a name refer to, if any.
+
+        In an overlay, a full name is looked up in the overlay before its base. A partial name that
+        refers to different objects in each of them is ambiguous, and refers to neither.
+        """
+        if self.is_view:
+            return self.base._find_path(kind, [self._base_name(part) for part in parts])
+
+        path = self._find_own_path(kind, parts)
+        if self.base is None:
+            return path
+
+        name = tuple(reversed(parts))
+        if path == name:
+            return path
+
+        base_path = self.base._find_path(kind, parts)
+        if base_path == name or path is None:
+            return base_path
+        elif base_path is None or base_path == path:
+            return path
+        return None
+
+    def _find_own_path(self, kind: str, parts: t.List[str]) -> t.Optional[t.Tuple[str, ...]]:
+        if kind not in self.kind_mapping:
+            return None
+
+        key = (kind, tuple(reversed(parts)))
+        if key in self.object_index:
+            return key[1]
+
+        if key not in self.partial_index:
+            self.partial_index[key] = self._resolve_partial_name(kind, parts)
+        full_name = self.partial_index[key]
+
+        if full_name is AMBIGUOUS:
+            query = self._find_query_in_trie(kind, parts, raise_on_missing=False)
+            return self._query_path(query) if query else None
+        return full_name
+
+    def _get_object(self, kind: str, path: t.Tuple[str, ...]) -> t.Optional[Query]:
+        """
+        Get an object by its full name, from the overlay if it has one by that name, or else from its base.
+        """
+        result = self.object_index.get((kind, path))
+        if result is None:
+            return self.base._get_object(kind, path) if self.base is not None else None
+        elif isinstance(result, SavedTable):
+            return self._restore_table(kind, result)
+        return result
+
+    def _layers(self) -> t.List["ObjectMapping"]:
+        """
+        The mappings that objects are looked up in, from the bottom-most base up to this mapping.
+        """
+        return (self.base._layers() if self.base is not None else []) + [self]
+
+    def _add_kind(self, kind: str):
+        if kind not in self.kind_mapping:
+            self.kind_mapping[kind] = {}
+            self.kind_mapping_trie[kind] = new_trie({})
+
+    def _query_path(self, query: Query) -> t.Tuple[str, ...]:
+        parts = self.table_parts(self._normalize_table(query.child_table))
+        return tuple(_translate_name(part, query.dialect, self.dialect_name) for part in reversed(parts))
+
+    def _base_name(self, name: str) -> str:
+        # A view's name for an object, as its base names it
+        return _translate_name(name, self.dialect_name, self.base.dialect_name)
+
+    def _view_name(self, name: str) -> str:
+        return _translate_name(name, self.base.dialect_name, self.dialect_name)
+
+    def _base_table(self, table: exp.Table) -> exp.Table:
+        return self._table_from_parts([self._base_name(part) for part in self.table_parts(table)])
+
+    def _table_from_parts(self, parts: t.List[str]) -> exp.Table:
+        return exp.Table(**{arg: exp.to_identifier(name) for arg, name in zip(self.supported_table_args, parts)})
+
+    def _translate_query(self, query: t.Optional[Query]) -> t.Optional[Query]:
+        """
+        Get a table of another dialect with the names that this mapping's dialect gives to it and its columns.
+
+        If any name differs, the translation is a copy, which is made once for each version of the table's columns.
+        """
+        if not isinstance(query, SAVED_TABLE_TYPES + (CatalogTableQuery,)) or query.dialect == self.dialect_name:
+            return query
+
+        def translate(column_defs: t.List[exp.ColumnDef]) -> t.List[exp.ColumnDef]:
+            translated = []
+            for col in column_defs:
+                name = _translate_name(col.name, query.dialect, self.dialect_name)
+                if name != col.name:
+                    col = util.copy_expression(col)
+                    col.set("this", exp.to_identifier(name))
+                translated.append(col)
+            return translated
+
+        sources = (query.column_defs, getattr(query, "system_column_defs", None))
+        cached = self.translated_queries.get(id(query))
+        if cached is None or cached[0] is not query or cached[1][0] is not sources[0] or cached[1][1] is not sources[1]:
+            path = self._query_path(query)
+            column_defs = translate(sources[0])
+            system_column_defs = translate(sources[1]) if sources[1] is not None else None
+
+            # Expressions are compared by identity, as their equality ignores the case of names
+            renamed = any(a is not b for a, b in zip(column_defs + (system_column_defs or []), sources[0] + (sources[1] or [])))
+
+            translated = query
+            if renamed or path != tuple(reversed(self.table_parts(query.child_table))):
+                translated = copy.copy(query)
+                translated.child_table = self._table_from_parts(list(reversed(path)))
+                translated.column_defs = column_defs
+                if system_column_defs is not None:
+                    translated.system_column_defs = system_column_defs
+                translated._column_indexes = {}
+            cached = self.translated_queries[id(query)] = (query, sources, translated)
+        return cached[2]
+
+    def _index_object(self, kind: str, path: t.Tuple[str, ...], obj: t.Any):
+        """
+        Add an object to the index, and forget the resolved partial names that it may now also match.
+        """
+        self.object_index[(kind, path)] = obj
+        self.version += 1
+        for i in range(1, len(path) + 1):
+            self.partial_index.pop((kind, path[-i:]), None)
+            self.object_versions[(kind, path[-i:])] = self.version
+
+    def get_version(self, table: exp.Table, kind: str = "table") -> int:
+        """
+        Get the version of the object that a name refers to, or 0 if there's no such object.
+
+        The version changes whenever the object is replaced (e.g. by CREATE OR REPLACE), or another object
+        is added that the name may also refer to (e.g. "raw" for "veg.raw" as well as "fruit.raw").
+        """
+        parts = self.table_parts(table)[0 : len(self.supported_table_args)]
+        if self.is_view:
+            parts = [self._base_name(part) for part in parts]
+        key = (kind, tuple(reversed(parts)))
+        return max(layer.object_versions.get(key, 0) for layer in self._layers())
+
+    def schema_version(self, tables: t.Iterable[exp.Table], kind: str = "table") -> int:
+        """
+        Get a version of the objects that a statement references, which changes whenever any of them changes.
+
+        As versions only ever increase, this is the latest version among them. Work derived from a statement
+        (e.g. its lineage) can be reused for as long as the schema version of its tables is unchanged.
+        """
+        return max((self.get_version(table, kind) for table in tables), default=0)
+
+    def freeze(self) -> "ObjectMapping":
+        """
+        Stop any more objects from being added to the mapping, so that it can be shared by several Lineage instances.
+
+        The mapping's caches (e.g. of resolved names and restored tables) are still filled as it's used.
+        """
+        self.frozen = True
+        return self
+
+    def overlay(self) -> "ObjectMapping":
+        """
+        Create an empty mapping on top of this frozen mapping, which registers its own objects and looks up the rest in this one.
+
+        Objects added to the overlay replace this mapping's objects of the same name for the overlay only, and
+        objects of this mapping are copied into the overlay before they're modified (see find_query_to_modify()).
+        Only the objects of the overlay take up memory, so many overlays of a large catalog are cheap.
+        """
+        if not self.frozen:
+            raise exception.SqlLeafException(message="Only a frozen mapping can be overlaid. Call freeze() first.")
+
+        mapping = ObjectMapping(dialect=self.dialect_name)
+        mapping.base = self
+        mapping.version = self.version  # Versions continue from the base's, so that they keep increasing
+        mapping.data_types = dict(self.data_types)
+        mapping.data_type_names = dict(self.data_type_names)
+        return mapping
+
+    def view(self, dialect: str) -> "ObjectMapping":
+        """
+        Create a mapping for the statements of another dialect, which shares this mapping's objects.
+
+        Unlike an overlay, objects added to a view are added to this mapping, so that every dialect sees them.
+        Only the dialect's own state (e.g. its parsed data types) is kept by the view.
+
+        Objects are stored by the names that this mapping's dialect gives them, and the view looks up names by
+        translating them (see _translate_name()), e.g. FRUIT.RAW in Snowflake is fruit.raw in Postgres.
+        """
+        mapping = ObjectMapping(dialect=dialect)
+        mapping.base = self
+        mapping.is_view = True
+        return mapping
+
+    def _check_writable(self):
+        if self.frozen:
+            raise exception.SqlLeafException(message="The mapping is frozen. Add objects to an overlay of it instead (see ObjectMapping.overlay()).")
+
     # Override sqlglot's property. It seems to be buggy when using different dict sizes (catalog, schema, etc)
     @property
     def supported_table_args(self) -> t.Tuple[str, ...]:
@@ -151,12 +605,219 @@ class ObjectMapping(MappingSchema):
         """
         Get the 'CREATE' query for a table or stage.
         """
-        if str(table).startswith("@"):
-            child_table_query = self.find_query(kind="stage", table=table)
-        else:
-            child_table_query = self.find_query(kind="table", table=table)
+        child_table_query = self.find_table_or_stage(self.table_parts(table))
 
         if not child_table_query and raise_on_missing:
             raise exception.SqlLeafException(message="Unknown table", table=str(table))
 
         return child_table_query
+
+    def find_table_or_stage(self, parts: t.List[str]) -> t.Optional[Query]:
+        """
+        Get the 'CREATE' query for a table or stage from the parts of its name, in reverse (see find_query_by_parts()).
+        """
+        # A stage's name starts with @, e.g. @fruit.stage
+        kind = "stage" if parts and parts[-1].startswith("@") else "table"
+        return self.find_query_by_parts(kind, parts[0 : len(self.supported_table_args)])
+
+    def save(self, path: str):
+        """
+        Save the mapping to a file, so that it can be loaded by other processes instead of processing all the DDL again.
+
+        Tables, views and CTAS are saved as their columns, without their statements, and are only rebuilt
+        when they're first looked up after loading. Other objects (e.g. procedures) are saved in full.
+        """
+        from sqlleaf import __version__
+
+        if self.base is not None:
+            raise exception.SqlLeafException(message="An overlay or view can't be saved. Save its base mapping instead.")
+
+        saver = _TableSaver(self)
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "versions": (sqlglot.__version__, __version__),
+            "dialect": self.dialect_name,
+            "schema": {name: getattr(self, name) for name in SAVED_SCHEMA_ATTRIBUTES if hasattr(self, name)},
+            "kind_mapping": {kind: saver.save_objects(objects, ()) for kind, objects in self.kind_mapping.items()},
+            "kind_mapping_trie": self.kind_mapping_trie,
+            "object_index": {key: saver.save_objects(obj, key[1]) for key, obj in self.object_index.items()},
+            "inheritance": self.inheritance,
+            "version": self.version,
+            "object_versions": self.object_versions,
+            "system_columns": saver.system_column_types,  # Only complete once the tables are saved
+        }
+
+        # Write to a temporary file and rename it into place, so that readers never see a partial file
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "ObjectMapping":
+        """
+        Load a mapping saved by save(). It must have been saved by the same versions of sqlleaf and sqlglot.
+        """
+        from sqlleaf import __version__
+
+        # The snapshot is made of many small objects that are never garbage, so collecting while they're built only slows it down
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+        finally:
+            if enabled:
+                gc.enable()
+
+        if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("versions") != (sqlglot.__version__, __version__):
+            raise exception.SqlLeafException(message=f"The mapping was saved by a different version of sqlleaf or sqlglot: {path}")
+
+        mapping = cls(dialect=snapshot["dialect"])
+        for name, value in snapshot["schema"].items():
+            setattr(mapping, name, value)
+        mapping.kind_mapping = snapshot["kind_mapping"]
+        mapping.kind_mapping_trie = snapshot["kind_mapping_trie"]
+        mapping.object_index = snapshot["object_index"]
+        mapping.inheritance = snapshot["inheritance"]
+        mapping.version = snapshot["version"]
+        mapping.object_versions = snapshot["object_versions"]
+        mapping.saved_system_column_types = snapshot["system_columns"]
+        return mapping
+
+    def _restore_table(self, kind: str, saved: SavedTable) -> CatalogTableQuery:
+        """
+        Rebuild a table from a saved mapping, and replace it in the mapping.
+        """
+        details = SavedTableDetails(*pickle.loads(saved.details))
+        catalog, schema, name = details.table
+        query = CatalogTableQuery(
+            table=exp.table_(name, db=schema or None, catalog=catalog or None),
+            dialect=self.dialect_name,
+            columns=[TableColumn(name, self._saved_data_type(data_type), default) for name, data_type, default in details.columns],
+            statement_index=0,
+            system_column_defs=self._saved_system_columns(details.system_columns),
+        )
+        query.kind = saved.kind
+        query.property = details.property
+        nested_set(self.kind_mapping[kind], saved.path, query)
+        self.object_index[(kind, saved.path)] = query
+
+        # Related tables are restored once the table is in the mapping, as they refer back to it
+        query.inherits = [self._find_saved_table(kind, table) for table in details.inherits]
+        query.inherited_by = [self._find_saved_table(kind, table) for table in details.inherited_by]
+        return query
+
+    def _find_saved_table(self, kind: str, table: t.Tuple[str, str, str]) -> Query:
+        catalog, schema, name = table
+        return self.find_query(kind=kind, table=exp.table_(name, db=schema or None, catalog=catalog or None))
+
+    def _saved_data_type(self, data_type: str) -> exp.DataType:
+        # Data types are only ever read, so each is parsed once and shared
+        if data_type not in self.saved_data_types:
+            self.saved_data_types[data_type] = exp.DataType.build(data_type, dialect=self.dialect_name, udt=True)
+        return self.saved_data_types[data_type]
+
+    def _saved_system_columns(self, position: int) -> t.List[exp.ColumnDef]:
+        # As with collector.system_columns(), tables with the same system columns share them
+        if position not in self.saved_system_columns:
+            self.saved_system_columns[position] = [
+                exp.ColumnDef(this=exp.to_identifier(name), kind=self._saved_data_type(data_type))
+                for name, data_type in self.saved_system_column_types[position]
+            ]
+        return list(self.saved_system_columns[position])
+
+
+@functools.lru_cache(maxsize=None)
+def _translate_name(name: str, source: t.Optional[str], target: str) -> str:
+    """
+    Get the name that a dialect gives to a name normalized by another dialect, e.g. FRUIT in Snowflake is fruit in Postgres.
+
+    A name in the source dialect's normalized case may have been written unquoted, so it's normalized as if unquoted
+    by the target dialect. Any other name must have been quoted, and is the same in both.
+    """
+    if not source or source == target:
+        return name
+
+    unquoted = Dialect.get_or_raise(source).normalize_identifier(exp.Identifier(this=name, quoted=False))
+    if unquoted.name != name:
+        return name
+    return Dialect.get_or_raise(target).normalize_identifier(exp.Identifier(this=name, quoted=False)).name
+
+
+class _TableSaver:
+    """
+    Save the tables of a mapping, sharing the work between tables with the same data types or system columns.
+    """
+
+    def __init__(self, mapping: ObjectMapping):
+        self.mapping = mapping
+        self.saved: t.Dict[int, SavedTable] = {}  # Objects are saved once, and are shared by the kind mapping and the index
+        self.type_names: t.Dict[int, str] = {}  # The SQL of each data type, by its id (types are usually shared by columns)
+        self.system_column_types: t.List[t.Tuple[t.Tuple[str, str], ...]] = []  # Each distinct set of system columns, saved once
+        self.system_columns: t.Dict[t.Tuple[int, ...], int] = {}  # The position of each set of system columns, by the ids of the columns
+
+    def save_objects(self, objects: t.Any, path: t.Tuple[str, ...]) -> t.Any:
+        """
+        Replace the tables within a (nested) mapping of objects with their saved form.
+        """
+        if isinstance(objects, dict):
+            return {key: self.save_objects(value, path + (key,)) for key, value in objects.items()}
+        elif isinstance(objects, SAVED_TABLE_TYPES):
+            if id(objects) not in self.saved:
+                self.saved[id(objects)] = self.save_table(objects, path)
+            return self.saved[id(objects)]
+        return objects
+
+    def save_table(self, query: Query, path: t.Tuple[str, ...]) -> SavedTable:
+        # Tables are restored in the mapping's dialect, so tables of other dialects are saved by the names that it gives them
+        dialect = self.mapping.dialect_name
+
+        def parts(q: Query) -> t.Tuple[str, str, str]:
+            table = q.child_table
+            return tuple(_translate_name(part, q.dialect, dialect) for part in (table.catalog, table.db, table.name))
+
+        if isinstance(query, CatalogTableQuery):
+            # Its columns are saved without building their definitions
+            columns = tuple((col.name, self.type_name(col.kind), col.dump_default()) for col in query.columns)
+        else:
+            columns = tuple(
+                (_translate_name(col.name, query.dialect, dialect), self.type_name(col.kind), _dump_default(col)) for col in query.get_column_defs()
+            )
+
+        details = SavedTableDetails(
+            table=parts(query),
+            property=query.property,
+            columns=columns,
+            system_columns=self.save_system_columns(getattr(query, "system_column_defs", []), query.dialect),
+            inherits=tuple(parts(q) for q in getattr(query, "inherits", [])),
+            inherited_by=tuple(parts(q) for q in query.inherited_by),
+        )
+        return SavedTable(kind=query.kind, path=path, details=pickle.dumps(tuple(details), protocol=pickle.HIGHEST_PROTOCOL))
+
+    def type_name(self, data_type: t.Optional[exp.DataType]) -> str:
+        if id(data_type) not in self.type_names:
+            self.type_names[id(data_type)] = self.mapping.data_type_name(data_type)
+        return self.type_names[id(data_type)]
+
+    def save_system_columns(self, column_defs: t.List[exp.ColumnDef], dialect: str) -> int:
+        # Tables share their system columns (see collector.system_columns()), which are then saved once
+        key = tuple(id(col) for col in column_defs)
+        if key not in self.system_columns:
+            names = [_translate_name(col.name, dialect, self.mapping.dialect_name) for col in column_defs]
+            self.system_columns[key] = len(self.system_column_types)
+            self.system_column_types.append(tuple((name, self.type_name(col.kind)) for name, col in zip(names, column_defs)))
+        return self.system_columns[key]
+
+
+def _dump_default(column_def: exp.ColumnDef) -> t.Optional[t.List[t.Tuple]]:
+    # Only the column's own constraints are checked, rather than searching its whole tree
+    for constraint in column_def.args.get("constraints") or []:
+        if isinstance(constraint.kind, exp.DefaultColumnConstraint):
+            return util.dump_expression(constraint.kind.this)
+    return None
@@ -26,6 +26,7 @@ class ProcessorContext:
     expr: exp.Expression
     scope: TableOrScopeType
     scope_positions: t.Dict[int, t.Dict[int, int]] = None
+    scope_selects: t.Dict[int, t.Dict[str, t.List[exp.Expression]]] = None  # The selects of each scope by name, as they're looked up
     data_type: exp.DataType = None
     child_node_attrs: NodeAttributes = None
     # Override the data_type if needed
@@ -41,6 +42,10 @@ class ProcessorContext:
         object.__setattr__(self, "data_type", expr_type)
         object.__setattr__(self, "expr", unwrapped_expr)
 
+    @property
+    def data_type_name(self) -> str:
+        return self.object_mapping.data_type_name(self.data_type)
+
     def get_expr_type(self, expr: exp.Expression) -> exp.DataType:
         """
         Determine the expression's data type. If it's missing, use an ancestor's data type.
@@ -57,7 +57,7 @@ class NodeAttributes:
     def __init__(
         self,
         expr: exp.Expression,
-        data_type: exp.DataType,
+        data_type: t.Union[exp.DataType, str],
         ctx: NodeContext,
         column: str,
         table: str = "",
@@ -66,7 +66,8 @@ class NodeAttributes:
         kind: str = "",
     ):
         self.expr = expr
-        self.data_type = str(data_type)  # TODO: could we just assign expr.type = data_type and remove this?
+        # The type's SQL, which is given by ObjectMapping.data_type_name() wherever a node has a processor context
+        self.data_type = data_type if isinstance(data_type, str) else str(data_type)
         self.column = column
         self.kind = kind
         self.catalog = catalog
@@ -121,7 +122,7 @@ class LiteralNode(NodeAttributes):
     def __init__(self, name: str, processor_ctx: ProcessorContext, ctx: NodeContext):
         super().__init__(
             kind="literal",
-            data_type=processor_ctx.data_type,
+            data_type=processor_ctx.data_type_name,
             expr=processor_ctx.expr,
             column=name,
             ctx=ctx,
@@ -159,7 +160,7 @@ class ColumnNode(NodeAttributes):
             schema=schema,
             table=table,
             column=column,
-            data_type=processor_ctx.data_type,
+            data_type=processor_ctx.data_type_name,
             expr=expr,
             ctx=ctx,
         )
@@ -196,7 +197,7 @@ class ColumnNode(NodeAttributes):
                 else:
                     column.set("table", exp.to_identifier(source.name))
             if _c != column:
-                logger.debug(f"Renamed node {column.sql()} to {column.sql()}")
+                logger.debug("Renamed node %s to %s", util.LazySQL(_c), util.LazySQL(column))
 
             self.expr = column
             self.catalog = column.catalog
@@ -265,14 +266,13 @@ class ColumnNode(NodeAttributes):
                     self.parent_kind = TableType.DERIVED_TABLE
                     return
 
-            tokens = [str(s) for s in source.parts]
+            tokens = [s.name for s in source.parts]
         else:
             tokens = [catalog, schema, table]
 
-        # Get the table type from the mapping
-        name = ".".join([tok for tok in tokens if tok])
-        tab = exp.to_table(name, dialect=processor_ctx.query.dialect)
-        query = processor_ctx.object_mapping.get_table_or_stage(table=tab, raise_on_missing=False)
+        # Get the table type from the mapping, by the parts of the table's name in reverse
+        parts = [tok for tok in reversed(tokens) if tok]
+        query = processor_ctx.object_mapping.find_table_or_stage(parts)
 
         if not query or query.kind == "ctas":
             self.parent_kind = TableType.TABLE
@@ -297,6 +297,12 @@ class ColumnNode(NodeAttributes):
     def as_table(self) -> exp.Table:
         return exp.table_(catalog=self.catalog, db=self.schema, table=self.table)
 
+    def table_parts(self) -> t.List[str]:
+        """
+        The parts of the column's table name, in reverse (as for ObjectMapping.find_query_by_parts()).
+        """
+        return [part for part in (self.table, self.schema, self.catalog) if part]
+
     @property
     def full_name(self):
         parts = [
@@ -337,7 +343,7 @@ class FunctionNode(NodeAttributes):
 
         super().__init__(
             kind="function",
-            data_type=processor_ctx.data_type,
+            data_type=processor_ctx.data_type_name,
             expr=processor_ctx.expr,
             column=name,
             ctx=ctx,
@@ -367,7 +373,7 @@ class UserDefinedFunctionNode(NodeAttributes):
 
         super().__init__(
             kind="udf",
-            data_type=processor_ctx.data_type,
+            data_type=processor_ctx.data_type_name,
             expr=expr,
             schema=schema,
             column=expr.this,
@@ -399,7 +405,7 @@ class JsonPathNode(NodeAttributes):
 
         super().__init__(
             kind="jsonpath",
-            data_type=processor_ctx.data_type,
+            data_type=processor_ctx.data_type_name,
             expr=expr,
             column=self.selector,
             ctx=ctx,
@@ -432,7 +438,7 @@ class VariableNode(NodeAttributes):
     def __init__(self, processor_ctx: ProcessorContext, ctx: NodeContext):
         super().__init__(
             kind="variable",
-            data_type=processor_ctx.data_type,
+            data_type=processor_ctx.data_type_name,
             expr=processor_ctx.expr,
             column='todo',
             ctx=ctx,
@@ -443,7 +449,7 @@ class StarNode(NodeAttributes):
     def __init__(self, processor_ctx: ProcessorContext, ctx: NodeContext):
         super().__init__(
             kind="star",
-            data_type=exp.DataType.build("UNKNOWN"),
+            data_type="UNKNOWN",
             expr=processor_ctx.expr,
             column="*",
             ctx=ctx,
@@ -458,7 +464,7 @@ class VarNode(NodeAttributes):
     def __init__(self, processor_ctx, ctx: NodeContext):
         super().__init__(
             kind="var",
-            data_type=exp.DataType.build("NULL"),
+            data_type="NULL",
             expr=processor_ctx.expr,
             column=processor_ctx.expr.name,
             ctx=ctx,
@@ -469,7 +475,7 @@ class NullNode(NodeAttributes):
     def __init__(self, processor_ctx: ProcessorContext, ctx: NodeContext):
         super().__init__(
             kind="null",
-            data_type=exp.DataType.build("NULL"),
+            data_type="NULL",
             expr=processor_ctx.expr,
             column="null",
             ctx=ctx,
@@ -490,7 +496,7 @@ class SequenceNode(NodeAttributes):
     def __init__(self, name: str, processor_ctx: ProcessorContext, ctx: NodeContext):
         super().__init__(
             kind="sequence",
-            data_type=exp.DataType.build("INT"),
+            data_type="INT",
             expr=processor_ctx.expr,
             column=name,
             ctx=ctx,
@@ -503,7 +509,7 @@ class WindowNode(NodeAttributes):
 
         super().__init__(
             kind="window",
-            data_type=processor_ctx.data_type,
+            data_type=processor_ctx.data_type_name,
             expr=processor_ctx.expr,
             column=_function_name(expr, processor_ctx.query.dialect),
             ctx=ctx,
@@ -555,7 +561,7 @@ class IntervalNode(NodeAttributes):
         name = f'"{str(expr.this.name)} {str(expr.unit)}"'
         super().__init__(
             kind="interval",
-            data_type=processor_ctx.data_type,
+            data_type=processor_ctx.data_type_name,
             expr=processor_ctx.expr,
             column=name,
             ctx=ctx,
@@ -573,7 +579,7 @@ class _PivotNode(NodeAttributes):
         expr: exp.Column = processor_ctx.expr
         super().__init__(
             kind=kind,
-            data_type=processor_ctx.data_type,
+            data_type=processor_ctx.data_type_name,
             expr=processor_ctx.expr,
             column=expr.name,
             ctx=ctx,
@@ -635,6 +641,13 @@ class EdgeAttributes:
         )
         return "edge:" + util.short_sha256_hash(edge_id)
 
+    @property
+    def execution_count(self) -> t.Optional[int]:
+        """
+        The number of times the edge's statement was run, if it was read from a query log.
+        """
+        return self.query.get_root_query().execution_count
+
     def to_dict(self):
         result = {
             "id": self.id,
@@ -652,6 +665,9 @@ class EdgeAttributes:
             },
             "query": {"id": self.query.id},
         }
+        # Only edges from a query log have an execution count
+        if self.execution_count is not None:
+            result["execution_count"] = self.execution_count
         return result
 
 
@@ -5,6 +5,7 @@ import typing as t
 from sqlglot import exp
 
 from sqlleaf import util, mappings
+from sqlleaf.processors.splitter import RawStatement
 
 logger = logging.getLogger("sqlleaf")
 
@@ -29,8 +30,22 @@ class Query:
             expr.pop_comments()
 
         self.statement_index = statement_index  # The position of this query within a list of queries
+        self.source_index: t.Optional[int] = None  # The position of the query's file within a list of files, if read from files
         self.statement_original = statement
         self.statement_transformed = None
+        self._fingerprint: t.Optional[str] = None  # Set when the statement is collected; see the fingerprint property
+        self.template: t.Optional[str] = None  # Set when the statement is collected from text (see collector.statement_template())
+        self.span: t.Optional[t.Tuple[int, int]] = None  # The offsets of the statement within its text; see get_span()
+        self.execution_count: t.Optional[int] = None  # The number of times the statement was run, if it was read from a query log
+
+        # The inner statements of a procedure's or function's body, which are collected as child queries when it's expanded
+        self.body_statements: t.List[RawStatement] = []
+        self.body_offset: t.Optional[int] = None  # The offset of the body within the statement, if known
+        self.body_expanded = False
+
+        # Caches of the selected column names, and of the names and positions of the column definitions (see get_column_def())
+        self._selected_names: t.Optional[t.Tuple[exp.Expression, t.FrozenSet[str]]] = None
+        self._column_indexes: t.Dict[bool, t.Tuple[t.Tuple, t.Dict[str, exp.ColumnDef], t.Dict[str, int]]] = {}
 
         self.statement = statement
         self.set_statement(self.statement_original)
@@ -44,15 +59,58 @@ class Query:
         if self.parent_query:
             index = self.parent_query.get_statement_index()
             return index + ":" + str(self.statement_index)
+        elif self.source_index is not None:
+            # Statements are indexed per file, e.g. the 3rd statement of the 2nd file -> 1/2
+            return str(self.source_index) + "/" + str(self.statement_index)
         else:
             return str(self.statement_index)
 
+    def get_span(self) -> t.Optional[t.Tuple[int, int]]:
+        """
+        Get the character offsets of this query's statement within its source (e.g. its file), as [start, end).
+
+        The statements inside a procedure are located within the procedure's body. None is returned
+        for queries that don't correspond to text, such as the subqueries of a statement.
+        """
+        if self.span is None or not self.parent_query:
+            return self.span
+
+        parent_span = self.parent_query.get_span()
+        body_offset = self.parent_query.body_offset
+        if parent_span is None or body_offset is None:
+            return None
+
+        start = parent_span[0] + body_offset
+        return start + self.span[0], start + self.span[1]
+
     def set_statement(self, statement: exp.Expression):
         self.statement = statement
 
+    @property
+    def fingerprint(self) -> str:
+        """
+        Identifies the query's statement without generating its SQL.
+
+        Collected statements are fingerprinted from their tokens. Child queries derive their
+        fingerprint from their parent's and their position within it.
+        """
+        if self._fingerprint is None:
+            if self.parent_query:
+                position = self.parent_query.child_queries.index(self)
+                fields = [self.parent_query.fingerprint, self.kind, str(self.statement_index), str(position)]
+                self._fingerprint = util.long_sha256_hash(":".join(fields))
+            else:
+                # The query was created from an expression rather than from text
+                self._fingerprint = util.long_sha256_hash(self.statement_original.sql())
+        return self._fingerprint
+
+    @fingerprint.setter
+    def fingerprint(self, fingerprint: str):
+        self._fingerprint = fingerprint
+
     @property
     def id(self) -> str:
-        return "query:" + util.short_sha256_hash(self.statement_original.sql() + ":" + str(self.statement_index))
+        return "query:" + util.short_sha256_hash(self.fingerprint + ":" + str(self.statement_index))
 
     def set_to_original(self):
         """
@@ -85,6 +143,12 @@ class Query:
 
         return queries
 
+    def has_unexpanded_body(self) -> bool:
+        """
+        Check if the query's body has statements that haven't been collected yet (see collector.expand_body()).
+        """
+        return bool(self.body_statements) and not self.body_expanded
+
     def get_root_query(self):
         return self if not self.parent_query else self.parent_query.get_root_query()
 
@@ -93,6 +157,40 @@ class Query:
             return [s.name for s in self.statement.this.expressions]
         return self.statement.named_selects
 
+    def is_column_selected(self, name: str) -> bool:
+        """
+        Check if a column is one of the statement's selected columns. The names are found once per statement.
+        """
+        if self._selected_names is None or self._selected_names[0] is not self.statement:
+            self._selected_names = (self.statement, frozenset(self.get_selected_column_names()))
+        return name in self._selected_names[1]
+
+    def get_column_def(self, name: str, include_system: bool = False) -> t.Optional[exp.ColumnDef]:
+        """
+        Get the first of the query's column definitions (see get_column_defs()) with a name, if there is one.
+        """
+        return self._get_column_index(include_system)[1].get(name)
+
+    def get_column_position(self, name: str, include_system: bool = False) -> t.Optional[int]:
+        """
+        Get the position of the first of the query's column definitions with a name, if there is one.
+        """
+        return self._get_column_index(include_system)[2].get(name)
+
+    def _get_column_index(self, include_system: bool) -> t.Tuple[t.Tuple, t.Dict[str, exp.ColumnDef], t.Dict[str, int]]:
+        # The index is rebuilt whenever the query's column definitions are replaced
+        sources = (self.column_defs, getattr(self, "system_column_defs", None) if include_system else None)
+        index = self._column_indexes.get(include_system)
+
+        if index is None or index[0][0] is not sources[0] or index[0][1] is not sources[1]:
+            by_name, positions = {}, {}
+            for position, column_def in enumerate(self.get_column_defs(include_system=include_system)):
+                by_name.setdefault(column_def.name, column_def)
+                positions.setdefault(column_def.name, position)
+            index = self._column_indexes[include_system] = (sources, by_name, positions)
+
+        return index
+
     def to_dict(self):
         result = {
             "id": self.id,
@@ -208,11 +306,11 @@ class CTASQuery(Query):
     def get_column_defs(self, include_system: bool = False) -> t.List[exp.ColumnDef]:
         return self.column_defs + self.system_column_defs if include_system else self.column_defs
 
-    def get_column_names_with_types(self, include_system: bool = False) -> t.Dict[str, str]:
+    def get_column_names_with_types(self, include_system: bool = False) -> t.Dict[str, exp.DataType]:
         """
         Used by sqlglot's MappingSchema
         """
-        columns = {col.name: str(col.kind) for col in self.get_column_defs(include_system=include_system)}
+        columns = {col.name: col.kind for col in self.get_column_defs(include_system=include_system)}
         return columns
 
 
@@ -239,11 +337,11 @@ class ViewQuery(Query):
     def get_column_defs(self, include_system: bool = False) -> t.List[exp.ColumnDef]:
         return self.column_defs
 
-    def get_column_names_with_types(self, include_system: bool = False) -> t.Dict[str, str]:
+    def get_column_names_with_types(self, include_system: bool = False) -> t.Dict[str, exp.DataType]:
         """
         Used by sqlglot's MappingSchema
         """
-        columns = {col.name: str(col.kind) for col in self.get_column_defs(include_system=include_system)}
+        columns = {col.name: col.kind for col in self.get_column_defs(include_system=include_system)}
         return columns
 
 
@@ -266,11 +364,82 @@ class TableQuery(Query):
     def get_column_defs(self, include_system: bool = False) -> t.List[exp.ColumnDef]:
         return self.column_defs + self.system_column_defs if include_system else self.column_defs
 
-    def get_column_names_with_types(self, include_system: bool = False) -> t.Dict[str, str]:
+    def get_column_names_with_types(self, include_system: bool = False) -> t.Dict[str, exp.DataType]:
         """
         Used by sqlglot's MappingSchema
         """
-        columns = {col.name: str(col.kind) for col in self.get_column_defs(include_system=include_system)}
+        columns = {col.name: col.kind for col in self.get_column_defs(include_system=include_system)}
+        return columns
+
+
+class TableColumn(t.NamedTuple):
+    """
+    A column of a catalog table, which is only converted to an exp.ColumnDef when the table's column definitions are needed.
+    """
+
+    name: str
+    kind: exp.DataType  # Shared by every column with the same data type, so it must not be modified
+    default: t.Union[exp.Expression, t.List[t.Tuple], None] = None  # A shared expression, or as given by util.dump_expression()
+
+    def to_column_def(self) -> exp.ColumnDef:
+        column_def = exp.ColumnDef(this=exp.to_identifier(self.name), kind=self.kind)
+        if self.default is not None:
+            # As with CREATE TABLE, the default has the column's type
+            default = self.default.copy() if isinstance(self.default, exp.Expression) else util.load_expression(self.default)
+            default.type = self.kind
+            column_def.append("constraints", exp.ColumnConstraint(kind=exp.DefaultColumnConstraint(this=default)))
+        return column_def
+
+    def dump_default(self) -> t.Optional[t.List[t.Tuple]]:
+        if isinstance(self.default, exp.Expression):
+            return util.dump_expression(self.default)
+        return self.default
+
+
+class CatalogTableQuery(TableQuery):
+    """
+    A table imported from a catalog export (see catalog.load_catalog()) or a saved mapping, rather than created by a statement.
+    Its statement is a bare CREATE TABLE, and its columns are set directly.
+
+    Its columns are kept as TableColumns, and its column definitions are only built when they're first needed
+    (e.g. when the table is inserted into), as most tables are only ever read through the MappingSchema.
+    """
+
+    def __init__(
+        self,
+        table: exp.Table,
+        dialect: str,
+        columns: t.List[TableColumn],
+        statement_index: int,
+        system_column_defs: t.Optional[t.List[exp.ColumnDef]] = None,
+    ):
+        super().__init__(
+            statement=exp.Create(this=table, kind="TABLE", properties=None),
+            dialect=dialect,
+            object_mapping=None,
+            statement_index=statement_index,
+        )
+        self.columns = columns
+        self.system_column_defs = system_column_defs or []
+        self._column_defs: t.Optional[t.List[exp.ColumnDef]] = None
+
+    @property
+    def column_defs(self) -> t.List[exp.ColumnDef]:
+        if self._column_defs is None:
+            self._column_defs = [column.to_column_def() for column in self.columns]
+        return self._column_defs
+
+    @column_defs.setter
+    def column_defs(self, column_defs: t.List[exp.ColumnDef]):
+        self._column_defs = column_defs
+
+    def get_column_names_with_types(self, include_system: bool = False) -> t.Dict[str, exp.DataType]:
+        """
+        Used by sqlglot's MappingSchema
+        """
+        columns = {col.name: col.kind for col in self.columns}
+        if include_system:
+            columns.update((col.name, col.kind) for col in self.system_column_defs)
         return columns
 
 
@@ -292,6 +461,8 @@ class ProcedureQuery(Query):
         self.procedure = table.name
         self.signature = str(statement.this)  # e.g. etl.my_proc(v_session_id VARCHAR)
 
+        self.text_transformed: t.Optional[str] = None  # The body, if it had to be generated from the statement
+
         # TODO: support 'default'
         self.column_defs: t.List[exp.ColumnDef] = statement.this.expressions
         self.args = [  # e.g. {'name': 'v_session_id', 'type': 'VARCHAR'}
@@ -303,16 +474,16 @@ class ProcedureQuery(Query):
     def get_column_defs(self, include_system: bool = False) -> t.List[exp.ColumnDef]:
         return self.column_defs
 
-    def get_column_names_with_types(self, include_system: bool = False) -> t.Dict[str, str]:
+    def get_column_names_with_types(self, include_system: bool = False) -> t.Dict[str, exp.DataType]:
         """
         Used by sqlglot's MappingSchema
         """
-        columns = {col.name: str(col.kind) for col in self.get_column_defs(include_system=include_system)}
+        columns = {col.name: col.kind for col in self.get_column_defs(include_system=include_system)}
         return columns
 
     @property
     def id(self):
-        return "procedure:" + util.short_sha256_hash(self.statement_original.sql())
+        return "procedure:" + util.short_sha256_hash(self.fingerprint)
 
     def to_dict(self):
         return {
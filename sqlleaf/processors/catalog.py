@@ -0,0 +1,170 @@
+import logging
+import typing as t
+from dataclasses import dataclass
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+
+from sqlleaf import exception, mappings
+from sqlleaf.objects.query_types import CatalogTableQuery, TableColumn
+from sqlleaf.processors import collector, reader
+
+logger = logging.getLogger("sqlleaf")
+
+"""
+Imports tables and their columns from a catalog export (e.g. of information_schema.columns) without parsing any DDL.
+"""
+
+# The names of each field in an export, either as in information_schema.columns or abbreviated
+CATALOG_FIELDS = {
+    "catalog": ("table_catalog", "catalog"),
+    "schema": ("table_schema", "schema"),
+    "table": ("table_name", "table"),
+    "column": ("column_name", "column"),
+    "ordinal": ("ordinal_position", "ordinal"),
+    "type": ("data_type", "type"),
+    "default": ("column_default", "default"),
+}
+REQUIRED_FIELDS = ("table", "column", "type")
+
+
+@dataclass(frozen=True)
+class CatalogColumn:
+    catalog: str
+    schema: str
+    table: str
+    column: str
+    ordinal: int  # The position of the column within its table, if known (otherwise its position within the export)
+    type: str  # As written in the export, e.g. "character varying"
+    default: t.Optional[str]  # The column's default expression as SQL, e.g. nextval('fruit.raw_id_seq'::regclass)
+
+
+def read_catalog(path: str) -> t.Generator[CatalogColumn]:
+    """
+    Read the columns of a catalog export: a CSV or JSON Lines file (see reader.read_rows()) with one row per column.
+
+    Field names may be those of information_schema.columns (e.g. table_schema, column_name, data_type),
+    or their abbreviations (e.g. schema, column, type). Names are matched case-insensitively.
+    """
+    fields = None
+
+    for index, row in enumerate(reader.read_rows(path)):
+        if fields is None:
+            fields = _match_fields(row.keys(), path)
+
+        values = {field: row.get(name) for field, name in fields.items()}
+        ordinal = values.get("ordinal")
+        yield CatalogColumn(
+            catalog=values.get("catalog") or "",
+            schema=values.get("schema") or "",
+            table=values["table"],
+            column=values["column"],
+            ordinal=int(ordinal) if ordinal not in (None, "") else index,
+            type=values["type"],
+            default=values.get("default") or None,
+        )
+
+
+def load_catalog(
+    columns: t.Iterable[CatalogColumn],
+    object_mapping: mappings.ObjectMapping,
+    dialect: str,
+    include_catalog: bool = False,
+) -> int:
+    """
+    Register a table in the mapping for each table in a catalog export, and return the number of tables.
+
+    Only data types and default expressions are parsed, once per distinct type or default, and are shared
+    by the tables' columns (see CatalogTableQuery). Catalog names
+    are omitted unless `include_catalog` is set, as exports include the current database's name, which statements usually don't.
+    """
+    tables: t.Dict[t.Tuple[str, str, str], t.List[CatalogColumn]] = {}
+    for column in columns:
+        catalog = column.catalog if include_catalog else ""
+        tables.setdefault((catalog, column.schema, column.table), []).append(column)
+
+    data_types = _DataTypes(dialect)
+    defaults: t.Dict[str, t.Optional[exp.Expression]] = {}
+    system_column_defs = collector.system_columns(dialect=dialect)
+    system_column_types = {col.name: col.kind for col in system_column_defs}
+
+    for index, ((catalog, schema, name), table_columns) in enumerate(tables.items()):
+        columns = []
+        column_types = {}
+
+        for column in sorted(table_columns, key=lambda c: c.ordinal):
+            data_type = data_types.get(column.type)
+            default = None
+
+            if column.default is not None:
+                if column.default not in defaults:
+                    defaults[column.default] = _parse_default(column.default, dialect)
+                default = defaults[column.default]
+
+            columns.append(TableColumn(name=column.column, kind=data_type, default=default))
+            column_types[column.column] = data_type
+
+        table = exp.table_(name, db=schema or None, catalog=catalog or None)
+        query = CatalogTableQuery(
+            table=table,
+            dialect=dialect,
+            columns=columns,
+            statement_index=index,
+            system_column_defs=system_column_defs,
+        )
+        object_mapping.add_query(
+            kind="table",
+            query=query,
+            column_mapping={**column_types, **system_column_types},
+            match_depth=False,
+            dialect=dialect,
+        )
+
+    logger.debug(f"Imported {len(tables)} tables, {len(data_types.types)} data types and {len(defaults)} defaults from the catalog")
+    return len(tables)
+
+
+class _DataTypes:
+    """
+    Data types by their name in the export, each parsed once and shared by every column of that type
+    (column types are only ever read, e.g. by data type annotation).
+    """
+
+    def __init__(self, dialect: str):
+        self.dialect = dialect
+        self.types: t.Dict[str, exp.DataType] = {}
+
+    def get(self, name: str) -> exp.DataType:
+        if name not in self.types:
+            # Unknown types (e.g. USER-DEFINED) are kept as user-defined types
+            self.types[name] = exp.DataType.build(name, dialect=self.dialect, udt=True)
+
+        return self.types[name]
+
+
+def _match_fields(names: t.Iterable[str], path: str) -> t.Dict[str, str]:
+    """
+    Map each catalog field to its name in the export.
+    """
+    by_lower_name = {name.lower(): name for name in names}
+    fields = {}
+
+    for field, aliases in CATALOG_FIELDS.items():
+        for alias in aliases:
+            if alias in by_lower_name:
+                fields[field] = by_lower_name[alias]
+                break
+
+    missing = [CATALOG_FIELDS[field][0] for field in REQUIRED_FIELDS if field not in fields]
+    if missing:
+        raise exception.SqlLeafException(message=f"Catalog export has no fields named {', '.join(missing)}: {path}")
+    return fields
+
+
+def _parse_default(default: str, dialect: str) -> t.Optional[exp.Expression]:
+    try:
+        return sqlglot.parse_one(default, dialect=dialect)
+    except ParseError as e:
+        logger.warning(f"Ignoring a column default that can't be parsed: {default}: {e}")
+        return None
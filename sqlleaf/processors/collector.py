@@ -1,14 +1,18 @@
 import logging
 import typing as t
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
 
-import sqlglot
 from sqlglot import exp
 from sqlglot.dialects import postgres
+from sqlglot.dialects.dialect import Dialect
+from sqlglot.tokens import Token, TokenType
 from sqlglot.optimizer.qualify import qualify
 from sqlglot.optimizer.annotate_types import annotate_types
 from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
 
-from sqlleaf import exception, mappings, util
+from sqlleaf import cache, exception, mappings, util
 from sqlleaf.objects.query_types import (
     StageQuery,
     ProcedureQuery,
@@ -27,6 +31,7 @@ from sqlleaf.objects.query_types import (
     DeleteQuery,
     Query,
 )
+from sqlleaf.processors import prefilter, scheduler, splitter
 from sqlleaf.processors.transformer import clean_stored_procedure_text
 
 logger = logging.getLogger("sqlleaf")
@@ -39,6 +44,8 @@ PSEUDOCOLUMNS = ["ctid", "xmin", "xmax", "cmin", "cmax", "tableoid", "oid"]
 postgres.Postgres.PSEUDOCOLUMNS = {c.upper() for c in PSEUDOCOLUMNS}
 postgres.Postgres.EXCLUDES_PSEUDOCOLUMNS_FROM_STAR = True
 
+SYSTEM_COLUMN_DEFS: t.Dict[str, t.Tuple[exp.ColumnDef, ...]] = {}  # The system columns of each dialect, as given by system_columns()
+
 
 """
 Parses text for SQL statements and collects them into Query objects.
@@ -65,7 +72,24 @@ def get_query_processors():
     }
 
 
-def collect_queries(text: str, dialect: str, object_mapping: mappings.ObjectMapping) -> t.List[Query]:
+# The languages of procedures whose bodies contain SQL statements
+PROCEDURE_SQL_LANGUAGES = ("plpgsql", "sql")
+
+
+def collect_queries(
+    text: str,
+    dialect: str,
+    object_mapping: mappings.ObjectMapping,
+    statement_index: int = 0,
+    seen: t.Optional[t.Set[str]] = None,
+    workers: t.Optional[int] = None,
+    parse_cache: t.Optional[cache.ParseCache] = None,
+    offset: int = 0,
+    resolve_dependencies: bool = False,
+    skipped: t.Optional[t.Counter[str]] = None,
+    expand_bodies: bool = True,
+    executor: t.Optional[Executor] = None,
+) -> t.List[Query]:
     """
     Parse a series of SQL statements provided as text.
     This includes tables, views, procedures, functions, sequences, etc.
@@ -74,57 +98,175 @@ def collect_queries(text: str, dialect: str, object_mapping: mappings.ObjectMapp
     has multiple individual queries. Each of these individual queries may also have
     subqueries. For example, a MERGE query often has INSERTs or UPDATEs in its WHEN clauses.
 
-    The statements must be provided in the order in which they depend on each other.
-    If B depends on A, A must be created before B.
+    The statements must be provided in the order in which they depend on each other
+    (if B depends on A, A must be created before B), unless resolve_dependencies is set.
+
+    Args:
+        text: the SQL statements.
+        dialect: the SQL dialect of the statements.
+        object_mapping: the mapping in which to register any created objects.
+        statement_index: the index of the first statement, if the text continues from earlier text.
+        seen: the ids of previously collected statements, if duplicates should also be removed across calls.
+        workers: the number of processes with which to parse the statements (see parse_statements()).
+        parse_cache: the cache from which to load statements that were parsed previously.
+        offset: the offset of the text within its source, if it continues from earlier text.
+        resolve_dependencies: whether to reorder the statements so that objects are created before they are used.
+        skipped: if given, statements that can't contribute to lineage aren't parsed, and are counted here by category.
+        expand_bodies: whether to collect the inner statements of procedures and functions now, or later (see expand_body()).
+        executor: a pool of processes in which to parse the statements, if it's shared with other calls (see parse_statements()).
+    """
+    parsed = parse_statements(text, dialect, workers=workers, parse_cache=parse_cache, skipped=skipped, executor=executor)
+    statements = [
+        StatementToCollect(index=index, span=(offset + parsed_stmt.start, offset + parsed_stmt.end), parsed=parsed_stmt)
+        for index, parsed_stmt in enumerate(parsed, start=statement_index)
+        if parsed_stmt
+    ]
+    if resolve_dependencies:
+        statements = order_statements(statements)
+
+    return _collect_parsed_statements(statements, dialect, object_mapping, seen, workers, parse_cache, expand_bodies)
+
+
+def collect_sources(
+    texts: t.List[str],
+    dialect: str,
+    object_mapping: mappings.ObjectMapping,
+    workers: t.Optional[int] = None,
+    parse_cache: t.Optional[cache.ParseCache] = None,
+    skipped: t.Optional[t.Counter[str]] = None,
+    expand_bodies: bool = True,
+) -> t.List[Query]:
+    """
+    Parse the statements of several texts (e.g. files) and collect them in dependency order,
+    regardless of the order of the texts or of the statements within them.
+
+    Each query's source index is the position of its text.
+    """
+    statements = []
+    for source_index, text in enumerate(texts):
+        parsed = parse_statements(text, dialect, workers=workers, parse_cache=parse_cache, skipped=skipped)
+        statements.extend(
+            StatementToCollect(index=index, span=(p.start, p.end), parsed=p, source_index=source_index)
+            for index, p in enumerate(parsed)
+            if p
+        )
+
+    statements = order_statements(statements)
+    return _collect_parsed_statements(
+        statements, dialect, object_mapping, workers=workers, parse_cache=parse_cache, expand_bodies=expand_bodies
+    )
+
+
+def order_statements(statements: t.List["StatementToCollect"]) -> t.List["StatementToCollect"]:
+    """
+    Order parsed statements so that objects are created before they are used (see scheduler.schedule_statements()).
+    """
+    objects = [scheduler.extract_objects(s.parsed.statement, s.parsed.kind) for s in statements]
+    schedule = scheduler.schedule_statements(objects)
+
+    for cycle in schedule.cycles:
+        indexes = [statements[i].get_statement_index() for i in cycle]
+        logger.warning(f"Statements {indexes} depend on each other circularly, so they are processed in their original order")
+
+    return [statements[i] for i in schedule.order]
+
+
+def expand_body(
+    query: Query,
+    object_mapping: mappings.ObjectMapping,
+    workers: t.Optional[int] = None,
+    parse_cache: t.Optional[cache.ParseCache] = None,
+) -> t.List[Query]:
+    """
+    Collect the inner statements of a procedure's or function's body as its child queries, if they haven't been already.
+    Return the new child queries.
+    """
+    if not query.has_unexpanded_body():
+        return []
+
+    query.body_expanded = True
+    body_queries = collect_block_statements(query.body_statements, query.dialect, object_mapping, workers, parse_cache)
+    query.add_child_queries(child_queries=body_queries)
+    return body_queries
+
+
+def collect_block_statements(
+    statements: t.List[splitter.RawStatement],
+    dialect: str,
+    object_mapping: mappings.ObjectMapping,
+    workers: t.Optional[int] = None,
+    parse_cache: t.Optional[cache.ParseCache] = None,
+) -> t.List[Query]:
+    """
+    Parse and collect the inner statements of a procedural block (see splitter.split_block()).
+
+    The statements are parsed together, so that they are parsed in parallel and cached individually
+    in the same way as top-level statements. Their queries keep the statements' indexes and offsets within the block.
+    """
+    # An inner statement has no top-level semicolons, so each one parses to exactly one statement.
+    # The newlines end any trailing line comments.
+    parsed = parse_statements("\n;\n".join(s.text for s in statements), dialect, workers=workers, parse_cache=parse_cache)
+    if len(parsed) != len(statements):
+        logger.debug("Parsing the block's statements separately")
+        parsed = [parse_statements(s.text, dialect, parse_cache=parse_cache)[0] for s in statements]
+
+    items = [StatementToCollect(index=s.index, span=(s.start, s.end), parsed=p) for s, p in zip(statements, parsed) if p]
+    return _collect_parsed_statements(items, dialect, object_mapping, workers=workers, parse_cache=parse_cache)
+
+
+def _collect_parsed_statements(
+    statements: t.List["StatementToCollect"],
+    dialect: str,
+    object_mapping: mappings.ObjectMapping,
+    seen: t.Optional[t.Set[str]] = None,
+    workers: t.Optional[int] = None,
+    parse_cache: t.Optional[cache.ParseCache] = None,
+    expand_bodies: bool = True,
+) -> t.List[Query]:
+    """
+    Create a query for each parsed statement, in the order given.
     """
     queries = {}
+    seen = set() if seen is None else seen
     unknown = {}
     unsupported = []
     processors = get_query_processors()
     counts = {kind: 0 for kind in processors.keys()}
-    parsed = sqlglot.parse(text, dialect=dialect)
 
-    for index, stmt in enumerate(parsed):
+    for statement in statements:
+        index = statement.index
+        parsed_stmt = statement.parsed
+        stmt = parsed_stmt.statement
+        kind = parsed_stmt.kind
+
         if isinstance(stmt, exp.Command):
             logger.warning(f"Unsupported statement: {stmt.sql(dialect=dialect)}")
             unsupported.append((index, stmt))
             continue
 
         # Remove duplicate queries
-        _id = util.short_sha256_hash(stmt.sql())
-        if _id in queries:
-            logger.debug(f"Skipping duplicate query: {stmt.sql()}")
+        _id = parsed_stmt.fingerprint
+        if _id in seen:
+            logger.debug("Skipping duplicate query: %s", util.LazySQL(stmt))
             continue
 
-        if stmt.key == "create":
-            if stmt.kind == "TABLE":
-                if isinstance(stmt.expression, (exp.Select, exp.Values)):
-                    kind = "ctas"
-                else:
-                    kind = "table"
-            else:
-                kind = stmt.kind.lower()
-        elif stmt.key == "select" and "into" in stmt.args:
-            # TODO: this is dialect-dependent! mysql converts, but postgres does not
-            # sqlglot rewrites 'SELECT INTO' to 'CREATE TABLE AS' during parse()
-            # but it's not shown until we produce it with sql(), so we re-parse it
-            stmt = sqlglot.parse_one(stmt.sql(dialect=""), dialect=dialect)
-            kind = "ctas"
-        else:
-            kind = stmt.key.lower()
-
         if kind not in processors:
             unknown[kind] = unknown[kind] + 1 if kind in unknown else 1
             continue
 
-        # Convert the statement to uppercase if the dialect supports it
-        stmt = normalize_identifiers(stmt, dialect=dialect, store_original_column_identifiers=True)
-
         query: Query = processors[kind](statement=stmt, dialect=dialect, object_mapping=object_mapping, statement_index=index)
         if query:
+            query.fingerprint = parsed_stmt.fingerprint
+            query.template = parsed_stmt.template
+            query.span = statement.span
+            query.source_index = statement.source_index
             queries[_id] = query
+            seen.add(_id)
             counts[kind] += 1
 
+            if expand_bodies:
+                expand_body(query, object_mapping, workers, parse_cache)
+
     found = {k:v for k,v in counts.items() if v > 0}
     logger.debug("Found statements: %s", dict(found.items()))
     if unknown:
@@ -134,6 +276,327 @@ def collect_queries(text: str, dialect: str, object_mapping: mappings.ObjectMapp
     return list(queries.values())
 
 
+# Tokens whose text is compared exactly when fingerprinting; other tokens (keywords, operators) are compared in uppercase
+CASE_SENSITIVE_TOKENS = {tt for tt in TokenType if tt.name.endswith("STRING")} | {TokenType.VAR, TokenType.IDENTIFIER, TokenType.PARAMETER}
+
+
+# Tokens whose text is replaced by a placeholder in a statement's template. Dollar-quoted strings are kept,
+# as they are usually the bodies of functions and procedures rather than values.
+LITERAL_TOKENS = {
+    TokenType.NUMBER,
+    TokenType.STRING,
+    TokenType.NATIONAL_STRING,
+    TokenType.UNICODE_STRING,
+    TokenType.BIT_STRING,
+    TokenType.HEX_STRING,
+    TokenType.BYTE_STRING,
+}
+
+TEMPLATE_PLACEHOLDER = "?"
+
+
+@dataclass(frozen=True)
+class ParsedStatement:
+    statement: exp.Expression
+    kind: str = ""
+    fingerprint: str = ""  # Identical statements have identical fingerprints (see statement_fingerprint())
+    template: str = ""  # Statements that differ only in their literals have identical templates (see statement_template())
+
+    # The character offsets of the statement within the parsed text, as [start, end)
+    start: int = 0
+    end: int = 0
+
+
+@dataclass(frozen=True)
+class StatementToCollect:
+    index: int  # The position of the statement within its text
+    span: t.Tuple[int, int]  # The offsets of the statement within its text
+    parsed: ParsedStatement
+    source_index: t.Optional[int] = None  # The position of the statement's text, if there are several
+
+    def get_statement_index(self) -> str:
+        return str(self.index) if self.source_index is None else f"{self.source_index}/{self.index}"
+
+
+def statement_fingerprint(tokens: t.List[Token]) -> str:
+    """
+    Identify a statement from its tokens, without generating its SQL.
+
+    Whitespace, comments and the case of keywords are ignored, so statements that differ only
+    in their formatting have the same fingerprint.
+    """
+    parts = []
+    for token in tokens:
+        if token.token_type in CASE_SENSITIVE_TOKENS:
+            parts.append(f"{token.token_type.name}:{token.text}")
+        else:
+            parts.append(token.text.upper())
+    return util.long_sha256_hash("\x1f".join(parts))
+
+
+def statement_template(tokens: t.List[Token]) -> str:
+    """
+    Identify the template of a statement: statements that differ only in their literals
+    (e.g. WHERE id = 1 and WHERE id = 2) have the same template, as do IN lists of literals of any length
+    (e.g. IN (1, 2, 3)). Otherwise this is like statement_fingerprint().
+    """
+    parts = []
+    in_list = False  # Whether the tokens are directly within IN (...)
+
+    for token in tokens:
+        if token.token_type in (TokenType.L_PAREN, TokenType.R_PAREN):
+            in_list = token.token_type == TokenType.L_PAREN and parts[-1:] == ["IN"]
+
+        if token.token_type in LITERAL_TOKENS:
+            if in_list and parts[-2:] == [TEMPLATE_PLACEHOLDER, ","]:
+                # Collapse a list of literals into its first item
+                parts.pop()
+                continue
+            parts.append(TEMPLATE_PLACEHOLDER)
+        elif token.token_type in CASE_SENSITIVE_TOKENS:
+            parts.append(f"{token.token_type.name}:{token.text}")
+        else:
+            parts.append(token.text.upper())
+    return util.long_sha256_hash("\x1f".join(parts))
+
+
+def parse_statements(
+    text: str,
+    dialect: str,
+    workers: t.Optional[int] = None,
+    parse_cache: t.Optional[cache.ParseCache] = None,
+    skipped: t.Optional[t.Counter[str]] = None,
+    executor: t.Optional[Executor] = None,
+) -> t.List[t.Optional[ParsedStatement]]:
+    """
+    Parse SQL text into statements that are ready to be collected.
+
+    The text is tokenized once up front, which both fingerprints each statement and finds the
+    statements' boundaries exactly as sqlglot would.
+
+    With more than one worker, the statements are parsed and prepared in a pool of processes. The pool is
+    created for the call, unless an executor is given (e.g. to share one pool between many calls).
+    With a parse cache, statements that were parsed previously are loaded from it instead.
+    In either case the result (including its empty entries) is identical to parsing serially,
+    so statement indexes are unaffected.
+
+    If a `skipped` counter is given, statements that can't contribute to lineage (see prefilter.classify())
+    aren't parsed. Their entries are empty, and they are counted by category.
+    """
+    _dialect = Dialect.get_or_raise(dialect)
+    tokens = _dialect.tokenize(text)
+    chunks = _split_tokens(tokens)
+    fingerprints = [statement_fingerprint(chunk) for chunk in chunks]
+
+    parallel = workers is not None and workers > 1
+    if not parallel and not parse_cache and skipped is None:
+        statements = _dialect.parser().parse(tokens, text)
+        results = [_prepare_statement(stmt, dialect, fp) for stmt, fp in zip(statements, fingerprints)]
+        return _locate_statements(results, chunks, text)
+
+    results: t.List[t.Optional[ParsedStatement]] = [None] * len(chunks)
+    jobs = {}
+    keys = {}
+
+    for i, chunk in enumerate(chunks):
+        if not chunk:
+            continue
+        elif chunk[0].token_type == TokenType.SEMICOLON:
+            # A semicolon with comments is its own statement
+            semicolon = exp.Semicolon()
+            semicolon.add_comments(chunk[0].comments)
+            results[i] = _prepare_statement(semicolon, dialect, fingerprints[i])
+            continue
+
+        if skipped is not None:
+            category = prefilter.classify(chunk, dialect)
+            if category:
+                skipped[category] += 1
+                continue
+
+        if parse_cache:
+            keys[i] = parse_cache.key(dialect, fingerprints[i])
+            payload = parse_cache.get(keys[i])
+            if payload:
+                results[i] = _load_parsed_statement(payload)
+                continue
+
+        # Send only the statement's text (it's cheaper to re-tokenize than to pickle tokens),
+        # along with the comments attached from outside of it
+        jobs[i] = (text[chunk[0].start : chunk[-1].end + 1], chunk[0].comments, chunk[-1].comments, fingerprints[i])
+
+    if parse_cache:
+        logger.debug(f"Loaded {len(keys) - len(jobs)} of {len(keys)} statements from the parse cache")
+    if skipped:
+        logger.debug("Skipped statements: %s", dict(skipped.items()))
+
+    if parallel and len(jobs) > 1:
+        logger.debug(f"Parsing {len(jobs)} statements with {workers} workers")
+        chunksize = max(1, len(jobs) // (workers * 4))
+        parse = partial(_parse_statement_text, dialect=dialect)
+        if executor is not None:
+            payloads = list(executor.map(parse, jobs.values(), chunksize=chunksize))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                payloads = list(executor.map(parse, jobs.values(), chunksize=chunksize))
+
+        for i, payload in zip(jobs.keys(), payloads):
+            if payload:
+                results[i] = _load_parsed_statement(payload)
+                if parse_cache:
+                    parse_cache.put(keys[i], payload)
+    else:
+        # Parse the statements' existing tokens, rather than their text
+        parser = _dialect.parser()
+        for i in jobs.keys():
+            results[i] = _prepare_statement(parser.parse(chunks[i], text)[0], dialect, fingerprints[i])
+            if parse_cache and results[i]:
+                parse_cache.put(keys[i], (util.dump_expression(results[i].statement), results[i].kind, results[i].fingerprint))
+
+    return _locate_statements(results, chunks, text)
+
+
+def _locate_statements(
+    results: t.List[t.Optional[ParsedStatement]], chunks: t.List[t.List[Token]], text: str
+) -> t.List[t.Optional[ParsedStatement]]:
+    """
+    Add the offsets of each statement within the text, and its template (see statement_template()).
+
+    Dollar-quoted strings (e.g. a procedure's body in AS $$ ... $$) also record the offset of their
+    content relative to the start of the statement, in meta["offset"], so that the statements
+    inside them can be located too.
+    """
+    located = []
+    for parsed_stmt, chunk in zip(results, chunks):
+        if not parsed_stmt or not chunk:
+            located.append(parsed_stmt)
+            continue
+
+        start = chunk[0].start
+        quoted = [
+            token
+            for token in chunk
+            if token.token_type in (TokenType.HEREDOC_STRING, TokenType.RAW_STRING) and text[token.start] == "$"
+        ]
+        if quoted:
+            nodes = list(parsed_stmt.statement.find_all(exp.Heredoc, exp.RawString, bfs=False))
+            for token, node in zip(quoted, nodes):
+                # The content starts after the opening tag, e.g. $body$
+                node.meta["offset"] = text.index("$", token.start + 1) + 1 - start
+
+        located.append(replace(parsed_stmt, template=statement_template(chunk), start=start, end=chunk[-1].end + 1))
+
+    return located
+
+
+def _load_parsed_statement(payload: t.Tuple[t.List[t.Tuple], str, str]) -> ParsedStatement:
+    statement, kind, fingerprint = payload
+    return ParsedStatement(statement=util.load_expression(statement), kind=kind, fingerprint=fingerprint)
+
+
+def _split_tokens(tokens: t.List[Token]) -> t.List[t.List[Token]]:
+    """
+    Split tokens into one list per statement. This mirrors sqlglot's Parser._parse().
+    """
+    total = len(tokens)
+    chunks = [[]]
+
+    for i, token in enumerate(tokens):
+        if token.token_type == TokenType.SEMICOLON:
+            if token.comments:
+                chunks.append([token])
+
+            if i < total - 1:
+                chunks.append([])
+        else:
+            chunks[-1].append(token)
+
+    return chunks
+
+
+def _parse_statement_text(
+    job: t.Tuple[str, t.List[str], t.List[str], str], dialect: str
+) -> t.Optional[t.Tuple[t.List[t.Tuple], str, str]]:
+    """
+    Parse and prepare the text of a single statement, possibly inside a worker process.
+    """
+    text, leading_comments, trailing_comments, fingerprint = job
+    _dialect = Dialect.get_or_raise(dialect)
+
+    tokens = _dialect.tokenize(text)
+    tokens[0].comments = list(leading_comments)
+    tokens[-1].comments = list(trailing_comments)
+
+    stmt = _dialect.parser().parse(tokens, text)[0]
+    parsed_stmt = _prepare_statement(stmt, dialect, fingerprint)
+    if not parsed_stmt:
+        return None
+
+    # Pickling an expression loses its empty args, so it is flattened first
+    return util.dump_expression(parsed_stmt.statement), parsed_stmt.kind, parsed_stmt.fingerprint
+
+
+def _prepare_statement(stmt: t.Optional[exp.Expression], dialect: str, fingerprint: str) -> t.Optional[ParsedStatement]:
+    """
+    Determine a parsed statement's kind, and normalize it if it will be collected.
+    """
+    if not stmt:
+        return None
+
+    if isinstance(stmt, exp.Command):
+        return ParsedStatement(statement=stmt, fingerprint=fingerprint)
+
+    if stmt.key == "create":
+        if stmt.kind == "TABLE":
+            if isinstance(stmt.expression, (exp.Select, exp.Values)):
+                kind = "ctas"
+            else:
+                kind = "table"
+        else:
+            kind = stmt.kind.lower()
+    elif stmt.key == "select" and "into" in stmt.args:
+        # TODO: this is dialect-dependent! mysql converts, but postgres does not
+        stmt = _convert_select_into_to_ctas(stmt)
+        kind = "ctas"
+    else:
+        kind = stmt.key.lower()
+
+    if kind in get_query_processors():
+        # Convert the statement to uppercase if the dialect supports it
+        stmt = normalize_identifiers(stmt, dialect=dialect, store_original_column_identifiers=True)
+
+    return ParsedStatement(statement=stmt, kind=kind, fingerprint=fingerprint)
+
+
+def _convert_select_into_to_ctas(statement: exp.Select) -> exp.Create:
+    """
+    Convert 'SELECT ... INTO x' to 'CREATE TABLE x AS SELECT ...'.
+
+    This is the same rewrite that sqlglot performs when generating SQL for a dialect without
+    SELECT INTO, but applied to the expression directly rather than generating and re-parsing it.
+    The arguments match those of a parsed CTAS statement.
+    """
+    into = statement.args["into"].pop()
+    properties = exp.Properties(expressions=[exp.TemporaryProperty()]) if into.args.get("temporary") else None
+
+    return exp.Create(
+        this=into.this,
+        kind="TABLE",
+        replace=False,
+        refresh=False,
+        unique=False,
+        expression=statement,
+        exists=False,
+        properties=properties,
+        indexes=[],
+        no_schema_binding=None,
+        begin=None,
+        clone=None,
+        concurrently=False,
+        clustered=None,
+    )
+
+
 def _collect_writable_cte_queries(parent_query: Query, dialect: str, object_mapping: mappings.ObjectMapping):
     """
     Transform any writable CTE statements into a form.
@@ -251,19 +714,23 @@ def _set_column_defs(query: TableQuery, object_mapping: mappings.ObjectMapping):
             default.this.type = col_def.kind
 
     query.column_defs = all_columns
-    query.system_column_defs = _system_columns(dialect=query.dialect)
+    query.system_column_defs = system_columns(dialect=query.dialect)
 
 
-def _system_columns(dialect: str) -> t.List[exp.ColumnDef]:
+def system_columns(dialect: str) -> t.List[exp.ColumnDef]:
     """
-    Create a set of ColumnDefs representing system columns for a given dialect.
+    Get the ColumnDefs representing system columns for a given dialect.
+
+    They're built once per dialect and shared by every table, so they must not be modified.
     """
-    col_defs = []
-    if dialect == "postgres":
-        data_type = exp.DataType.build("OID", dialect="postgres")
-        col_defs = [exp.ColumnDef(this=exp.to_identifier(name), kind=data_type) for name in PSEUDOCOLUMNS]
+    if dialect not in SYSTEM_COLUMN_DEFS:
+        col_defs = ()
+        if dialect == "postgres":
+            data_type = exp.DataType.build("OID", dialect="postgres")
+            col_defs = tuple(exp.ColumnDef(this=exp.to_identifier(name), kind=data_type) for name in PSEUDOCOLUMNS)
+        SYSTEM_COLUMN_DEFS[dialect] = col_defs
 
-    return col_defs
+    return list(SYSTEM_COLUMN_DEFS[dialect])
 
 
 def _collect_inherited_columns(
@@ -277,9 +744,10 @@ def _collect_inherited_columns(
 
     for inh_prop in inherits_properties:
         for inh_table in inh_prop.expressions:
-            parent_table_query = object_mapping.find_query(kind="table", table=inh_table)
+            parent_table_query = object_mapping.find_query_to_modify(kind="table", table=inh_table)
             parent_table_query.inherited_by.append(query)
             query.inherits.append(parent_table_query)
+            object_mapping.add_inheritance(parent_table_query, query, [col_def.name for col_def in parent_table_query.column_defs])
 
             # Re-assign the columns to a copy of the correct table
             schema = util.copy_expression(query.child_table.parent)
@@ -319,9 +787,8 @@ def _collect_like_columns(like_property: exp.LikeProperty, object_mapping: mappi
                 if prop_expr:
                     for inner_col in prop_expr.find_all(exp.Column):
                         # A GENERATED column expression might refer to other columns
-                        try:
-                            referenced_parent_col_def = [c for c in parent_columns if c.name == inner_col.name][0]
-                        except IndexError:
+                        referenced_parent_col_def = parent_table_query.get_column_def(inner_col.name)
+                        if not referenced_parent_col_def:
                             message = f"Column '{inner_col.name}' does not exist in table '{child_table}'."
                             raise exception.SqlLeafException(message=message)
 
@@ -500,7 +967,7 @@ def _process_views_and_ctas(statement: exp.Create, dialect: str, object_mapping:
     elif stmt.kind == "TABLE":
         # CREATE TABLE AS ...
         query = CTASQuery(statement=stmt, dialect=dialect, columns=col_defs, statement_index=statement_index)
-        query.system_column_defs = _system_columns(dialect=dialect)
+        query.system_column_defs = system_columns(dialect=dialect)
 
     object_mapping.add_query(
         kind="table",
@@ -551,10 +1018,9 @@ def _process_functions(statement: exp.Create, dialect: str, object_mapping: mapp
     )
     object_mapping.add_query(kind="udf", query=query, dialect=dialect)
 
-    if isinstance(statement.expression, exp.Heredoc):
-        # Extract the queries between the $$ .. $$
-        queries = collect_queries(text=statement.expression.this, dialect=dialect, object_mapping=object_mapping)
-        query.add_child_queries(child_queries=queries)
+    if isinstance(statement.expression, exp.Heredoc) and (not language or language.lower() in PROCEDURE_SQL_LANGUAGES):
+        # The queries between the $$ .. $$ are collected as child queries afterwards
+        _set_body_statements(query, statement.expression)
 
     return query
 
@@ -571,21 +1037,54 @@ def _process_triggers(statement: exp.Create, dialect: str, object_mapping: mappi
 def _process_stored_procedures(statement: exp.Create, dialect: str, object_mapping: mappings.ObjectMapping, statement_index: int) -> Query:
     """
     Process a "CREATE PROCEDURE" statement.
+
+    The procedure's inner statements are split from its body here, and collected as its child queries when
+    its body is expanded (see expand_body()).
     """
     query = ProcedureQuery(statement=statement, dialect=dialect, statement_index=statement_index)
     object_mapping.add_query(kind="procedure", query=query, dialect=dialect)
-    # TODO: find a way to get each SP's text from a query that has multiple SPs defined in it.
-    #  sqlglot will parse the 2 SPs, but does not provide the original, raw text. This is imperfect
-    #  as we would like to keep the original text for various reasons.
-    transformed_text = clean_stored_procedure_text(query.statement_original.sql())
-    query.text_transformed = transformed_text
-
-    # The original text is lost, so we are forced to use the transformed text in its place for now
-    queries = collect_queries(text=transformed_text, dialect=dialect, object_mapping=object_mapping)
-    query.add_child_queries(child_queries=queries)
+
+    language = statement.find(exp.LanguageProperty)
+    if language and language.name.lower() not in PROCEDURE_SQL_LANGUAGES:
+        logger.debug(f"Skipping the body of a procedure written in {language.name}")
+        return query
+
+    body = _get_procedure_body(statement)
+    if body is not None:
+        _set_body_statements(query, body)
+    else:
+        # Any other body is generated from the statement instead, so its statements can't be located
+        query.text_transformed = clean_stored_procedure_text(query.statement_original.sql())
+        _set_body_statements(query, exp.Literal.string(query.text_transformed))
+
     return query
 
 
+def _set_body_statements(query: Query, body: exp.Expression):
+    """
+    Split a procedure's or function's body into the statements to collect as its child queries.
+    Only dollar-quoted bodies (e.g. AS $$ ... $$) can be located within the statement.
+    """
+    query.body_offset = body.meta.get("offset")
+
+    # Declarations, RAISE and RETURN statements, and exception handlers don't produce lineage
+    statements = splitter.split_block(body.name, query.dialect)
+    query.body_statements = [s for s in statements if s.kind == "statement" and s.section == "body"]
+
+
+def _get_procedure_body(statement: exp.Create) -> t.Optional[exp.Expression]:
+    """
+    Get the string that contains a procedure's body, if it has one.
+    Postgres parses a dollar-quoted body as a Heredoc, and Snowflake as a RawString within a Block.
+    """
+    body = statement.expression
+    if isinstance(body, exp.Block) and len(body.expressions) == 1:
+        body = body.expressions[0]
+    if isinstance(body, (exp.Heredoc, exp.RawString)) or (isinstance(body, exp.Literal) and body.is_string):
+        return body
+    return None
+
+
 def _process_stage(statement: exp.Create, dialect: str, object_mapping: mappings.ObjectMapping, statement_index: int) -> Query:
     query = StageQuery(statement, dialect, statement_index)
     object_mapping.add_query(kind="stage", query=query, dialect=dialect)
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import typing as t
+from dataclasses import dataclass
+
+import networkx as nx
+from sqlglot import exp
+
+from sqlleaf import exception, mappings
+from sqlleaf.objects.node_types import EdgeAttributes, NodeAttributes
+from sqlleaf.objects.query_types import Query
+from sqlleaf.processors import generator, reader, shapes
+
+logger = logging.getLogger("sqlleaf")
+
+"""
+Reads the models of a dbt project from its manifest (target/manifest.json), as the statements that create them.
+"""
+
+# dbt adapters whose name isn't the name of a sqlglot dialect
+ADAPTER_DIALECTS = {
+    "sqlserver": "tsql",
+    "fabric": "tsql",
+    "synapse": "tsql",
+}
+
+VIEW_MATERIALIZATIONS = ("view", "materialized_view")
+COMPILED_NODE_TYPES = ("model", "snapshot")
+DOCUMENTED_NODE_TYPES = ("source", "seed")  # Nodes whose columns are only known from their documentation
+DEFAULT_COLUMN_TYPE = "VARCHAR"  # For documented columns without a data type
+
+
+@dataclass(frozen=True)
+class DbtNode:
+    unique_id: str  # e.g. model.shop.orders
+    resource_type: str  # "model", "snapshot", "source" or "seed"
+    relation: str  # The node's relation, as written in compiled SQL, e.g. "analytics"."staging"."orders"
+    sql: str  # The statement that creates the node's relation
+    checksum: str  # The checksum of the node's file, if it has one
+    depends_on: t.Tuple[str, ...]  # The unique ids of the nodes that the node selects from
+
+
+@dataclass(frozen=True)
+class DbtManifest:
+    dialect: t.Optional[str]  # The dialect of the project's adapter, e.g. "snowflake"
+    nodes: t.List[DbtNode]  # In dependency order
+    relations: t.Dict[str, str]  # The relation of every node that has one, by unique id
+
+
+@dataclass(frozen=True)
+class ModelLineage:
+    """
+    The lineage of a model, as stored in the parse cache.
+    """
+
+    statement_index: str  # The statement index of the model when its lineage was generated
+    query_types: t.List[str]  # The class names of the model's queries, as given by Query.get_all_queries()
+
+    # The lineage's edges: the parent node, the child node, the position of the edge's query within the
+    # model's queries, and the edge's select and path indexes
+    edges: t.List[t.Tuple[NodeAttributes, NodeAttributes, int, int, int]]
+
+
+def read_manifest(path: str) -> DbtManifest:
+    """
+    Read the models, snapshots, seeds and sources of a dbt manifest, in dependency order.
+
+    Models and snapshots are created from their compiled SQL (so the manifest must be compiled, e.g. by `dbt compile`):
+    views as CREATE VIEW ... AS, and all other materializations as CREATE TABLE ... AS. Ephemeral models are skipped,
+    as dbt compiles them into the models that use them. Sources and seeds are created from their documented columns,
+    if they have any.
+    """
+    with reader.open_sql_file(path) as f:
+        manifest = json.load(f)
+
+    adapter = manifest.get("metadata", {}).get("adapter_type")
+    dialect = ADAPTER_DIALECTS.get(adapter, adapter)
+
+    entries = {**manifest.get("sources", {}), **manifest.get("nodes", {})}
+    relations = {unique_id: relation for unique_id, entry in entries.items() if (relation := _relation(entry, dialect))}
+    nodes = {}
+
+    for unique_id, entry in entries.items():
+        resource_type = entry.get("resource_type")
+        relation = relations.get(unique_id)
+
+        if resource_type in COMPILED_NODE_TYPES:
+            if entry.get("config", {}).get("materialized") == "ephemeral" or not relation:
+                continue
+            sql = _create_from_compiled_sql(entry, relation)
+        elif resource_type in DOCUMENTED_NODE_TYPES and relation:
+            sql = _create_from_columns(entry, relation, dialect)
+            if not sql:
+                logger.warning(f"The {resource_type} '{unique_id}' has no documented columns, so it must be created beforehand")
+                continue
+        else:
+            continue
+
+        nodes[unique_id] = DbtNode(
+            unique_id=unique_id,
+            resource_type=resource_type,
+            relation=relation,
+            sql=sql,
+            checksum=entry.get("checksum", {}).get("checksum", ""),
+            depends_on=tuple(entry.get("depends_on", {}).get("nodes", [])),
+        )
+
+    # Order the nodes so that each one comes after its dependencies, and otherwise by its position in the manifest
+    graph = nx.DiGraph()
+    positions = {unique_id: i for i, unique_id in enumerate(nodes)}
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from((dependency, node.unique_id) for node in nodes.values() for dependency in node.depends_on if dependency in nodes)
+    order = nx.lexicographical_topological_sort(graph, key=positions.get)
+
+    return DbtManifest(dialect=dialect, nodes=[nodes[unique_id] for unique_id in order], relations=relations)
+
+
+def lineage_key(node: DbtNode, manifest: DbtManifest, object_mapping: mappings.ObjectMapping) -> str:
+    """
+    Identify the lineage of a model by its checksum, its statement, and the columns of the relations it selects from.
+    Its lineage can be reused as long as none of these have changed.
+    """
+    upstream = []
+    for unique_id in node.depends_on:
+        relation = manifest.relations.get(unique_id)
+        if relation:
+            columns = object_mapping.find_columns_for_table(exp.to_table(relation, dialect=object_mapping.dialect), raise_on_missing=False)
+            upstream.append((relation, columns))
+
+    text = json.dumps([node.unique_id, node.checksum, node.sql, upstream], default=str)
+    return "dbt:" + hashlib.sha256(text.encode()).hexdigest()
+
+
+def record_lineage(parent_query: Query, graph: nx.MultiDiGraph) -> ModelLineage:
+    """
+    Convert the lineage of a model into a form that can be stored without its queries.
+    """
+    queries = parent_query.get_all_queries()
+    positions = {id(query): i for i, query in enumerate(queries)}
+    edges = []
+
+    for _, _, data in graph.edges(data=True):
+        edge: EdgeAttributes = data["attrs"]
+        edges.append((edge.parent, edge.child, positions[id(edge.query)], edge.select_idx, edge.path_idx))
+
+    return ModelLineage(
+        statement_index=parent_query.get_statement_index(),
+        query_types=[type(query).__name__ for query in queries],
+        edges=edges,
+    )
+
+
+def instantiate_lineage(lineage: ModelLineage, parent_query: Query, graph: nx.MultiDiGraph) -> bool:
+    """
+    Add the lineage of a model to the graph from its stored lineage.
+    Return False, leaving the graph unchanged, if the stored lineage doesn't match the model's queries.
+    """
+    queries = parent_query.get_all_queries()
+    if [type(query).__name__ for query in queries] != lineage.query_types:
+        return False
+
+    new_index = parent_query.get_statement_index()
+    nodes: t.Dict[int, NodeAttributes] = {}
+
+    for parent, child, position, select_idx, path_idx in lineage.edges:
+        for node in (parent, child):
+            if id(node) not in nodes:
+                nodes[id(node)] = generator.add_node_if_not_exists(shapes.copy_node(node, lineage.statement_index, new_index), graph)
+
+        edge_attrs = EdgeAttributes(
+            parent=nodes[id(parent)],
+            child=nodes[id(child)],
+            query=queries[position],
+            select_idx=select_idx,
+            path_idx=path_idx,
+        )
+        graph.add_edge(edge_attrs.parent.full_name, edge_attrs.child.full_name, attrs=edge_attrs)
+
+    return True
+
+
+def _relation(entry: t.Dict[str, t.Any], dialect: t.Optional[str]) -> t.Optional[str]:
+    if entry.get("relation_name"):
+        return entry["relation_name"]
+
+    name = entry.get("identifier") or entry.get("alias") or entry.get("name")
+    if not name or not entry.get("schema"):
+        return None
+    return exp.table_(name, db=entry["schema"], catalog=entry.get("database")).sql(dialect=dialect)
+
+
+def _create_from_compiled_sql(entry: t.Dict[str, t.Any], relation: str) -> str:
+    compiled_sql = entry.get("compiled_code", entry.get("compiled_sql"))
+    if not compiled_sql:
+        raise exception.SqlLeafException(message=f"The {entry['resource_type']} '{entry['unique_id']}' has no compiled SQL. Run `dbt compile` first.")
+
+    kind = "VIEW" if entry.get("config", {}).get("materialized") in VIEW_MATERIALIZATIONS else "TABLE"
+    # Compiled SQL may end with a semicolon or a line comment
+    return f"CREATE {kind} {relation} AS\n{compiled_sql.strip().rstrip(';')}\n"
+
+
+def _create_from_columns(entry: t.Dict[str, t.Any], relation: str, dialect: t.Optional[str]) -> t.Optional[str]:
+    columns = entry.get("columns") or {}
+    if not columns:
+        return None
+
+    column_defs = [
+        exp.ColumnDef(
+            this=exp.to_identifier(column.get("name") or name),
+            kind=exp.DataType.build(column.get("data_type") or DEFAULT_COLUMN_TYPE, dialect=dialect, udt=True),
+        )
+        for name, column in columns.items()
+    ]
+    schema = exp.Schema(this=exp.to_table(relation, dialect=dialect), expressions=column_defs)
+    return exp.Create(this=schema, kind="TABLE").sql(dialect=dialect)
@@ -36,6 +36,8 @@ class EdgeToCreate:
 class BaseGenerator:
     # A registry to store subclasses
     _dialects = {}
+    # The instance of each dialect's class. Generators have no state of their own, so one is shared by every query
+    _instances = {}
     dialect = ""
 
     @util.singledispatchmethodlogger
@@ -49,11 +51,13 @@ class BaseGenerator:
 
     @classmethod
     def from_dialect(cls, class_name, *args, **kwargs):
-        """Instantiates a class from the registry by name."""
-        target_class = cls._dialects.get(class_name)
-        if not target_class:
-            raise exception.SqlLeafException(message=f"Unknown dialect: {class_name}")
-        return target_class()
+        """Instantiates a class from the registry by name, once."""
+        if class_name not in cls._instances:
+            target_class = cls._dialects.get(class_name)
+            if not target_class:
+                raise exception.SqlLeafException(message=f"Unknown dialect: {class_name}")
+            cls._instances[class_name] = target_class()
+        return cls._instances[class_name]
 
     def do_grandparents(self, grandparents: t.List[exp.Expression], parent: NodeAttributes, processor_ctx: ProcessorContext, ctx: NodeContext) -> t.Iterator[EdgeToCreate]:
         """
@@ -281,7 +285,7 @@ class BaseGenerator:
     @process.register(exp.ColumnDef)
     @process.register(exp.Table)
     def skip(self, expr: exp.Expression, processor_ctx: ProcessorContext, ctx: NodeContext) -> t.Iterator[EdgeToCreate]:
-        logger.debug(f"Skipping expression: {type(expr)} {str(expr)}")
+        logger.debug("Skipping expression: %s %s", type(expr), util.LazySQL(expr))
         yield EdgeToCreate(None, None)
 
     @process.register
@@ -11,7 +11,7 @@ from sqlglot.optimizer import Scope, build_scope, find_all_in_scope, traverse_sc
 if t.TYPE_CHECKING:
     pass
 
-from sqlleaf import util, exception, mappings
+from sqlleaf import budget, util, exception, mappings
 from sqlleaf.objects.context import ProcessorContext, NodeContext
 from sqlleaf.objects.node_types import EdgeAttributes, NodeAttributes, StageNode, ColumnNode, TableType
 from sqlleaf.objects.query_types import Query, UpdateQuery, CopyQuery, PutQuery, TableQuery
@@ -35,7 +35,7 @@ def generate_column_lineage_for_query(
     child_table = query.child_table
     statement = query.statement
 
-    logger.info(f"Getting lineage for query: {statement.sql(dialect=query.dialect)}")
+    logger.info("Getting lineage for query: %s", util.LazySQL(statement, dialect=query.dialect))
 
     ctx = NodeContext(statement_index=query.get_statement_index())
     processor_ctx = ProcessorContext(
@@ -71,9 +71,11 @@ def generate_column_lineage_for_columns(
     """
     scope = get_scope(statement=processor_ctx.query.statement)
     scope_positions = calculate_scope_positions(scope)
+    processor_ctx = replace(processor_ctx, scope_selects={})
 
     # Process the selected columns
     for selected_node, default_node in _get_column_nodes_for_table(processor_ctx, ctx):
+        budget.checkpoint()
         child_node = selected_node or default_node
         logger.info(
             "Calculating lineage. Column: %s, Table: %s, Index: %s",
@@ -122,7 +124,7 @@ def _get_column_nodes_for_table(processor_ctx: ProcessorContext, ctx: NodeContex
             ctx=ctx,
         )
 
-        if isinstance(query, TableQuery) or child_node.column in query.get_selected_column_names():
+        if isinstance(query, TableQuery) or query.is_column_selected(child_node.column):
             # A 'CREATE TABLE' has no SELECT, so include all columns
             selected_node = child_node
 
@@ -150,6 +152,7 @@ def walk_query_and_build_graph(
     for scope_traversal in walk_query_scope(
         column=child_node_attrs.expr,
         scope=scope,
+        selects_by_name=processor_ctx.scope_selects,
     ):
         logger.debug("----")
         if isinstance(query, CopyQuery) and query.is_target_a_stage:
@@ -157,7 +160,7 @@ def walk_query_and_build_graph(
             processor_ctx = replace(processor_ctx, expr=query.target.this)
             child_node_attrs = StageNode(processor_ctx=processor_ctx, ctx=ctx)
 
-        logger.debug(f"Processing node expr: {scope_traversal.expression}, Id: {id(scope_traversal)}")
+        logger.debug("Processing node expr: %s, Id: %s", util.LazySQL(scope_traversal.expression), id(scope_traversal))
         logger.debug(f"Child node: {child_node_attrs.full_name}")
 
         height, width = scope_positions[id(scope_traversal.scope.expression)]
@@ -179,7 +182,9 @@ def walk_query_and_build_graph(
                     walk_query_and_build_graph(generator, n, n.source_scope, scope_positions, processor_ctx, ctx)
 
 
-def walk_query_scope(column: exp.Column, scope: Scope) -> t.Generator[ScopeTraversal]:
+def walk_query_scope(
+    column: exp.Column, scope: Scope, selects_by_name: t.Optional[t.Dict[int, t.Dict[str, t.List[exp.Expression]]]] = None
+) -> t.Generator[ScopeTraversal]:
     """
     Walk over each query scope (i.e. a SELECT statement) and return the expression linked to the column.
     """
@@ -190,6 +195,7 @@ def walk_query_scope(column: exp.Column, scope: Scope) -> t.Generator[ScopeTrave
             yield from walk_query_scope(
                 column=column,
                 scope=source,
+                selects_by_name=selects_by_name,
             )
     elif isinstance(scope.expression, exp.SetOperation):
         # UNION, EXCEPT, etc
@@ -200,16 +206,17 @@ def walk_query_scope(column: exp.Column, scope: Scope) -> t.Generator[ScopeTrave
             yield from walk_query_scope(
                 column=index,
                 scope=s,
+                selects_by_name=selects_by_name,
             )
     else:
         # Create the node for this step in the lineage chain, and attach it to the previous one.
-        select = get_expression_for_column(column, scope.expression)
+        select = get_expression_for_column(column, scope.expression, selects_by_name)
         st = ScopeTraversal(
             expression=select,
             scope=scope,
         )
         yield st
-        logger.debug("[1] Created Node '%s', Expr: %s, Id: %s", column, select.sql(), id(st))
+        logger.debug("[1] Created Node '%s', Expr: %s, Id: %s", column, util.LazySQL(select), id(st))
 
 
 def walk_expressions_and_build_graph(
@@ -274,6 +281,11 @@ def find_inherited_columns_for_parent(
     if not column_node.expr.parent_select:
         return []
 
+    # Most columns belong to tables that nothing inherits from
+    inheritors = processor_ctx.object_mapping.find_inheritors(column_node.table_parts(), column_node.column)
+    if not inheritors:
+        return []
+
     inherited_columns = []
     for table in column_node.expr.parent_select.find_all(exp.Table):
         if table.catalog == column_node.catalog and table.db == column_node.schema and table.name == column_node.table:
@@ -281,7 +293,9 @@ def find_inherited_columns_for_parent(
             if parent_table.args.get("only", False):
                 inherited_columns = []
             else:
-                inherited_columns = find_inherited_columns(column_node=column_node, generator=generator, processor_ctx=processor_ctx, ctx=ctx)
+                inherited_columns = find_inherited_columns(
+                    column_node=column_node, inheritors=inheritors, generator=generator, processor_ctx=processor_ctx, ctx=ctx
+                )
                 logger.debug(f"Including inherited columns as sources: {[c.friendly_name for c in inherited_columns]}")
 
     return inherited_columns
@@ -299,17 +313,21 @@ def find_inherited_columns_for_child(
 
     # Only return inherited columns for UPDATE
     if isinstance(processor_ctx.query, UpdateQuery) and not processor_ctx.query.only:
-        inherited_columns = find_inherited_columns(column_node=column_node, generator=generator, processor_ctx=processor_ctx, ctx=ctx)
+        inheritors = processor_ctx.object_mapping.find_inheritors(column_node.table_parts(), column_node.column)
+        inherited_columns = find_inherited_columns(
+            column_node=column_node, inheritors=inheritors, generator=generator, processor_ctx=processor_ctx, ctx=ctx
+        )
         logger.debug(f"Including inherited columns as targets: {[c.friendly_name for c in inherited_columns]}")
 
     return inherited_columns
 
 
 def find_inherited_columns(
-    column_node: ColumnNode, generator: BaseGenerator, processor_ctx: ProcessorContext, ctx: NodeContext
+    column_node: ColumnNode, inheritors: t.List[TableQuery], generator: BaseGenerator, processor_ctx: ProcessorContext, ctx: NodeContext
 ) -> t.List[ColumnNode]:
     """
-    Find all inherited columns from a table that are similar to some column.
+    Find all inherited columns from a table that are similar to some column, given the tables that inherit it
+    (see ObjectMapping.find_inheritors()).
 
     For example, if we have
         CREATE TABLE a (name VARCHAR);
@@ -317,12 +335,10 @@ def find_inherited_columns(
     then whenever we process column `a.name`, we also need to include `b.name`.
     """
     inherited_column_nodes = []
-    table = column_node.as_table()
-    table_query = processor_ctx.object_mapping.find_query(kind="table", table=table)
 
     # Collect any columns from inherited tables with the same name
-    for inh_table in table_query.inherited_by:
-        col_def = [c for c in inh_table.get_column_defs() if c.name == column_node.column][0]
+    for inh_table in inheritors:
+        col_def = inh_table.get_column_def(column_node.column)
         col = util.column_def_to_column(column_def=col_def, parent_table=inh_table.child_table)
         col_ctx = replace(processor_ctx, expr=col, scope=None)  # Remove the node so that the column isn't renamed
         for edge in generator.process_column(col, col_ctx, ctx):
@@ -393,10 +409,14 @@ def get_scope(statement: exp.Expression) -> Scope:
     return scope
 
 
-def get_expression_for_column(column: exp.Column | int, expr: exp.Expression) -> exp.Expression:
+def get_expression_for_column(
+    column: exp.Column | int, expr: exp.Expression, selects_by_name: t.Optional[t.Dict[int, t.Dict[str, t.List[exp.Expression]]]] = None
+) -> exp.Expression:
     """
     Get the expression that matches the given column name.
     e.g. given "SELECT 1 AS a, 2 AS b", column 'b' maps to expression 2.
+
+    If given `selects_by_name`, the selects of each expression are only named once, rather than once per column.
     """
     if isinstance(column, int):
         # The index of the query in "SELECT 1 UNION SELECT 2"
@@ -405,8 +425,15 @@ def get_expression_for_column(column: exp.Column | int, expr: exp.Expression) ->
         if isinstance(expr, exp.Values):
             # SELECT FROM (VALUES ())
             selects = [expr]
-        else:
+        elif selects_by_name is not None:
             # Common path
+            if id(expr) not in selects_by_name:
+                names = {}
+                for select in expr.selects:
+                    names.setdefault(select.alias_or_name, []).append(select)
+                selects_by_name[id(expr)] = names
+            selects = selects_by_name[id(expr)].get(column.name, [])
+        else:
             selects = [select for select in expr.selects if select.alias_or_name == column.name]
 
         if len(selects) > 1:
@@ -461,7 +488,7 @@ def calculate_scope_positions(scope: Scope) -> t.Dict[int, t.Dict[int, int]]:
         node_id = id(node)
 
         if node_id in scopes:
-            logger.debug(f"Found scope expr ({node.__class__.__name__}): {node.sql()}")
+            logger.debug("Found scope expr (%s): %s", node.__class__.__name__, util.LazySQL(node))
 
             if not expr_ids_to_positions:   # Root node
                 expr_ids_to_positions[node_id] = (0, 0)
@@ -0,0 +1,155 @@
+import logging
+import mmap
+import os
+import re
+import typing as t
+from collections import Counter
+
+from sqlleaf.processors import reader
+from sqlleaf.processors.splitter import RawStatement, StatementSplitter
+
+logger = logging.getLogger("sqlleaf")
+
+"""
+Reads the plain-text dumps created by pg_dump, skipping their data without parsing it.
+"""
+
+# A COPY statement whose data follows it in the dump, up to a line containing only \.
+COPY_FROM_STDIN_PATTERN = re.compile(r"COPY\s.*\sFROM\s+stdin$", re.IGNORECASE | re.DOTALL)
+
+# The part of an INSERT ... VALUES statement that is the same for every row of a table (pg_dump --inserts),
+# e.g. INSERT INTO public.fruit (id, name) VALUES
+INSERT_SHAPE_PATTERN = re.compile(r"INSERT\s+INTO\s+[^\s(]+(?:\s*\([^)]*\))?\s+(?:OVERRIDING\s+\w+\s+VALUE\s+)?VALUES\b", re.IGNORECASE)
+
+# The whitespace and comments before a statement, e.g. the "-- Data for Name: ..." header that pg_dump writes before each table's data
+LEADING_COMMENTS_PATTERN = re.compile(r"(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/)*", re.DOTALL)
+
+COPY_TERMINATOR = b"\\."
+
+# UTF-8 bytes that continue a character, which are excluded when counting characters
+CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+CHUNK_SIZE = 16 * 1024 * 1024  # The number of bytes of COPY data to count at a time
+
+
+def split_dump(path: str, skipped: t.Optional[t.Counter[str]] = None) -> t.Generator[RawStatement]:
+    """
+    Split a pg_dump file into its statements, as splitter.split_statements() would, except that:
+      - The data following each COPY ... FROM stdin is skipped without being scanned line by line,
+        and the COPY statement itself is dropped, as its data comes from the dump rather than from another table.
+      - Of each run of INSERT ... VALUES statements into the same table and columns, only the first is kept,
+        as the others only differ in their values.
+
+    Uncompressed files are memory-mapped. Statement indexes and offsets include everything that was skipped,
+    so they still locate statements within the file. Skipped statements are counted in `skipped` by category
+    ("copy" and "insert"), along with the number of rows of COPY data ("copy data").
+    """
+    skipped = Counter() if skipped is None else skipped
+
+    if path.endswith(".gz"):
+        with reader.open_sql_file(path) as f:
+            yield from _collapse_inserts(_split_lines(_TextLines(f), skipped), skipped)
+        return
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from _collapse_inserts(_split_lines(_MappedLines(mm), skipped), skipped)
+
+
+def _split_lines(lines: t.Union["_MappedLines", "_TextLines"], skipped: t.Counter[str]) -> t.Generator[RawStatement]:
+    splitter = StatementSplitter()
+
+    for line in iter(lines.readline, ""):
+        # pg_dump ends the line after a COPY statement, so its data starts on the next line
+        for statement in list(splitter.feed(line)):
+            if COPY_FROM_STDIN_PATTERN.match(_without_leading_comments(statement.text)):
+                rows, length = lines.skip_copy_data()
+                splitter.skip(length)
+                skipped["copy"] += 1
+                skipped["copy data"] += rows
+            else:
+                yield statement
+
+    yield from splitter.close()
+
+
+def _collapse_inserts(statements: t.Iterable[RawStatement], skipped: t.Counter[str]) -> t.Generator[RawStatement]:
+    shape = None  # The shape of the previous statement, if it was an INSERT ... VALUES
+
+    for statement in statements:
+        match = INSERT_SHAPE_PATTERN.match(_without_leading_comments(statement.text))
+        if match and match.group() == shape:
+            skipped["insert"] += 1
+            continue
+
+        shape = match.group() if match else None
+        yield statement
+
+
+def _without_leading_comments(text: str) -> str:
+    return text[LEADING_COMMENTS_PATTERN.match(text).end() :]
+
+
+class _MappedLines:
+    """
+    The lines of a memory-mapped file.
+    """
+
+    def __init__(self, mm: mmap.mmap):
+        self.mm = mm
+
+    def readline(self) -> str:
+        return self.mm.readline().decode("utf-8")
+
+    def skip_copy_data(self) -> t.Tuple[int, int]:
+        """
+        Move past the COPY data at the current position and its terminating line.
+        Return the number of rows, and the number of characters that were skipped.
+        """
+        mm = self.mm
+        start = mm.tell()
+
+        # Find the terminator at the start of a line. A backslash within the data is always escaped (\\).
+        end = start
+        while not (mm[end : end + 2] == COPY_TERMINATOR and mm[end + 2 : end + 3] in (b"\n", b"\r", b"")):
+            found = mm.find(b"\n" + COPY_TERMINATOR, end)
+            if found == -1:
+                logger.warning("COPY data has no terminator; skipping to the end of the file")
+                end = len(mm)
+                break
+            end = found + 1
+
+        line_end = mm.find(b"\n", end)
+        line_end = len(mm) if line_end == -1 else line_end + 1
+
+        rows = length = 0
+        for chunk_start in range(start, line_end, CHUNK_SIZE):
+            chunk = mm[chunk_start : min(chunk_start + CHUNK_SIZE, line_end)]
+            length += len(chunk.translate(None, CONTINUATION_BYTES))
+            rows += chunk.count(b"\n", 0, max(0, end - chunk_start))  # Excluding the terminator's line
+
+        mm.seek(line_end)
+        return rows, length
+
+
+class _TextLines:
+    """
+    The lines of a file object, e.g. a gzipped file that can't be memory-mapped.
+    """
+
+    def __init__(self, f: t.TextIO):
+        self.f = f
+
+    def readline(self) -> str:
+        return self.f.readline()
+
+    def skip_copy_data(self) -> t.Tuple[int, int]:
+        rows = length = 0
+        for line in iter(self.f.readline, ""):
+            length += len(line)
+            if line.rstrip("\r\n") == "\\.":
+                break
+            rows += 1
+        return rows, length
@@ -0,0 +1,108 @@
+import typing as t
+
+from sqlglot.tokens import Token, TokenType
+
+"""
+Decides from a statement's leading keywords whether it can contribute to lineage, so that
+statements that can't (e.g. GRANT, SET, VACUUM) don't need to be parsed.
+"""
+
+# The leading keywords of statements that may create objects or contain lineage
+CONTRIBUTING_KEYWORDS = {"CREATE", "INSERT", "UPDATE", "MERGE", "DELETE", "COPY", "PUT", "WITH", "SELECT", "(", "TABLE"}
+
+# Additional leading keywords for specific dialects
+DIALECT_CONTRIBUTING_KEYWORDS = {
+    "mysql": {"REPLACE"},
+    "sqlite": {"REPLACE"},
+    "databricks": {"REPLACE"},
+}
+
+# The categories under which skipped statements are counted, by leading keyword. Others are counted as "other".
+SKIPPED_CATEGORIES = {
+    "GRANT": "grant",
+    "REVOKE": "grant",
+    "COMMENT": "comment",
+    "SET": "set",
+    "RESET": "set",
+    "SHOW": "set",
+    "USE": "set",
+    "ANALYZE": "maintenance",
+    "ANALYSE": "maintenance",
+    "VACUUM": "maintenance",
+    "REINDEX": "maintenance",
+    "CLUSTER": "maintenance",
+    "CHECKPOINT": "maintenance",
+    "REFRESH": "maintenance",
+    "BEGIN": "transaction",
+    "START": "transaction",
+    "COMMIT": "transaction",
+    "END": "transaction",
+    "ROLLBACK": "transaction",
+    "ABORT": "transaction",
+    "SAVEPOINT": "transaction",
+    "RELEASE": "transaction",
+    "DROP": "drop",
+    "TRUNCATE": "truncate",
+    "ALTER": "alter",
+}
+
+# The words that may follow BEGIN when it starts a transaction rather than a block
+TRANSACTION_WORDS = {"TRANSACTION", "WORK", "ISOLATION", "READ", "NAME"}
+
+# The objects that CREATE statements may create without contributing to lineage
+SKIPPED_CREATE_KINDS = {
+    "INDEX",
+    "SCHEMA",
+    "DATABASE",
+    "ROLE",
+    "USER",
+    "GROUP",
+    "EXTENSION",
+    "TYPE",
+    "DOMAIN",
+    "POLICY",
+    "PUBLICATION",
+    "SUBSCRIPTION",
+    "SERVER",
+    "WAREHOUSE",
+}
+
+# Words that may appear between CREATE and the kind of object
+CREATE_MODIFIERS = {"OR", "REPLACE", "UNIQUE", "IF", "NOT", "EXISTS", "CONCURRENTLY"}
+
+
+def classify(tokens: t.List[Token], dialect: str) -> t.Optional[str]:
+    """
+    Get the category of a statement that can't contribute to lineage or to the object mapping,
+    or None if it may. Only the statement's leading keywords are inspected (and for SELECT, whether it has an INTO).
+    """
+    words = [token.text.upper() for token in tokens[:4]]
+    first = words[0]
+
+    if first == "SELECT":
+        # SELECT ... INTO creates a table
+        return None if _has_top_level_into(tokens) else "select"
+    elif first == "CREATE":
+        kind = next((word for word in words[1:] if word not in CREATE_MODIFIERS), "")
+        return f"create {kind.lower()}" if kind in SKIPPED_CREATE_KINDS else None
+    elif first in CONTRIBUTING_KEYWORDS or first in DIALECT_CONTRIBUTING_KEYWORDS.get(dialect, ()):
+        return None
+    elif first == "BEGIN" and len(words) > 1 and words[1] not in TRANSACTION_WORDS:
+        # An anonymous block, e.g. BEGIN INSERT INTO ...
+        return None
+    elif first == "ALTER" and any(token.text.upper() == "OWNER" for token in tokens):
+        return "owner"
+
+    return SKIPPED_CATEGORIES.get(first, "other")
+
+
+def _has_top_level_into(tokens: t.List[Token]) -> bool:
+    depth = 0
+    for token in tokens:
+        if token.token_type == TokenType.L_PAREN:
+            depth += 1
+        elif token.token_type == TokenType.R_PAREN:
+            depth -= 1
+        elif token.token_type == TokenType.INTO and depth == 0:
+            return True
+    return False
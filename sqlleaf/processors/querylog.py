@@ -0,0 +1,48 @@
+import logging
+import typing as t
+from dataclasses import dataclass
+
+from sqlglot.dialects import Dialect
+
+from sqlleaf import exception
+from sqlleaf.processors import collector, reader
+
+logger = logging.getLogger("sqlleaf")
+
+"""
+Reads query history (e.g. exported from a warehouse's query log) and groups its queries by template.
+"""
+
+
+@dataclass(frozen=True)
+class LoggedQuery:
+    index: int  # The position of the query's row within the log
+    text: str
+    count: int  # The number of times the query was run
+
+
+def read_query_log(path: str, text_column: str, count_column: t.Optional[str] = None) -> t.Generator[LoggedQuery]:
+    """
+    Read the queries of a query log, one row at a time.
+
+    The log may be a CSV file with a header row, or a JSON Lines file with one object per row, optionally gzipped.
+    Each row is counted as having run once, unless a count column is given (e.g. when the log is already aggregated).
+    """
+    for index, row in enumerate(reader.read_rows(path)):
+        if text_column not in row:
+            raise exception.SqlLeafException(message=f"Query log row {index} has no column '{text_column}': {path}")
+
+        text = row[text_column]
+        if not text or not text.strip():
+            continue
+
+        count = row.get(count_column) if count_column else None
+        yield LoggedQuery(index=index, text=text, count=int(count) if count not in (None, "") else 1)
+
+
+def template_fingerprint(text: str, dialect: str) -> str:
+    """
+    Identify the template of one or more statements (see collector.statement_template()).
+    """
+    return collector.statement_template(Dialect.get_or_raise(dialect).tokenize(text))
+
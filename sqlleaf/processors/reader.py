@@ -0,0 +1,99 @@
+import csv
+import glob
+import gzip
+import json
+import logging
+import os
+import sys
+import typing as t
+
+from sqlleaf import exception
+
+logger = logging.getLogger("sqlleaf")
+
+PathsType = t.Union[str, os.PathLike, t.Iterable[t.Union[str, os.PathLike]]]
+
+SQL_FILE_SUFFIXES = (".sql", ".sql.gz")
+CSV_SUFFIXES = (".csv",)
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson", ".json")
+
+
+"""
+Locates and opens the files containing SQL statements, and the tabular files describing them (e.g. query logs).
+"""
+
+
+def expand_paths(paths: PathsType) -> t.List[str]:
+    """
+    Expand a path, a glob pattern, or a list of either into a sorted list of files.
+
+    Directories are searched recursively for files ending in .sql or .sql.gz.
+    Files are returned in the order given, with each glob or directory sorted by name,
+    as statements must be provided in the order in which they depend on each other.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+
+    files = []
+    for path in paths:
+        path = os.fspath(path)
+
+        if os.path.isdir(path):
+            matches = [
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in names
+                if name.endswith(SQL_FILE_SUFFIXES)
+            ]
+        elif glob.has_magic(path):
+            matches = [p for p in glob.glob(path, recursive=True) if os.path.isfile(p)]
+        elif os.path.isfile(path):
+            matches = [path]
+        else:
+            raise exception.SqlLeafException(message=f"File not found: {path}")
+
+        files.extend(sorted(matches))
+
+    logger.debug(f"Found {len(files)} files to read")
+    return files
+
+
+def open_sql_file(path: str) -> t.TextIO:
+    """
+    Open a file of SQL statements for reading as text. Gzipped files are decompressed transparently.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode="rt", encoding="utf-8")
+    return open(path, mode="r", encoding="utf-8")
+
+
+def read_rows(path: str) -> t.Generator[t.Dict[str, t.Any]]:
+    """
+    Read the rows of a CSV file with a header row, or of a JSON Lines file with one object per row, optionally gzipped.
+    """
+    name = path[: -len(".gz")] if path.endswith(".gz") else path
+    if name.endswith(CSV_SUFFIXES):
+        rows = _read_csv_rows
+    elif name.endswith(JSON_LINES_SUFFIXES):
+        rows = _read_json_lines_rows
+    else:
+        raise exception.SqlLeafException(message=f"Unknown file format (expected .csv or .jsonl): {path}")
+
+    with open_sql_file(path) as f:
+        yield from rows(f)
+
+
+def _read_csv_rows(f: t.TextIO) -> t.Generator[t.Dict[str, str]]:
+    # Query text can easily exceed the default limit of 128KB per field.
+    # The limit is global to the process, so it's only raised while the rows are read.
+    previous = csv.field_size_limit(sys.maxsize)
+    try:
+        yield from csv.DictReader(f)
+    finally:
+        csv.field_size_limit(previous)
+
+
+def _read_json_lines_rows(f: t.TextIO) -> t.Generator[t.Dict[str, t.Any]]:
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
@@ -0,0 +1,142 @@
+import logging
+import typing as t
+from dataclasses import dataclass
+
+import networkx as nx
+from sqlglot import exp
+
+logger = logging.getLogger("sqlleaf")
+
+"""
+Orders statements so that every object is created before the statements that use it.
+"""
+
+# The kinds of statement (see collector.get_query_processors()) that create an object, and the object's namespace.
+# Tables, views and sequences share a namespace, as a statement may refer to any of them by the same name.
+CREATED_OBJECT_NAMESPACES = {
+    "table": "table",
+    "ctas": "table",
+    "view": "table",
+    "sequence": "table",
+    "stage": "stage",
+    "function": "function",
+    "procedure": "procedure",
+}
+
+ObjectType = t.Tuple[str, str]  # e.g. ("table", "fruit.raw")
+
+
+@dataclass(frozen=True)
+class StatementObjects:
+    # The objects that a statement creates, and the objects that it uses
+    creates: t.FrozenSet[ObjectType] = frozenset()
+    references: t.FrozenSet[ObjectType] = frozenset()
+
+
+@dataclass(frozen=True)
+class Schedule:
+    # The positions of the statements, in the order in which to process them
+    order: t.List[int]
+
+    # Groups of statements whose members don't depend on each other, in the order in which to process them
+    generations: t.List[t.List[int]]
+
+    # Groups of statements that depend on each other circularly. They are processed in their original order.
+    cycles: t.List[t.List[int]]
+
+
+def extract_objects(statement: exp.Expression, kind: str) -> StatementObjects:
+    """
+    Find the objects that a parsed statement creates and references, without processing it.
+
+    The bodies of procedures and functions are not inspected, as they are only text at this point.
+    """
+    creates = set()
+    created_table = None
+
+    namespace = CREATED_OBJECT_NAMESPACES.get(kind)
+    if namespace and isinstance(statement, exp.Create):
+        created_table = statement.find(exp.Table)
+        if created_table:
+            name = created_table.name.lower() if namespace in ("function", "procedure") else table_name(created_table)
+            creates.add((namespace, name))
+
+    cte_names = {cte.alias_or_name for cte in statement.find_all(exp.CTE)}
+    references = set()
+
+    for table in statement.find_all(exp.Table):
+        if table is created_table:
+            continue
+
+        name = table_name(table)
+        if name.startswith("@"):
+            # A stage and an optional path within it, e.g. @fruit.stage/path/
+            references.add(("stage", name[1:].split("/")[0]))
+        elif table.db or name not in cte_names:
+            references.add(("table", name))
+
+    for func in statement.find_all(exp.Anonymous):
+        name = func.name.lower()
+        args = func.expressions
+        if name == "nextval" and args and isinstance(args[0], exp.Literal) and args[0].is_string:
+            references.add(("table", args[0].name))
+        else:
+            references.add(("function", name))
+
+    return StatementObjects(creates=frozenset(creates), references=frozenset(references - creates))
+
+
+def schedule_statements(objects: t.List[StatementObjects]) -> Schedule:
+    """
+    Order statements so that each one comes after the statements that create the objects it references.
+
+    Statements that don't depend on each other keep their original order. An unqualified reference
+    (e.g. "raw") matches a qualified object (e.g. "fruit.raw") if no other object has the same name.
+    An object that is created more than once is referenced from its nearest creation before the statement.
+    Cycles are returned rather than logged, so that the caller can report them by statement index.
+    """
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(len(objects)))
+
+    creators: t.Dict[ObjectType, t.List[int]] = {}
+    for i, statement_objects in enumerate(objects):
+        for obj in statement_objects.creates:
+            creators.setdefault(obj, []).append(i)
+
+    unqualified: t.Dict[ObjectType, t.List[ObjectType]] = {}
+    for namespace, name in creators.keys():
+        unqualified.setdefault((namespace, name.rsplit(".", 1)[-1]), []).append((namespace, name))
+
+    # An object that is created more than once (e.g. CREATE OR REPLACE VIEW) is created in the original order
+    for positions in creators.values():
+        nx.add_path(graph, positions)
+
+    for i, statement_objects in enumerate(objects):
+        for obj in statement_objects.references:
+            positions = creators.get(obj)
+            if positions is None and "." not in obj[1]:
+                matches = unqualified.get(obj, [])
+                positions = creators[matches[0]] if len(matches) == 1 else None
+
+            # A statement uses the latest definition before it, or the first if the object is only created later
+            earlier = [j for j in positions or [] if j < i]
+            creator = max(earlier) if earlier else positions[0] if positions else None
+            if creator is not None and creator != i:
+                graph.add_edge(creator, i)
+
+    cycles = sorted(sorted(c) for c in nx.strongly_connected_components(graph) if len(c) > 1)
+
+    # Treat each cycle as a single statement, and order the statements by their original position where possible
+    condensed = nx.condensation(graph)
+    members = {c: sorted(condensed.nodes[c]["members"]) for c in condensed.nodes}
+    components = nx.lexicographical_topological_sort(condensed, key=lambda c: members[c][0])
+    order = [i for c in components for i in members[c]]
+
+    generations = [sorted(i for c in generation for i in members[c]) for generation in nx.topological_generations(condensed)]
+    logger.debug(f"Scheduled {len(order)} statements into {len(generations)} generations")
+
+    return Schedule(order=order, generations=generations, cycles=cycles)
+
+
+def table_name(table: exp.Table) -> str:
+    return ".".join(part.name for part in table.parts)
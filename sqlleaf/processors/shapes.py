@@ -0,0 +1,219 @@
+import copy
+import logging
+import typing as t
+from dataclasses import dataclass, replace
+
+import networkx as nx
+from sqlglot import exp
+
+from sqlleaf import mappings
+from sqlleaf.objects.node_types import EdgeAttributes, LiteralNode, NodeAttributes
+from sqlleaf.objects.query_types import ProcedureQuery, Query
+from sqlleaf.processors import generator
+
+logger = logging.getLogger("sqlleaf")
+
+"""
+Reuses the lineage of a statement for later statements with the same shape, i.e. that differ only in their literals.
+"""
+
+# Clauses whose literals never become nodes, so they may differ between statements with the same shape
+FILTER_CLAUSES = (exp.Where, exp.Having, exp.Qualify, exp.Group, exp.Order, exp.Limit, exp.Offset)
+
+
+@dataclass(frozen=True)
+class StatementLiteral:
+    value: str  # As it is named in a literal node, e.g. 'apple' or -5
+    kind: str  # "string", "int" or "number", which determines the literal's data type
+    filtered: bool  # Whether the literal is in a clause that doesn't contribute to lineage (e.g. WHERE)
+
+
+@dataclass(frozen=True)
+class LineageShape:
+    # The queries of the first statement with the shape, as given by Query.get_all_queries()
+    queries: t.List[Query]
+
+    # The literals of the first statement, in the order in which they appear
+    literals: t.List[StatementLiteral]
+
+    # The lineage of the first statement
+    edges: t.List[EdgeAttributes]
+
+    # The schema version of the tables that the first statement references (see ObjectMapping.schema_version())
+    schema_version: int
+
+
+class ShapeCache:
+    """
+    The lineage of statements, by their shape: their kind and their template (see collector.statement_template()).
+
+    When a statement has the same shape as an earlier one, its lineage is instantiated from the earlier
+    statement's edges by substituting its literals and statement index, rather than by transforming
+    and generating it. Literal nodes are matched to the statement's literals by value. The statement
+    is processed normally instead if any literal node can't be matched, if a literal's kind has changed,
+    or if a literal with no node has changed outside of a filter (as the optimizer may have folded it into another node).
+
+    A shape is only reused while the tables that it references are unchanged. Once any of them is replaced
+    (e.g. by CREATE OR REPLACE), the next statement with the shape is processed normally and replaces it.
+    """
+
+    def __init__(self):
+        self.shapes: t.Dict[str, LineageShape] = {}
+
+    def instantiate(self, parent_query: Query, graph: nx.MultiDiGraph, object_mapping: mappings.ObjectMapping) -> bool:
+        """
+        Add the lineage of a query to the graph from an earlier query with the same shape.
+        Return False, leaving the graph unchanged, if there is no such query or its lineage can't be reused.
+        """
+        key = shape_key(parent_query)
+        shape = self.shapes.get(key) if key else None
+        if not shape or shape.schema_version != schema_version(parent_query, object_mapping):
+            return False
+
+        queries = parent_query.get_all_queries()
+        if [type(q) for q in queries] != [type(q) for q in shape.queries]:
+            return False
+
+        values = _match_literals(shape, get_literals(parent_query))
+        queries_by_id = {id(old): new for old, new in zip(shape.queries, queries)}
+        if values is None or any(id(edge.query) not in queries_by_id for edge in shape.edges):
+            return False
+
+        old_index = shape.queries[0].get_statement_index()
+        new_index = parent_query.get_statement_index()
+        nodes: t.Dict[int, NodeAttributes] = {}
+
+        for edge in shape.edges:
+            for node in (edge.parent, edge.child):
+                if id(node) not in nodes:
+                    nodes[id(node)] = generator.add_node_if_not_exists(copy_node(node, old_index, new_index, values), graph)
+
+            parent, child = nodes[id(edge.parent)], nodes[id(edge.child)]
+            edge_attrs = EdgeAttributes(
+                parent=parent,
+                child=child,
+                query=queries_by_id[id(edge.query)],
+                select_idx=edge.select_idx,
+                path_idx=edge.path_idx,
+            )
+            graph.add_edge(parent.full_name, child.full_name, attrs=edge_attrs)
+
+        logger.debug(f"Reused the lineage of statement {old_index} for statement {new_index}")
+        return True
+
+    def record(self, parent_query: Query, graph: nx.MultiDiGraph, object_mapping: mappings.ObjectMapping):
+        """
+        Store the lineage of a query, if it's the first with its shape since its tables last changed.
+        """
+        key = shape_key(parent_query)
+        if not key:
+            return
+
+        version = schema_version(parent_query, object_mapping)
+        if key not in self.shapes or self.shapes[key].schema_version != version:
+            self.shapes[key] = LineageShape(
+                queries=parent_query.get_all_queries(),
+                literals=get_literals(parent_query),
+                edges=[data["attrs"] for _, _, data in graph.edges(data=True)],
+                schema_version=version,
+            )
+
+
+def shape_key(parent_query: Query) -> t.Optional[str]:
+    """
+    Get the shape of a query, or None if its lineage can't be reused.
+
+    Only queries whose child queries are all part of the same statement (e.g. the CTEs of an INSERT)
+    can be reused, as the literals are taken from that statement.
+    """
+    if not parent_query.template or isinstance(parent_query, ProcedureQuery):
+        return None
+
+    statement = parent_query.statement_original
+    for query in parent_query.get_all_queries()[1:]:
+        if query.statement_original.root() is not statement:
+            return None
+
+    return parent_query.kind + ":" + parent_query.template
+
+
+def schema_version(parent_query: Query, object_mapping: mappings.ObjectMapping) -> int:
+    """
+    Get the schema version of the tables that a query's statement references, including the table it writes into.
+    """
+    return object_mapping.schema_version(parent_query.statement_original.find_all(exp.Table))
+
+
+def get_literals(query: Query) -> t.List[StatementLiteral]:
+    """
+    Get the literals of a query's statement, named as the generator names literal nodes but without generating SQL.
+    """
+    literals = []
+    negated = set()
+
+    for node in query.statement_original.walk(bfs=False):
+        if isinstance(node, exp.Neg) and isinstance(node.this, exp.Literal) and not node.this.is_string:
+            # e.g. -5, which has a single literal node
+            negated.add(id(node.this))
+            literals.append(StatementLiteral(value="-" + node.this.name, kind=_literal_kind(node.this), filtered=_is_filtered(node)))
+        elif isinstance(node, exp.Literal) and id(node) not in negated:
+            value = "'" + node.name.replace("'", "''") + "'" if node.is_string else node.name
+            literals.append(StatementLiteral(value=value, kind=_literal_kind(node), filtered=_is_filtered(node)))
+
+    return literals
+
+
+def _match_literals(shape: LineageShape, literals: t.List[StatementLiteral]) -> t.Optional[t.Dict[str, str]]:
+    """
+    Map the values of the shape's literal nodes to the new statement's literals, or return None if they can't be.
+    """
+    if len(literals) != len(shape.literals):
+        return None
+
+    node_values = {node.column for edge in shape.edges for node in (edge.parent, edge.child) if isinstance(node, LiteralNode)}
+    values = {}
+
+    for old, new in zip(shape.literals, literals):
+        if old.kind != new.kind or old.filtered != new.filtered:
+            return None
+        elif old.value in node_values:
+            if values.setdefault(old.value, new.value) != new.value:
+                return None
+        elif not old.filtered and old.value != new.value:
+            return None
+
+    if node_values - values.keys():
+        return None
+    return values
+
+
+def copy_node(node: NodeAttributes, old_index: str, new_index: str, values: t.Optional[t.Dict[str, str]] = None) -> NodeAttributes:
+    """
+    Copy a node from one statement's lineage to another's, substituting its statement index and its literal value (if given).
+    """
+    node = copy.copy(node)
+
+    index = node.ctx.statement_index
+    if index == old_index or index.startswith(old_index + ":"):
+        node.ctx = replace(node.ctx, statement_index=new_index + index[len(old_index) :])
+
+    if values is not None and isinstance(node, LiteralNode):
+        node.column = values[node.column]
+
+    return node
+
+
+def _literal_kind(literal: exp.Literal) -> str:
+    if literal.is_string:
+        return "string"
+    return "int" if literal.is_int else "number"
+
+
+def _is_filtered(node: exp.Expression) -> bool:
+    while node.parent:
+        if isinstance(node.parent, FILTER_CLAUSES):
+            return True
+        elif isinstance(node.parent, exp.Join) and node.arg_key in ("on", "using"):
+            return True
+        node = node.parent
+    return False
@@ -0,0 +1,353 @@
+import functools
+import re
+import typing as t
+from dataclasses import dataclass
+
+from sqlglot.dialects.dialect import Dialect, DialectType
+
+"""
+Splits SQL text into individual statements without parsing it.
+"""
+
+BLOCK_COMMENT_PATTERN = re.compile(r"/\*|\*/")
+
+
+@dataclass(frozen=True)
+class SplitterRules:
+    """
+    The lexical rules of a dialect that decide where its statements end, taken from sqlglot's tokenizer.
+    """
+
+    quotes: t.Dict[str, str]  # The closing quote of each kind of string, by its opening quote, e.g. {"'": "'"}
+    identifiers: t.Dict[str, str]  # The closing quote of each kind of quoted identifier, e.g. {'"': '"', "`": "`"}
+    backslash_escapes: bool  # Whether a backslash escapes a quote inside an ordinary string (e.g. Snowflake, MySQL)
+    nested_comments: bool  # Whether block comments nest (e.g. Postgres)
+    pattern: re.Pattern  # Everything that can change the scanner's state when outside a string or comment
+
+
+@functools.lru_cache(maxsize=None)
+def dialect_rules(dialect: DialectType = None) -> SplitterRules:
+    """
+    Get the rules for splitting a dialect's statements. Each dialect's rules are only built once.
+
+    Dollar-quoted bodies ($$ ... $$ or $tag$ ... $tag$) and Postgres' E'...' strings are recognised in every dialect.
+    """
+    tokenizer = Dialect.get_or_raise(dialect).tokenizer_class
+    quotes = dict(tokenizer._QUOTES)
+    identifiers = dict(tokenizer._IDENTIFIERS)
+    line_comments = [start for start, end in tokenizer._COMMENTS.items() if end is None]
+
+    def alternatives(openers: t.Iterable[str]) -> str:
+        # Longer openers first, so that e.g. ''' isn't matched as '
+        return "|".join(re.escape(opener) for opener in sorted(openers, key=len, reverse=True))
+
+    pattern = re.compile(
+        rf"""(?P<semicolon>;)|(?P<quote>(?<!\w)[Ee]'|{alternatives(quotes)})|(?P<identifier>{alternatives(identifiers)})"""
+        rf"""|(?P<line_comment>{alternatives(line_comments)})|(?P<block_comment>/\*)|(?P<dollar>\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$)"""
+    )
+    return SplitterRules(
+        quotes=quotes,
+        identifiers=identifiers,
+        backslash_escapes="\\" in tokenizer._STRING_ESCAPES,
+        nested_comments=tokenizer.NESTED_COMMENTS,
+        pattern=pattern,
+    )
+
+
+@dataclass(frozen=True)
+class RawStatement:
+    # The position of this statement within its input, e.g. SELECT 'a'; SELECT 'b' -> a=0, b=1
+    index: int
+
+    # The statement's text, without its terminating semicolon
+    text: str
+
+    # The character offsets of the statement within its input, as [start, end)
+    start: int
+    end: int
+
+
+class StatementSplitter:
+    """
+    Splits a stream of SQL text into statements on top-level semicolons.
+
+    Semicolons inside quoted strings, quoted identifiers, comments and dollar-quoted
+    bodies (e.g. $$ ... $$ in Postgres and Snowflake) do not end a statement. The quotes, escapes
+    and comments are those of the dialect (see dialect_rules()), e.g. MySQL's backticks and # comments.
+    Text is consumed line by line, so only the current statement is held in memory.
+    """
+
+    def __init__(self, dialect: DialectType = None):
+        self.rules = dialect_rules(dialect)
+        self.index = 0  # The index of the next statement
+        self.offset = 0  # The number of characters consumed so far
+        self.buffer: t.List[str] = []
+        self.buffer_start = 0
+        self.has_content = False  # Whether the buffer contains more than whitespace and comments
+
+        # Scanner state carried across lines
+        self.quote: str = ""  # The closing quote of the current string or identifier
+        self.escapes = False  # Whether backslashes escape characters in the current string (e.g. E'...')
+        self.dollar_tag: str = ""  # The tag of the current dollar-quoted body, e.g. $body$
+        self.comment_depth = 0  # Block comments nest in Postgres
+
+    def feed(self, line: str) -> t.Generator[RawStatement]:
+        """
+        Consume one line of text, yielding any statements that it completes.
+        """
+        pos = 0
+        length = len(line)
+        start = 0  # The start of the unconsumed part of the line
+
+        while pos < length:
+            if self.quote:
+                pos = self._skip_quote(line, pos)
+            elif self.dollar_tag:
+                end = line.find(self.dollar_tag, pos)
+                if end == -1:
+                    pos = length
+                else:
+                    pos = end + len(self.dollar_tag)
+                    self.dollar_tag = ""
+            elif self.comment_depth:
+                pos = self._skip_block_comment(line, pos)
+            else:
+                match = self.rules.pattern.search(line, pos)
+                if not match:
+                    self.has_content = self.has_content or bool(line[pos:].strip())
+                    pos = length
+                    break
+
+                self.has_content = self.has_content or bool(line[pos : match.start()].strip())
+                kind = match.lastgroup
+                pos = match.end()
+
+                if kind == "semicolon":
+                    self.buffer.append(line[start : match.start()])
+                    statement = self._flush()
+                    start = pos
+                    self.buffer_start = self.offset + pos
+                    if statement:
+                        yield statement
+                elif kind == "line_comment":
+                    pos = length
+                elif kind == "block_comment":
+                    self.comment_depth = 1
+                else:
+                    self.has_content = True
+                    if kind == "quote":
+                        if match.group().lower() == "e'":
+                            self.quote = "'"
+                            self.escapes = True
+                        else:
+                            self.quote = self.rules.quotes[match.group()]
+                            self.escapes = self.rules.backslash_escapes
+                    elif kind == "identifier":
+                        self.quote = self.rules.identifiers[match.group()]
+                    elif kind == "dollar":
+                        self.dollar_tag = match.group()
+
+        self.buffer.append(line[start:])
+        self.offset += length
+
+    def skip(self, length: int):
+        """
+        Skip over text that belongs to no statement (e.g. the data following COPY ... FROM stdin),
+        so that the offsets of later statements still count it. Must be called between statements.
+        """
+        self.offset += length
+        self.buffer = []
+        self.buffer_start = self.offset
+        self.has_content = False
+
+    def close(self) -> t.Generator[RawStatement]:
+        """
+        Yield the final statement if it isn't terminated by a semicolon.
+        """
+        statement = self._flush()
+        if statement:
+            yield statement
+
+    def _skip_quote(self, line: str, pos: int) -> int:
+        """
+        Move past the closing quote of a string or identifier. Doubled quotes are escapes.
+        """
+        while True:
+            end = line.find(self.quote, pos)
+            if end == -1:
+                return len(line)
+
+            if self.escapes and _is_escaped(line, end):
+                pos = end + 1
+            elif line.startswith(self.quote, end + 1):
+                pos = end + 2
+            else:
+                self.quote = ""
+                self.escapes = False
+                return end + 1
+
+    def _skip_block_comment(self, line: str, pos: int) -> int:
+        for match in BLOCK_COMMENT_PATTERN.finditer(line, pos):
+            if match.group() == "/*" and not self.rules.nested_comments:
+                continue
+            self.comment_depth += 1 if match.group() == "/*" else -1
+            if self.comment_depth == 0:
+                return match.end()
+        return len(line)
+
+    def _flush(self) -> t.Optional[RawStatement]:
+        text = "".join(self.buffer)
+        has_content = self.has_content
+
+        self.buffer = []
+        self.has_content = False
+
+        if not has_content:
+            return None
+
+        # Exclude the surrounding whitespace from the statement's offsets
+        stripped = text.lstrip()
+        start = self.buffer_start + len(text) - len(stripped)
+        stripped = stripped.rstrip()
+
+        statement = RawStatement(index=self.index, text=stripped, start=start, end=start + len(stripped))
+        self.index += 1
+        return statement
+
+
+def _is_escaped(line: str, pos: int) -> bool:
+    """
+    Check if the character at a position is preceded by an odd number of backslashes.
+    """
+    count = 0
+    while pos > 0 and line[pos - 1] == "\\":
+        count += 1
+        pos -= 1
+    return count % 2 == 1
+
+
+def iter_lines(chunks: t.Iterable[str]) -> t.Generator[str]:
+    """
+    Re-split arbitrary chunks of text into lines (keeping their line endings).
+    File objects already yield lines, and pass through unchanged.
+    """
+    pending = ""
+    for chunk in chunks:
+        if pending:
+            chunk = pending + chunk
+            pending = ""
+
+        lines = chunk.splitlines(keepends=True)
+        if lines and not lines[-1].endswith(("\n", "\r")):
+            pending = lines.pop()
+        yield from lines
+
+    if pending:
+        yield pending
+
+
+def split_statements(chunks: t.Iterable[str] | str, dialect: DialectType = None) -> t.Generator[RawStatement]:
+    """
+    Split SQL text, provided either as a string or as an iterable of chunks (e.g. a file object),
+    into its individual statements, following the dialect's quoting and comment rules.
+
+    Statements that contain only whitespace or comments are skipped.
+    """
+    if isinstance(chunks, str):
+        chunks = [chunks]
+
+    splitter = StatementSplitter(dialect)
+    for line in iter_lines(chunks):
+        yield from splitter.feed(line)
+    yield from splitter.close()
+
+
+"""
+Splits the bodies of procedural blocks (PL/pgSQL, Snowflake Scripting) into their inner statements.
+"""
+
+# Whitespace and comments that may separate a block's keywords from the statement that follows them
+_GAP = r"(?:\s|--[^\n]*(?:\n|$)|/\*.*?\*/)*"
+
+# Keywords and clauses that may appear before a statement without being separated from it by a semicolon,
+# along with the section of the block that they start
+BLOCK_PREFIX_PATTERNS = [
+    (re.compile(r"<<\s*\w+\s*>>", re.S), None),  # <<label>>
+    (re.compile(r"DECLARE\b", re.I | re.S), "declare"),
+    (re.compile(r"BEGIN\b(?!" + _GAP + r"(?:TRANSACTION|WORK|ISOLATION)\b)", re.I | re.S), "body"),
+    (re.compile(r"EXCEPTION\b", re.I | re.S), "exception"),
+    (re.compile(r"WHEN\b.*?\bTHEN\b", re.I | re.S), None),  # An exception handler's condition
+    (re.compile(r"(?:IF|ELSIF|ELSEIF)\b.*?\bTHEN\b", re.I | re.S), None),
+    (re.compile(r"ELSE\b", re.I | re.S), None),
+    (re.compile(r"(?:(?:FOR|WHILE|FOREACH)\b.*?\b)?LOOP\b", re.I | re.S), None),
+]
+BLOCK_GAP_PATTERN = re.compile(_GAP, re.S)
+# e.g. 'END', 'END label' or 'END IF'. Only the first two end a block
+BLOCK_END_PATTERN = re.compile(r"END\b(?:" + _GAP + r"(?:(?P<branch>IF|LOOP|CASE)\b|\w+))?" + _GAP + r"$", re.I | re.S)
+BLOCK_KIND_PATTERN = re.compile(r"(RAISE|RETURN)\b", re.I)
+
+
+@dataclass(frozen=True)
+class BlockStatement(RawStatement):
+    # The section of the block that contains the statement: "declare", "body" or "exception"
+    section: str = "body"
+
+    # The kind of statement: "statement" for SQL statements, otherwise "declare", "raise" or "return"
+    kind: str = "statement"
+
+
+def split_block(body: str, dialect: DialectType = None) -> t.Generator[BlockStatement]:
+    """
+    Split the body of a procedural block into its inner statements.
+
+    For example, the body:
+        DECLARE
+            v_name VARCHAR;
+        BEGIN
+            INSERT INTO a SELECT 1;
+            RAISE NOTICE 'done';
+        EXCEPTION WHEN OTHERS THEN
+            INSERT INTO errors SELECT 1;
+        END;
+    yields a declaration, two statements in the "body" section (an INSERT and a RAISE) and one in the
+    "exception" section. Keywords that open or close a block or a branch (BEGIN, EXCEPTION WHEN ... THEN,
+    IF ... THEN, LOOP, END IF, etc.) are removed, and each statement's offsets locate its text within the body.
+    Statements are split following the quoting and comment rules of the dialect (see split_statements()).
+    """
+    section = "body"
+    index = 0
+
+    for statement in split_statements(body, dialect):
+        text = statement.text
+        pos = BLOCK_GAP_PATTERN.match(text).end()
+
+        # Remove the keywords before the statement, following any sections that they start
+        while True:
+            for pattern, new_section in BLOCK_PREFIX_PATTERNS:
+                match = pattern.match(text, pos)
+                if match:
+                    pos = BLOCK_GAP_PATTERN.match(text, match.end()).end()
+                    section = new_section or section
+                    break
+            else:
+                break
+
+        text = text[pos:]
+        if not text:
+            continue
+        elif match := BLOCK_END_PATTERN.match(text):
+            # The end of a block also ends its exception section
+            if not match.group("branch"):
+                section = "body"
+            continue
+
+        if section == "declare":
+            kind = "declare"
+        elif match := BLOCK_KIND_PATTERN.match(text):
+            kind = match.group(1).lower()
+        else:
+            kind = "statement"
+
+        start = statement.start + pos
+        yield BlockStatement(index=index, text=text, start=start, end=start + len(text), section=section, kind=kind)
+        index += 1
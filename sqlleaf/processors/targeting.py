@@ -0,0 +1,149 @@
+import logging
+import re
+import typing as t
+from collections import deque
+from dataclasses import dataclass
+
+from sqlglot.dialects.dialect import Dialect
+from sqlglot.tokens import TokenType
+
+from sqlleaf import exception
+from sqlleaf.objects.query_types import Query
+from sqlleaf.processors import scheduler
+
+logger = logging.getLogger("sqlleaf")
+
+"""
+Finds the queries that are relevant to a set of target tables, from the tables that each query reads and writes.
+"""
+
+DIRECTIONS = ("upstream", "downstream")
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class TableDependency:
+    query: Query
+    writes: str  # The table that the query writes into, e.g. fruit.processed
+    reads: t.FrozenSet[str]  # The tables and views that the query reads from
+
+
+def select_queries(queries: t.List[Query], targets: t.Iterable[str], direction: str = "upstream") -> t.List[Query]:
+    """
+    Find the queries that write into the target tables, and into either the tables that the targets are
+    derived from ("upstream") or the tables that are derived from the targets ("downstream").
+
+    Only the tables that queries read and write are compared, without generating any column lineage.
+    An unqualified name (e.g. "raw") matches any table with that name.
+    """
+    if direction not in DIRECTIONS:
+        raise exception.SqlLeafException(message=f"Unknown direction '{direction}'. Expected one of: {', '.join(DIRECTIONS)}")
+
+    dependencies = [get_table_dependency(query) for query in queries]
+    writers = _TableIndex()
+    readers = _TableIndex()
+    for dependency in dependencies:
+        writers.add(dependency.writes, dependency)
+        for table in dependency.reads:
+            readers.add(table, dependency)
+
+    closure = {target.lower() for target in targets}
+    pending = deque(closure)
+
+    while pending:
+        table = pending.popleft()
+        if direction == "upstream":
+            related = {read for dependency in writers.find(table) for read in dependency.reads}
+        else:
+            related = {dependency.writes for dependency in readers.find(table)}
+
+        for name in related - closure:
+            closure.add(name)
+            pending.append(name)
+
+    selected = {id(dependency.query) for table in closure for dependency in writers.find(table)}
+    logger.debug(f"Selected {len(selected)} of {len(queries)} queries for {len(closure)} {direction} tables")
+    return [query for query in queries if id(query) in selected]
+
+
+def get_table_dependency(query: Query) -> TableDependency:
+    """
+    Find the table that a query writes into and the tables that it reads from.
+
+    A child query also reads the tables of its root statement, e.g. the UPDATE and INSERT of a MERGE
+    read the MERGE's USING source, which isn't part of their own statements.
+    """
+    writes = scheduler.table_name(query.child_table).lower() if query.child_table else ""
+    references = set(scheduler.extract_objects(query.statement_original, query.kind).references)
+
+    root = query.get_root_query()
+    if root is not query:
+        references |= scheduler.extract_objects(root.statement_original, root.kind).references
+
+    reads = frozenset(name.lower() for namespace, name in references if namespace == "table") - {writes}
+    return TableDependency(query=query, writes=writes, reads=reads)
+
+
+def find_table_names(sql: str, dialect: str) -> t.Set[str]:
+    """
+    Find the names in SQL text that may refer to tables, from its tokens rather than by parsing it.
+
+    Dotted names are joined, e.g. INSERT INTO "fruit"."processed" -> fruit.processed. As in select_queries(),
+    quotes are removed and names are lower case. Every other word is included too, so a name may also be a keyword or a column.
+    """
+    names = set()
+    parts: t.List[str] = []  # The parts of the current name
+    after_dot = False
+
+    for token in Dialect.get_or_raise(dialect).tokenize(sql):
+        if token.token_type == TokenType.DOT:
+            after_dot = bool(parts)
+            continue
+
+        if token.token_type == TokenType.IDENTIFIER or (token.token_type != TokenType.STRING and WORD_PATTERN.fullmatch(token.text)):
+            if parts and not after_dot:
+                names.add(".".join(parts))
+                parts = []
+            parts.append(token.text.lower())
+        elif parts:
+            names.add(".".join(parts))
+            parts = []
+        after_dot = False
+
+    if parts:
+        names.add(".".join(parts))
+    return names
+
+
+def mentions_tables(names: t.Iterable[str], tables: t.Iterable[str]) -> bool:
+    """
+    Check if any of the names (see find_table_names()) refers to one of the tables, where an unqualified name
+    (e.g. "processed") matches a table of any schema with that name, as in select_queries().
+    """
+    index = _TableIndex()
+    for name in names:
+        index.add(name, name)
+    return any(index.find(table.lower()) for table in tables)
+
+
+class _TableIndex:
+    """
+    Values by table name, where an unqualified name matches any table with that name.
+    """
+
+    def __init__(self):
+        self.qualified: t.Dict[str, t.List[t.Any]] = {}
+        self.unqualified: t.Dict[str, t.List[t.Any]] = {}  # By the last part of every name
+        self.only_unqualified: t.Dict[str, t.List[t.Any]] = {}  # By names that have a single part
+
+    def add(self, name: str, value: t.Any):
+        short_name = name.rsplit(".", 1)[-1]
+        self.qualified.setdefault(name, []).append(value)
+        self.unqualified.setdefault(short_name, []).append(value)
+        if short_name == name:
+            self.only_unqualified.setdefault(name, []).append(value)
+
+    def find(self, name: str) -> t.List[t.Any]:
+        if "." not in name:
+            return self.unqualified.get(name, [])
+        return self.qualified.get(name, []) + self.only_unqualified.get(name.rsplit(".", 1)[-1], [])
@@ -1,12 +1,13 @@
 import typing as t
 import logging
 import copy
+import inspect
 
 from sqlglot import exp
-from sqlglot.optimizer import optimize, qualify, RULES
+from sqlglot.optimizer import qualify, RULES
 from sqlglot.optimizer.merge_subqueries import merge_derived_tables
 
-from sqlleaf import exception, mappings, util
+from sqlleaf import budget, exception, mappings, util
 from sqlleaf.objects.query_types import CopyQuery, UpdateQuery, InsertQuery, MergeQuery, Query, CTASQuery, TableQuery, DeleteQuery
 
 logger = logging.getLogger("sqlleaf")
@@ -60,12 +61,12 @@ def transform_query(query: Query, object_mapping: mappings.ObjectMapping):
     # Apply sqlglot's optimize() functions to infer schemas, qualify columns, etc
     statement = _apply_optimizations(statement, query, object_mapping, query.child_table)
 
-    old = query.statement.sql(dialect=query.dialect)
-    new = statement.sql(dialect=query.dialect)
-    if old == new:
-        logger.debug("Transformations applied, but query is unchanged.")
-    else:
-        logger.debug(f"Transformed {type(statement).__name__}: {new}")
+    if logger.isEnabledFor(logging.DEBUG):
+        # Expressions compare by structure, so no SQL is generated unless the statement changed
+        if statement == query.statement:
+            logger.debug("Transformations applied, but query is unchanged.")
+        else:
+            logger.debug(f"Transformed {type(statement).__name__}: {statement.sql(dialect=query.dialect)}")
 
     query.statement_transformed = statement
     query.set_statement(statement)
@@ -204,7 +205,10 @@ def _convert_defaults_to_values(statement: exp.Insert, object_mapping: mappings.
             for i, tuple_expr in enumerate(value_expr.expressions):
                 if isinstance(tuple_expr, exp.Var) and tuple_expr.name.upper() == "DEFAULT":
                     # Replace 'DEFAULT' with the associated column's default expression
-                    col_def = [col for col in table_columns if col.name == named_columns[i].name][0]
+                    col_def = table_query.get_column_def(named_columns[i].name)
+                    if not col_def:
+                        message = f"Unknown column '{named_columns[i].name}'"
+                        raise exception.SqlLeafException(message=message, table=str(exp.table_name(child_table)))
 
                     if default_expr := col_def.find(exp.DefaultColumnConstraint):
                         tuple_expr.replace(default_expr.this)
@@ -465,7 +469,7 @@ def _convert_copy_to_insert(statement: exp.Copy, query: CopyQuery, object_mappin
         # for the lineage functions to work - such as this Stage
         col_defs = [exp.ColumnDef(this=exp.to_identifier(name), kind=exp.DataType.build(data_type)) for name, data_type in child_columns.items()]
 
-        child_table_query = object_mapping.find_query(kind="stage", table=child_table)
+        child_table_query = object_mapping.find_query_to_modify(kind="stage", table=child_table)
         child_table_query.column_defs = col_defs
 
     # We don't worry about `self.is_source_a_stage` here as that is handled in the process_column() later
@@ -485,6 +489,32 @@ RULES_OVERRIDE = [
     ]
 ]
 
+# The arguments that optimize() may pass to a rule, besides the expression
+OPTIMIZE_ARGS = ("db", "catalog", "schema", "dialect", "sql", "isolate_tables", "quote_identifiers")
+
+# Each rule along with the arguments it takes, which optimize() would otherwise inspect for every statement
+RULES_WITH_ARGS = [(rule, tuple(arg for arg in inspect.getfullargspec(rule).args if arg in OPTIMIZE_ARGS)) for rule in RULES_OVERRIDE]
+
+
+def optimize_statement(statement: exp.Expression, dialect: str, object_mapping: mappings.ObjectMapping) -> exp.Expression:
+    """
+    Apply RULES_OVERRIDE to a copy of a statement, with the same arguments as sqlglot's optimize().
+    """
+    kwargs = {
+        "db": None,
+        "catalog": None,
+        "schema": object_mapping,
+        "dialect": dialect,
+        "sql": None,
+        "isolate_tables": True,
+        "quote_identifiers": False,
+    }
+    optimized = statement.copy()
+    for rule, args in RULES_WITH_ARGS:
+        budget.checkpoint()
+        optimized = rule(optimized, **{arg: kwargs[arg] for arg in args})
+    return optimized
+
 
 def _validate_values(statement: exp.Insert) -> exp.Insert:
     """
@@ -531,7 +561,7 @@ def _apply_optimizations(
         _add_column_names_to_insert(stmt, object_mapping, child_table)
 
     # Selectively apply sqlglot's optimization rules.
-    stmt = optimize(expression=stmt, dialect=query.dialect, schema=object_mapping, rules=RULES_OVERRIDE)
+    stmt = optimize_statement(stmt, query.dialect, object_mapping)
 
     # We don't want to merge the CTEs as they provide useful info to the user
     # so we skip merge_ctes() and call the function below directly instead
@@ -626,7 +656,7 @@ def _add_column_names_to_insert(statement: exp.Insert, object_mapping: mappings.
         statement.set("this", schema)
 
     else:
-        unknown_columns = [col for col in insert_columns if col not in table_columns]
+        unknown_columns = [col for col in insert_columns if table_query.get_column_position(col, include_system=True) is None]
         if unknown_columns:
             raise exception.SqlLeafException(
                 message=f"Unknown columns used in SELECT: {list(unknown_columns)}",
@@ -1,6 +1,7 @@
 import logging
 import typing as t
 import hashlib
+import contextlib
 from functools import singledispatchmethod
 
 from sqlglot import exp
@@ -223,6 +224,88 @@ def get_cycles(graph: nx.MultiDiGraph):
         yield cycle, errors
 
 
+def dump_expression(expression: exp.Expression) -> t.List[t.Tuple]:
+    """
+    Flatten an expression into a list of tuples that can be pickled, e.g. to send it to another process.
+
+    Unlike sqlglot's serde module (which pickling an expression uses), args that are None or
+    empty lists are kept, since statements are checked for their keys (e.g. "into" in stmt.args).
+    The tree is walked iteratively, so deeply nested expressions don't exceed the recursion limit.
+
+    Each entry is (parent index, arg key, is array, class, comments, meta, type) for an expression,
+    or (parent index, arg key, is array, None, value) for anything else.
+    """
+    payloads = []
+    stack = [(expression, -1, "", False)]
+
+    while stack:
+        node, parent, arg_key, is_array = stack.pop()
+        index = len(payloads)
+
+        if not isinstance(node, exp.Expression):
+            payloads.append((parent, arg_key, is_array, None, node))
+            continue
+
+        _type = dump_expression(node.type) if node.type else None
+        payloads.append((parent, arg_key, is_array, type(node), node.comments, node._meta, _type))
+
+        for key, value in reversed(node.args.items()):
+            if type(value) is list and value:
+                stack.extend((v, index, key, True) for v in reversed(value))
+            else:
+                stack.append((value, index, key, False))
+
+    return payloads
+
+
+def load_expression(payloads: t.List[t.Tuple]) -> exp.Expression:
+    """
+    Rebuild an expression from the output of dump_expression().
+    """
+    nodes = []
+
+    for parent, arg_key, is_array, klass, *rest in payloads:
+        if klass is None:
+            node = rest[0]
+        else:
+            comments, meta, _type = rest
+            node = klass()
+            node.comments = comments
+            node._meta = meta
+            node._type = load_expression(_type) if _type else None
+
+        nodes.append(node)
+        if parent < 0:
+            continue
+
+        if is_array:
+            nodes[parent].append(arg_key, node)
+        elif klass is None:
+            nodes[parent].args[arg_key] = [] if type(node) is list else node
+        else:
+            nodes[parent].set(arg_key, node)
+
+    return nodes[0]
+
+
+def expression_key(expression: exp.Expression) -> t.Tuple:
+    """
+    Identify an expression by its args, e.g. to share equal data types without generating their SQL.
+
+    Unlike comparing expressions (whose hash ignores the case of names), the key is only equal
+    for expressions with exactly the same args, and so the same SQL.
+    """
+    args = []
+    for key, value in expression.args.items():
+        if isinstance(value, exp.Expression):
+            value = expression_key(value)
+        elif isinstance(value, list):
+            value = tuple(expression_key(v) if isinstance(v, exp.Expression) else v for v in value)
+        args.append((key, value))
+
+    return type(expression), tuple(args)
+
+
 def set_properties(statement: exp.Create) -> str:
     """
     Get a table/view's properties (e.g. TEMPORARY, EXTERNAL, RECURSIVE)
@@ -234,6 +317,58 @@ def set_properties(statement: exp.Create) -> str:
     return property
 
 
+class LazySQL:
+    """
+    Generate an expression's SQL only if a log message that includes it is emitted.
+
+    Example:
+        logger.debug("Found expr: %s", LazySQL(expr))
+    """
+
+    __slots__ = ("expression", "dialect")
+
+    def __init__(self, expression: exp.Expression, dialect: t.Optional[str] = None):
+        self.expression = expression
+        self.dialect = dialect
+
+    def __str__(self) -> str:
+        return self.expression.sql(dialect=self.dialect)
+
+
+_ORIGINAL_SQL = exp.Expression.sql
+_SQL_CALL_COUNTERS: t.List[t.Counter[str]] = []
+
+
+def _counted_sql(self, *args, **kwargs) -> str:
+    for counter in _SQL_CALL_COUNTERS:
+        counter["sql_calls"] += 1
+    return _ORIGINAL_SQL(self, *args, **kwargs)
+
+
+@contextlib.contextmanager
+def count_sql_calls(counter: t.Counter[str]) -> t.Generator[t.Counter[str]]:
+    """
+    Count the calls to Expression.sql() made while the context is active (including those made by sqlglot)
+    into counter["sql_calls"]. Calls made in other processes are not counted.
+
+    Contexts may be nested; a counter that is already active is only counted once.
+    """
+    if any(c is counter for c in _SQL_CALL_COUNTERS):
+        yield counter
+        return
+
+    if not _SQL_CALL_COUNTERS:
+        exp.Expression.sql = _counted_sql
+    _SQL_CALL_COUNTERS.append(counter)
+
+    try:
+        yield counter
+    finally:
+        del _SQL_CALL_COUNTERS[next(i for i, c in enumerate(_SQL_CALL_COUNTERS) if c is counter)]
+        if not _SQL_CALL_COUNTERS:
+            exp.Expression.sql = _ORIGINAL_SQL
+
+
 class SingleDispatchMethodLogger(singledispatchmethod):
     """
     Override the functools.singledispatchmethod class to print the methods that get called.
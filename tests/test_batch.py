@@ -0,0 +1,71 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from sqlglot import exp
+
+import sqlleaf
+
+
+def test__generate_batch():
+    batch = [
+        ("CREATE TABLE fruit.raw (name VARCHAR, age INT); CREATE TABLE fruit.processed (name VARCHAR, age INT);", "postgres"),
+        ("INSERT INTO fruit.processed (name, age) SELECT UPPER(name), age FROM fruit.raw;", "redshift"),
+        ("CREATE TABLE fruit.stock (name VARCHAR, qty INT);", "athena"),
+        ("INSERT INTO fruit.processed (name, age) SELECT name, qty FROM fruit.stock;", "redshift"),
+        ("INSERT INTO fruit.processed (name) SELECT LOWER(name) FROM fruit.stock;", "postgres"),
+        # Snowflake's unquoted names are upper case, and refer to the same tables as Postgres' lower case names
+        ("CREATE TABLE veg.raw (name VARCHAR); CREATE TABLE veg.processed (name VARCHAR);", "snowflake"),
+        ("INSERT INTO fruit.processed (name) SELECT TRIM(name) FROM veg.raw;", "snowflake"),
+        ("INSERT INTO veg.processed (name) SELECT INITCAP(name) FROM fruit.raw;", "postgres"),
+    ]
+    lineage = sqlleaf.Lineage()
+    lineage.generate_batch(batch)
+
+    # Tables created in one dialect are used by the others, through a view of the same mapping for each dialect
+    edges = {(e.parent.friendly_name, e.child.friendly_name) for e in lineage.get_edges()}
+    assert ("column[fruit.raw.name]", "function[UPPER]") in edges
+    assert ("column[fruit.stock.qty]", "column[fruit.processed.age]") in edges
+    assert ("column[fruit.stock.name]", "function[LOWER]") in edges
+    assert ("column[VEG.RAW.NAME]", "function[TRIM]") in edges and ("function[TRIM]", "column[FRUIT.PROCESSED.NAME]") in edges
+    assert ("function[INITCAP]", "column[veg.processed.name]") in edges
+
+    mapping = lineage.object_mapping
+    assert mapping.dialect_name == "postgres" and sorted(lineage.mapping_views) == ["athena", "redshift", "snowflake"]
+    assert lineage.get_mapping("postgres") is mapping and lineage.get_mapping("redshift") is lineage.mapping_views["redshift"]
+    assert lineage.get_mapping("athena").find_query(kind="table", table=exp.to_table("fruit.stock")) is mapping.find_query(
+        kind="table", table=exp.to_table("fruit.stock")
+    )
+
+    # Objects are stored by the names that the mapping's dialect gives them, and a view finds them by its own names
+    snowflake = lineage.get_mapping("snowflake")
+    assert [c.name for c in mapping.find_query(kind="table", table=exp.to_table("veg.raw")).column_defs] == ["name"]
+    assert [c.name for c in snowflake.find_query(kind="table", table=exp.to_table("FRUIT.RAW")).column_defs] == ["NAME", "AGE"]
+    assert list(snowflake.find(exp.to_table("FRUIT.RAW")))[:2] == ["NAME", "AGE"]
+    assert snowflake.get_version(exp.to_table("VEG.RAW")) == mapping.get_version(exp.to_table("veg.raw")) > 0
+
+    # Parsing the batch in a pool of processes gives the same lineage
+    parallel = sqlleaf.Lineage()
+    parallel.generate_batch(batch, workers=2)
+    assert {(e.parent.friendly_name, e.child.friendly_name) for e in parallel.get_edges()} == edges
+
+
+def test__generate_batch_shared_names(tmp_path):
+    # Snowflake's tables are used by Postgres when Snowflake creates the mapping
+    batch = [
+        ("CREATE TABLE fruit.raw (name VARCHAR); CREATE TABLE fruit.processed (name VARCHAR);", "snowflake"),
+        ("INSERT INTO fruit.processed (name) SELECT UPPER(name) FROM fruit.raw;", "postgres"),
+        ('CREATE TABLE "veg"."raw" (name VARCHAR);', "postgres"),
+    ]
+    lineage = sqlleaf.Lineage()
+    lineage.generate_batch(batch)
+
+    edges = {(e.parent.friendly_name, e.child.friendly_name) for e in lineage.get_edges()}
+    assert ("column[fruit.raw.name]", "function[UPPER]") in edges and ("function[UPPER]", "column[fruit.processed.name]") in edges
+
+    # A saved mapping keeps the names that its dialect gives to every table
+    lineage.object_mapping.save(str(tmp_path / "catalog.pickle"))
+    mapping = sqlleaf.mappings.ObjectMapping.load(str(tmp_path / "catalog.pickle"))
+    assert [c.name for c in mapping.find_query(kind="table", table=exp.to_table("VEG.RAW")).column_defs] == ["NAME"]
+    assert mapping.view("postgres").find_query(kind="table", table=exp.to_table("fruit.processed")).child_table.sql() == "fruit.processed"
@@ -0,0 +1,116 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import sqlleaf
+from sqlleaf.processors.splitter import split_block
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__split_block():
+    body = """
+    DECLARE
+        v_name VARCHAR;
+    BEGIN
+        IF v_name IS NULL THEN
+            INSERT INTO fruit.processed (name) SELECT 'a;b' AS name;
+        END IF;
+        RAISE NOTICE 'done';
+        RETURN;
+    EXCEPTION WHEN OTHERS THEN
+        INSERT INTO fruit.errors (name) SELECT 'x' AS name; -- logged
+    END;
+    """
+    statements = list(split_block(body))
+
+    assert [(s.index, s.section, s.kind) for s in statements] == [
+        (0, "declare", "declare"),
+        (1, "body", "statement"),
+        (2, "body", "raise"),
+        (3, "body", "return"),
+        (4, "exception", "statement"),
+    ]
+    assert statements[1].text == "INSERT INTO fruit.processed (name) SELECT 'a;b' AS name"
+    assert [body[s.start : s.end] for s in statements] == [s.text for s in statements]
+
+    # Bodies are split following the quoting rules of their dialect
+    body = "INSERT INTO a SELECT 'it\\'s; fine' AS x; INSERT INTO b SELECT 1 AS y;"
+    assert [s.text for s in split_block(body, dialect="snowflake")] == ["INSERT INTO a SELECT 'it\\'s; fine' AS x", "INSERT INTO b SELECT 1 AS y"]
+
+
+def test__split_procedure_body_by_dialect():
+    sql = """
+    CREATE TABLE a (x VARCHAR);
+    CREATE TABLE b (y INT);
+    CREATE PROCEDURE load() RETURNS VARCHAR LANGUAGE SQL AS $$
+    BEGIN
+        INSERT INTO a SELECT 'it\\'s; fine' AS x;
+        INSERT INTO b SELECT 1 AS y;
+    END;
+    $$;
+    """
+    lineage = sqlleaf.Lineage()
+    lineage.generate(sql, dialect="snowflake")
+
+    assert sorted(e.child.friendly_name for e in lineage.get_edges()) == ["column[A.X]", "column[B.Y]"]
+
+
+def test__query_spans(tmp_path):
+    procedure = """CREATE PROCEDURE fruit.load() LANGUAGE plpgsql AS $body$
+    BEGIN
+        INSERT INTO fruit.processed (age) SELECT 5 AS age;
+    END;
+    $body$"""
+    text = COMMON_TABLES + "\n" + procedure + ";\nINSERT INTO fruit.processed (name) SELECT 'a' AS name;\n"
+    (tmp_path / "a.sql").write_text(text)
+
+    lineage = sqlleaf.Lineage()
+    lineage.generate_from_files(str(tmp_path / "a.sql"), dialect=DIALECT)
+
+    spans = {type(q).__name__: text[slice(*q.get_span())] for q in lineage.get_queries()[2:]}
+    assert spans == {"ProcedureQuery": procedure, "InsertQuery": "INSERT INTO fruit.processed (name) SELECT 'a' AS name"}
+
+    child = lineage.get_queries()[2].child_queries[0]
+    assert text[slice(*child.get_span())] == "INSERT INTO fruit.processed (age) SELECT 5 AS age"
+    assert child.get_statement_index() == "0/2:0"
+
+
+def test__lazy_bodies():
+    sql = COMMON_TABLES + """
+    CREATE TABLE fruit.processed_archive (age INT);
+    CREATE PROCEDURE fruit.load() LANGUAGE plpgsql AS $body$
+    BEGIN
+        INSERT INTO "fruit"."processed" (age) SELECT 5 AS age;
+    END;
+    $body$;
+    CREATE PROCEDURE fruit.load_names() LANGUAGE plpgsql AS $body$
+    BEGIN
+        INSERT INTO fruit.raw (name) SELECT 'a' AS name;
+    END;
+    $body$;
+    CREATE PROCEDURE fruit.archive() LANGUAGE plpgsql AS $body$
+    BEGIN
+        INSERT INTO fruit.processed_archive (age) SELECT 6 AS age;
+    END;
+    $body$;
+    """
+    eager = sqlleaf.Lineage()
+    eager.generate(sql, dialect=DIALECT)
+    lazy = sqlleaf.Lineage(lazy_bodies=True)
+    lazy.generate(sql, dialect=DIALECT)
+
+    procedures = lazy.get_queries()[3:]
+    assert [len(p.child_queries) for p in procedures] == [0, 0, 0]
+    assert lazy.get_edges() == []
+
+    # Only the bodies that mention a table are expanded, whether or not its name is quoted
+    lazy.expand_all(tables=["fruit.processed"])
+    assert [len(p.child_queries) for p in procedures] == [1, 0, 0]
+
+    lazy.expand_all()
+    assert [len(p.child_queries) for p in procedures] == [1, 1, 1]
+    assert [e.id for e in lazy.get_edges()] == [e.id for e in eager.get_edges()]
+    assert [q.get_statement_index() for q in procedures[0].get_all_queries()] == ["3", "3:0"]
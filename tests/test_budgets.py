@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import sqlleaf
+from sqlleaf.processors import transformer
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__statement_budgets(monkeypatch):
+    sql = COMMON_TABLES + """
+    INSERT INTO fruit.processed (name) SELECT UPPER(name) AS name FROM fruit.raw;
+    INSERT INTO fruit.processed (age) SELECT 5 AS age;
+    """
+    transform_query = transformer.transform_query
+
+    def slow_transform_query(query, object_mapping):
+        if "UPPER" in query.statement.sql():
+            # The statement is only aborted at the next checkpoint
+            start = time.process_time()
+            while time.process_time() - start < 0.3:
+                pass
+        return transform_query(query, object_mapping)
+
+    monkeypatch.setattr(transformer, "transform_query", slow_transform_query)
+
+    lineage = sqlleaf.Lineage(statement_time_budget=0.2)
+    lineage.generate(sql, dialect=DIALECT)
+
+    # The slow statement is aborted, and the rest are processed
+    assert [(q.statement_index, q.stage, q.reason) for q in lineage.quarantine] == [("2", "transform", "time")]
+    assert lineage.quarantine[0].elapsed >= 0.2
+    assert [e.child.friendly_name for e in lineage.get_edges()] == ["column[fruit.processed.age]"]
+
+    lineage = sqlleaf.Lineage(statement_memory_budget=1)
+    lineage.generate(COMMON_TABLES + "INSERT INTO fruit.processed (age) SELECT 5 AS age;", dialect=DIALECT)
+    assert [q.reason for q in lineage.quarantine][-1] == "memory"
+    assert lineage.get_edges() == []
@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import sqlleaf
+from sqlleaf.cache import ParseCache
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+SQL = COMMON_TABLES + """
+INSERT INTO fruit.processed (name) SELECT UPPER(name) AS name FROM fruit.raw; -- a comment
+SELECT 'x' INTO fruit.copied;
+"""
+
+
+def edge_ids(lineage):
+    return [e.id for e in lineage.get_edges()]
+
+
+def test__parse_cache_reused_across_runs(tmp_path):
+    first = sqlleaf.Lineage(cache_dir=str(tmp_path))
+    first.generate(SQL, dialect=DIALECT)
+    assert first.parse_cache.stats() == {"hits": 0, "misses": 4}
+
+    second = sqlleaf.Lineage(cache_dir=str(tmp_path))
+    second.generate(SQL, dialect=DIALECT)
+    assert second.parse_cache.stats() == {"hits": 4, "misses": 0}
+
+    uncached = sqlleaf.Lineage()
+    uncached.generate(SQL, dialect=DIALECT)
+    assert edge_ids(first) == edge_ids(second) == edge_ids(uncached)
+    assert [q.get_statement_index() for q in second.get_queries()] == ["0", "1", "2", "4"]
+
+
+def test__parse_cache_keys():
+    cache = ParseCache.__new__(ParseCache)
+    assert cache.key("postgres", "abc") == cache.key("postgres", "abc")
+    assert cache.key("postgres", "abc") != cache.key("snowflake", "abc")
+    assert cache.key("postgres", "abc") != cache.key("postgres", "abd")
+
+
+def test__parse_cache_ignores_corrupt_entries(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    cache.put("ab01", [1, 2, 3])
+    assert cache.get("ab01") == [1, 2, 3]
+
+    with open(cache._path("ab01"), "wb") as f:
+        f.write(b"not a pickle")
+
+    assert cache.get("ab01") is None
+    assert cache.get("ab02") is None
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+
+def test__parse_cache_evicts_least_recently_used(tmp_path):
+    cache = ParseCache(str(tmp_path), max_size=3500)
+    for i, key in enumerate(["aa", "bb", "cc"]):
+        cache.put(key, "x" * 1000)
+        os.utime(cache._path(key), (i, i))
+
+    # Reading an entry marks it as recently used
+    cache.get("aa")
+    cache.put("dd", "x" * 1000)
+
+    assert [k for k in ["aa", "bb", "cc", "dd"] if os.path.exists(cache._path(k))] == ["aa", "cc", "dd"]
@@ -0,0 +1,71 @@
+import csv
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from sqlglot import exp
+
+import sqlleaf
+
+DIALECT = "postgres"
+
+
+def test__load_catalog(tmp_path):
+    path = tmp_path / "columns.csv"
+    path.write_text(
+        "TABLE_CATALOG,TABLE_SCHEMA,TABLE_NAME,COLUMN_NAME,ORDINAL_POSITION,DATA_TYPE,COLUMN_DEFAULT\n"
+        "shop,fruit,raw,name,2,character varying,\n"
+        "shop,fruit,raw,id,1,integer,nextval('fruit.raw_id_seq'::regclass)\n"
+        "shop,fruit,processed,name,1,text,'unknown'::text\n"
+        "shop,fruit,processed,age,2,USER-DEFINED,\n"
+    )
+    sql = """
+    INSERT INTO fruit.processed (name, age) SELECT UPPER(name), id FROM fruit.raw;
+    INSERT INTO fruit.raw (name) SELECT 'apple';
+    """
+    field_size_limit = csv.field_size_limit()
+    lineage = sqlleaf.Lineage()
+    lineage.load_catalog(str(path), dialect=DIALECT)
+    lineage.generate(sql, dialect=DIALECT)
+
+    assert lineage.stats["catalog_tables"] == 2
+    # The process-wide CSV limit that's raised for reading is restored
+    assert csv.field_size_limit() == field_size_limit
+    assert len(lineage.get_queries()) == 2
+
+    table = lineage.object_mapping.find_query(kind="table", table=exp.to_table("fruit.raw"))
+    assert [(c.name, str(c.kind)) for c in table.get_column_defs()] == [("id", "INT"), ("name", "VARCHAR")]
+
+    edges = [(e.parent.friendly_name, e.child.friendly_name) for e in lineage.get_edges()]
+    assert ("function[UPPER]", "column[fruit.processed.name]") in edges
+    assert ("column[fruit.raw.id]", "column[fruit.processed.age]") in edges
+    # The default of a column that isn't inserted into
+    assert ("sequence[fruit.raw_id_seq]", "column[fruit.raw.id]") in edges
+
+
+def test__catalog_columns_are_built_when_needed(tmp_path):
+    path = tmp_path / "columns.csv"
+    path.write_text(
+        "table_schema,table_name,column_name,data_type,column_default\n"
+        "fruit,raw,id,integer,nextval('fruit.raw_id_seq'::regclass)\n"
+        "fruit,raw,name,text,\n"
+        "fruit,processed,id,integer,nextval('fruit.raw_id_seq'::regclass)\n"
+        "fruit,processed,name,text,\n"
+    )
+    lineage = sqlleaf.Lineage()
+    lineage.load_catalog(str(path), dialect=DIALECT)
+    mapping = lineage.object_mapping
+    raw = mapping.find_query(kind="table", table=exp.to_table("fruit.raw"))
+    processed = mapping.find_query(kind="table", table=exp.to_table("fruit.processed"))
+
+    # Tables share their data types, defaults and system columns
+    assert raw.columns[0].kind is processed.columns[0].kind
+    assert raw.columns[0].default is processed.columns[0].default
+    assert raw.system_column_defs[0] is processed.system_column_defs[0]
+
+    # Only the table that's inserted into has its column definitions built
+    lineage.generate("INSERT INTO fruit.processed (name) SELECT name FROM fruit.raw;", dialect=DIALECT)
+    assert raw._column_defs is None
+    assert processed.column_defs[0].find(exp.DefaultColumnConstraint).this.type is processed.columns[0].kind
+    assert str(mapping.find_columns_for_table(exp.to_table("fruit.raw"))["name"]) == "TEXT"
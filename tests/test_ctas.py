@@ -3,6 +3,9 @@ import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 
+import sqlglot
+
+from sqlleaf.processors.collector import _convert_select_into_to_ctas
 from tests.new_fixtures import holder
 
 DIALECT = "postgres"
@@ -78,3 +81,25 @@ def test__ctas_values(holder):
 CREATE TABLE my_new_table AS
 VALUES (1, 'Alice'), (2, 'Bob');
 """
+
+
+def test__ctas_select_into(holder):
+    sql = """
+    SELECT name, age INTO TEMPORARY fruit.cooked FROM fruit.raw WHERE age > 1;
+    """
+    h = holder(sql=sql, dialect=DIALECT, with_tables=True)
+
+    assert h.paths == [
+        ["column[fruit.raw.name]", "column[fruit.cooked.name]"],
+        ["column[fruit.raw.age]", "column[fruit.cooked.age]"],
+    ]
+    assert [(q.kind, q.property) for q in h.queries] == [("ctas", "temporary")]
+
+
+def test__ctas_select_into_matches_ctas():
+    select_into = sqlglot.parse_one("SELECT name INTO TEMPORARY fruit.cooked FROM fruit.raw", dialect=DIALECT)
+    ctas = sqlglot.parse_one("CREATE TEMPORARY TABLE fruit.cooked AS SELECT name FROM fruit.raw", dialect=DIALECT)
+
+    statement = _convert_select_into_to_ctas(select_into)
+    assert statement == ctas
+    assert statement.args.keys() == ctas.args.keys()
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+
+import sqlleaf
+
+
+def test__generate_from_dbt_manifest(tmp_path):
+    def model(name, sql, depends_on, materialized="table", checksum="a"):
+        return {
+            "unique_id": f"model.shop.{name}",
+            "resource_type": "model",
+            "database": "db",
+            "schema": "shop",
+            "alias": name,
+            "relation_name": f"db.shop.{name}",
+            "config": {"materialized": materialized},
+            "compiled_code": sql,
+            "checksum": {"name": "sha256", "checksum": checksum},
+            "depends_on": {"nodes": depends_on},
+        }
+
+    manifest = {
+        "metadata": {"adapter_type": "postgres"},
+        "sources": {
+            "source.shop.raw.orders": {
+                "unique_id": "source.shop.raw.orders",
+                "resource_type": "source",
+                "relation_name": "db.raw.orders",
+                "columns": {"id": {"name": "id", "data_type": "int"}, "item": {"name": "item"}},
+            }
+        },
+        "nodes": {
+            # Listed before the model it depends on
+            "model.shop.summary": model("summary", "SELECT COUNT(id) AS total FROM db.shop.orders -- all orders", ["model.shop.orders"]),
+            "model.shop.orders": model("orders", "SELECT id, UPPER(item) AS item FROM db.raw.orders; -- note", ["source.shop.raw.orders"], "view"),
+            "model.shop.recent": model("recent", "SELECT id FROM db.raw.orders", ["source.shop.raw.orders"], "ephemeral"),
+        },
+    }
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(manifest))
+
+    cache_dir = str(tmp_path / "cache")
+    lineage = sqlleaf.Lineage(cache_dir=cache_dir)
+    lineage.generate_from_dbt_manifest(str(path))
+
+    assert [q.kind for q in lineage.get_queries()] == ["table", "view", "ctas"]
+    assert [q.get_statement_index() for q in lineage.get_queries()] == ["0/0", "0/1", "0/2"]
+    edges = [(e.parent.friendly_name, e.child.friendly_name) for e in lineage.get_edges()]
+    assert ("column[db.raw.orders.id]", "column[db.shop.orders.id]") in edges
+    assert ("function[COUNT]", "column[db.shop.summary.total]") in edges
+    assert lineage.stats["reused_models"] == 0
+
+    # Unchanged models reuse their lineage, and a changed model is generated again
+    manifest["nodes"]["model.shop.summary"] = model("summary", "SELECT MAX(id) AS total FROM db.shop.orders", ["model.shop.orders"], checksum="b")
+    path.write_text(json.dumps(manifest))
+
+    rebuilt = sqlleaf.Lineage(cache_dir=cache_dir)
+    rebuilt.generate_from_dbt_manifest(str(path))
+    assert rebuilt.stats["reused_models"] == 1
+    rebuilt_edges = [(e.parent.friendly_name, e.child.friendly_name) for e in rebuilt.get_edges()]
+    assert ("function[MAX]", "column[db.shop.summary.total]") in rebuilt_edges
+
+    def view_edges(lineage):
+        return [(e.id, e.query.get_statement_index()) for e in lineage.get_edges() if e.query.kind == "view"]
+
+    assert view_edges(rebuilt) == view_edges(lineage)
+
+    # Each model must be a single statement
+    manifest["nodes"]["model.shop.recent"] = model("recent", "SELECT id FROM db.raw.orders; SELECT 1", ["source.shop.raw.orders"])
+    path.write_text(json.dumps(manifest))
+    with pytest.raises(sqlleaf.exception.SqlLeafException, match="model.shop.recent"):
+        sqlleaf.Lineage().generate_from_dbt_manifest(str(path))
@@ -0,0 +1,226 @@
+import gzip
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+import sqlglot
+
+import sqlleaf
+from sqlleaf.processors import querylog
+from sqlleaf.processors.splitter import split_statements
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__split_statements():
+    sql = """
+    -- A comment; with a semicolon
+    INSERT INTO fruit.processed (name) SELECT 'a;b' AS name;
+    /* another; comment */
+    CREATE FUNCTION fruit.f() RETURNS INT AS $body$ SELECT 1; $body$ LANGUAGE SQL;
+    SELECT "odd;name" FROM fruit.raw
+    """
+    statements = list(split_statements(sql))
+
+    assert [s.index for s in statements] == [0, 1, 2]
+    assert statements[0].text.endswith("SELECT 'a;b' AS name")
+    assert statements[1].text.endswith("$body$ SELECT 1; $body$ LANGUAGE SQL")
+    assert statements[2].text == 'SELECT "odd;name" FROM fruit.raw'
+    assert [sql[s.start : s.end] for s in statements] == [s.text for s in statements]
+
+
+def test__split_statements_across_chunks():
+    chunks = ["INSERT INTO a SELECT 'x", ";y' AS name; INS", "ERT INTO b SELECT 1 AS age"]
+    statements = list(split_statements(iter(chunks)))
+
+    assert [s.text for s in statements] == ["INSERT INTO a SELECT 'x;y' AS name", "INSERT INTO b SELECT 1 AS age"]
+
+
+@pytest.mark.parametrize(
+    "dialect, sql, expected",
+    [
+        ("snowflake", "SELECT 'it\\'s; here' FROM s;\nSELECT 2", ["SELECT 'it\\'s; here' FROM s", "SELECT 2"]),
+        ("mysql", "SELECT `a;b` FROM t # a;comment\n;\nSELECT \"x;y\"", ["SELECT `a;b` FROM t # a;comment", 'SELECT "x;y"']),
+        ("postgres", "SELECT 'a\\'; SELECT 2", ["SELECT 'a\\'", "SELECT 2"]),
+    ],
+)
+def test__split_statements_by_dialect(dialect, sql, expected):
+    statements = list(split_statements(sql, dialect=dialect))
+
+    assert [s.text for s in statements] == expected
+    assert len(statements) == len(sqlglot.parse(sql, read=dialect))
+
+
+def test__generate_from_files(tmp_path):
+    (tmp_path / "001_tables.sql").write_text(COMMON_TABLES)
+    with gzip.open(tmp_path / "002_inserts.sql.gz", "wt") as f:
+        f.write("""
+        INSERT INTO fruit.processed (name) SELECT UPPER(name) AS name FROM fruit.raw;
+        INSERT INTO fruit.processed (age) SELECT 5 AS age;
+        """)
+
+    lineage = sqlleaf.Lineage()
+    lineage.generate_from_files(str(tmp_path / "*.sql*"), dialect=DIALECT)
+
+    paths = [[n.friendly_name for n in p.node_hops()] for p in lineage.get_paths()]
+    assert paths == [
+        ["column[fruit.raw.name]", "function[UPPER]", "column[fruit.processed.name]"],
+        ["literal[5]", "column[fruit.processed.age]"],
+    ]
+    assert [os.path.basename(s) for s in lineage.sources] == ["001_tables.sql", "002_inserts.sql.gz"]
+
+    # Statements are indexed per file
+    indexes = [q.get_statement_index() for q in lineage.get_queries()]
+    assert indexes == ["0/0", "0/1", "1/0", "1/1"]
+    assert "literal[5 type=INT query_depth=0 query_width=0 statement=1/1 select=0 func_depth=0 func_arg=0]" in [
+        n.full_name for n in lineage.get_nodes()
+    ]
+
+
+def test__generate_from_stream_removes_duplicates():
+    sql = COMMON_TABLES + "INSERT INTO fruit.processed (age) SELECT 5 AS age; INSERT INTO fruit.processed (age) SELECT 5 AS age;"
+
+    lineage = sqlleaf.Lineage()
+    lineage.generate_from_stream(sql.splitlines(keepends=True), dialect=DIALECT)
+
+    assert len(lineage.get_queries()) == 3
+    assert len(lineage.get_edges()) == 1
+
+
+def test__generate_with_workers():
+    sql = COMMON_TABLES + """
+    INSERT INTO fruit.processed (name) SELECT UPPER(name) AS name FROM fruit.raw; -- trailing comment
+    ;
+    /* leading comment */ INSERT INTO fruit.processed (age) SELECT 5 AS age;
+    INSERT INTO fruit.processed (age) SELECT 5 AS age;
+    INSERT INTO fruit.processed (age) SELECT 5 AS age;
+    SELECT 'x' INTO fruit.copied;
+    """
+    serial = sqlleaf.Lineage()
+    serial.generate(sql, dialect=DIALECT)
+    parallel = sqlleaf.Lineage()
+    parallel.generate(sql, dialect=DIALECT, workers=2)
+
+    def summary(lineage):
+        queries = [(type(q).__name__, q.get_statement_index()) for q in lineage.get_queries()]
+        return queries, [e.id for e in lineage.get_edges()]
+
+    assert summary(parallel) == summary(serial)
+    assert [q[1] for q in summary(serial)[0]] == ["0", "1", "2", "5", "8"]
+
+
+def test__generate_from_pg_dump(tmp_path):
+    dump = """--
+-- PostgreSQL database dump
+--
+SET statement_timeout = 0;
+SELECT pg_catalog.set_config('search_path', '', false);
+
+--
+-- Name: raw; Type: TABLE; Schema: fruit; Owner: postgres
+--
+
+CREATE TABLE fruit.raw (
+    name character varying
+);
+ALTER TABLE fruit.raw OWNER TO postgres;
+
+--
+-- Name: processed; Type: TABLE; Schema: fruit; Owner: postgres
+--
+
+CREATE TABLE fruit.processed (
+    name character varying,
+    age integer
+);
+
+--
+-- Data for Name: raw; Type: TABLE DATA; Schema: fruit; Owner: postgres
+--
+
+COPY fruit.raw (name) FROM stdin;
+apple; 'unbalanced
+pêche \\\\.
+\\.
+
+--
+-- Data for Name: processed; Type: TABLE DATA; Schema: fruit; Owner: postgres
+--
+
+INSERT INTO fruit.processed (name, age) VALUES ('kiwi', 1);
+INSERT INTO fruit.processed (name, age) VALUES ('plum', 2);
+INSERT INTO fruit.processed (name, age) VALUES ('fig', 3);
+
+--
+-- Name: names; Type: VIEW; Schema: fruit; Owner: postgres
+--
+
+CREATE VIEW fruit.names AS SELECT name FROM fruit.raw;
+"""
+    path = tmp_path / "dump.sql"
+    path.write_text(dump, encoding="utf-8")
+
+    lineage = sqlleaf.Lineage()
+    lineage.generate_from_pg_dump(str(path))
+
+    assert lineage.skipped == {"copy": 1, "copy data": 2, "insert": 2, "set": 1, "select": 1, "owner": 1}
+    assert [(type(q).__name__, q.get_statement_index()) for q in lineage.get_queries()] == [
+        ("TableQuery", "0/2"),
+        ("TableQuery", "0/4"),
+        ("InsertQuery", "0/6"),
+        ("ViewQuery", "0/9"),
+    ]
+
+    # Offsets include the skipped data
+    view = lineage.get_queries()[-1]
+    assert dump[slice(*view.get_span())] == "CREATE VIEW fruit.names AS SELECT name FROM fruit.raw"
+
+    # Gzipped dumps are read line by line instead, with the same result
+    with gzip.open(tmp_path / "dump.sql.gz", "wt", encoding="utf-8") as f:
+        f.write(dump)
+    compressed = sqlleaf.Lineage()
+    compressed.generate_from_pg_dump(str(tmp_path / "dump.sql.gz"))
+
+    assert compressed.skipped == lineage.skipped
+    assert [q.get_span() for q in compressed.get_queries()] == [q.get_span() for q in lineage.get_queries()]
+
+
+def test__generate_from_query_log(tmp_path):
+    rows = [
+        {"query_text": "INSERT INTO fruit.processed (name) SELECT name FROM fruit.raw WHERE age IN (1, 2)", "runs": 3},
+        {"query_text": "SELECT name FROM fruit.raw", "runs": 10},
+        {"query_text": "insert into fruit.processed (name)\n select name from fruit.raw where age in (5)", "runs": 4},
+        {"query_text": "INSERT INTO fruit.processed (age) SELECT age FROM fruit.raw", "runs": 1},
+    ]
+    (tmp_path / "history.jsonl").write_text("\n".join(json.dumps(row) for row in rows))
+
+    lineage = sqlleaf.Lineage()
+    lineage.generate(COMMON_TABLES, dialect=DIALECT)
+    lineage.generate_from_query_log(str(tmp_path / "history.jsonl"), dialect=DIALECT, count_column="runs")
+
+    # Queries that differ only in their literals are processed once
+    logged = [q for q in lineage.get_queries() if q.execution_count is not None]
+    assert [(q.get_statement_index(), q.execution_count) for q in logged] == [("0/0", 7), ("0/1", 10), ("0/3", 1)]
+    assert {e.child.friendly_name: e.execution_count for e in lineage.get_edges()} == {
+        "column[fruit.processed.name]": 7,
+        "column[fruit.processed.age]": 1,
+    }
+    assert sorted(e.to_dict()["execution_count"] for e in lineage.get_edges()) == [1, 7]
+
+    # Edges that weren't read from a query log are output as before
+    other = sqlleaf.Lineage()
+    other.generate(COMMON_TABLES + "INSERT INTO fruit.processed (name) SELECT name FROM fruit.raw;", dialect=DIALECT)
+    assert "execution_count" not in other.get_edges()[0].to_dict()
+
+
+def test__query_log_templates():
+    def template(sql):
+        return querylog.template_fingerprint(sql, DIALECT)
+
+    assert template("SELECT * FROM a WHERE id IN (1, 2, 3) AND name = 'x'") == template("select * from a where id in (4) and name = 'y'")
+    assert template("INSERT INTO a SELECT 1, 2") != template("INSERT INTO a SELECT 1")
+    assert template("SELECT * FROM a") != template("SELECT * FROM b")
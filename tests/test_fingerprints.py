@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import sqlleaf
+from sqlleaf.processors.collector import parse_statements
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__statement_fingerprints():
+    sql = """
+    INSERT INTO fruit.processed (age) SELECT 5 AS age;
+    /* a comment */ insert into fruit.processed (age)
+        select 5 as age;
+    INSERT INTO fruit.processed (age) SELECT 6 AS age;
+    INSERT INTO fruit.processed (age) SELECT '5' AS age;
+    INSERT INTO fruit.processed (AGE) SELECT 5 AS age
+    """
+    fingerprints = [s.fingerprint for s in parse_statements(sql, DIALECT)]
+
+    # Formatting, comments and keyword case are ignored, but literals and identifiers are not
+    assert fingerprints[0] == fingerprints[1]
+    assert len(set(fingerprints)) == 4
+
+    lineage = sqlleaf.Lineage()
+    lineage.generate(COMMON_TABLES + sql, dialect=DIALECT)
+    assert [q.fingerprint for q in lineage.get_queries()][-4:] == [fingerprints[i] for i in [0, 2, 3, 4]]
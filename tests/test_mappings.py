@@ -0,0 +1,165 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+from sqlglot import exp
+
+import sqlleaf
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__save_and_load_mapping(tmp_path):
+    sql = COMMON_TABLES + """
+    CREATE SEQUENCE fruit.ids;
+    CREATE TABLE fruit.stock (id INT DEFAULT nextval('fruit.ids'), name VARCHAR) INHERITS (fruit.raw);
+    CREATE VIEW fruit.ripe AS SELECT name FROM fruit.stock;
+    """
+    dml = """
+    INSERT INTO fruit.stock (name) SELECT name FROM fruit.ripe;
+    INSERT INTO fruit.raw (name) SELECT 'apple' AS name;
+    """
+    lineage = sqlleaf.Lineage()
+    lineage.generate(sql, dialect=DIALECT)
+    path = str(tmp_path / "mapping.pickle")
+    lineage.object_mapping.save(path)
+    lineage.generate(dml, dialect=DIALECT)
+
+    loaded = sqlleaf.Lineage()
+    loaded.object_mapping = sqlleaf.mappings.ObjectMapping.load(path)
+    loaded.generate(dml, dialect=DIALECT)
+    inserted = [e.id for e in lineage.get_edges() if e.query.kind == "insert"]
+    assert [e.id for e in loaded.get_edges()] == inserted
+    assert "sequence[fruit.ids]" in [e.parent.friendly_name for e in loaded.get_edges()]
+
+    stock = loaded.object_mapping.find_query(kind="table", table=exp.to_table("fruit.stock"))
+    assert [q.child_table.name for q in stock.inherits] == ["raw"]
+    assert stock in loaded.object_mapping.find_query(kind="table", table=exp.to_table("fruit.raw")).inherited_by
+    assert loaded.object_mapping.find_query(kind="table", table=exp.to_table("fruit.ripe")).kind == "view"
+
+
+def test__find_query_partial_names():
+    lineage = sqlleaf.Lineage()
+    lineage.generate("CREATE TABLE fruit.raw (name VARCHAR);", dialect=DIALECT)
+    mapping = lineage.object_mapping
+
+    raw = mapping.find_query(kind="table", table=exp.to_table("raw"))
+    assert raw is mapping.find_query(kind="table", table=exp.to_table("fruit.raw"))
+    assert mapping.find_query(kind="table", table=exp.to_table("cooked")) is None
+
+    # A resolved partial name is forgotten once another object matches it
+    lineage.generate("CREATE TABLE veg.raw (name VARCHAR); CREATE TABLE fruit.cooked (name VARCHAR);", dialect=DIALECT)
+    assert mapping.find_query(kind="table", table=exp.to_table("raw"), raise_on_missing=False) is None
+    assert mapping.find_query(kind="table", table=exp.to_table("cooked")).child_table.db == "fruit"
+    assert mapping.find_table_or_stage(["raw", "veg"]).child_table.db == "veg"
+
+
+def test__schema_versions():
+    lineage = sqlleaf.Lineage(reuse_shapes=True)
+    lineage.generate(COMMON_TABLES, dialect=DIALECT)
+    mapping = lineage.object_mapping
+    raw, processed = exp.to_table("fruit.raw"), exp.to_table("fruit.processed")
+    version, processed_version = mapping.schema_version([raw]), mapping.get_version(processed)
+
+    assert 0 < version <= mapping.schema_version([raw, processed]) == mapping.version
+    assert mapping.get_version(exp.to_table("raw")) == mapping.get_version(raw)
+    assert mapping.get_version(exp.to_table("fruit.cooked")) == 0
+
+    insert = "INSERT INTO fruit.processed (name, age) SELECT name, age FROM fruit.raw WHERE name = '{}';"
+    lineage.generate(insert.format("a"), dialect=DIALECT)
+    lineage.generate(insert.format("b"), dialect=DIALECT)
+    assert lineage.stats["reused_shapes"] == 1
+
+    # Only the names that may refer to a replaced table have a new version
+    lineage.generate("CREATE OR REPLACE TABLE fruit.raw (name VARCHAR, age BIGINT);", dialect=DIALECT)
+    assert mapping.schema_version([raw]) > version
+    assert mapping.get_version(exp.to_table("raw")) == mapping.get_version(raw)
+    assert mapping.get_version(processed) == processed_version
+
+    # So the lineage of statements that reference it is generated again
+    lineage.generate(insert.format("c"), dialect=DIALECT)
+    lineage.generate(insert.format("d"), dialect=DIALECT)
+    assert lineage.stats["reused_shapes"] == 2
+
+
+def test__data_types_are_shared():
+    sql = """
+    CREATE TABLE fruit.raw (name VARCHAR(20), price NUMERIC(10, 2), mood Mood);
+    CREATE TABLE fruit.processed (name varchar(20), price NUMERIC(10, 2), mood mood);
+    INSERT INTO fruit.processed (name, price, mood) SELECT name, price, mood FROM fruit.raw;
+    """
+    lineage = sqlleaf.Lineage()
+    lineage.generate(sql, dialect=DIALECT)
+    mapping = lineage.object_mapping
+    raw = mapping.find_columns_for_table(exp.to_table("fruit.raw"))
+    processed = mapping.find_columns_for_table(exp.to_table("fruit.processed"))
+
+    # Equal types are converted to SQL and parsed once, and the schema holds the parsed types
+    assert raw["name"] is processed["name"] and raw["price"] is processed["price"]
+    assert isinstance(raw["name"], exp.DataType) and str(raw["price"]) == "DECIMAL(10, 2)"
+    assert len(mapping.data_types) == 4
+
+    assert sorted(n.full_name for n in lineage.get_nodes()) == [
+        "column[fruit.processed.mood type=mood kind=table]",
+        "column[fruit.processed.name type=VARCHAR(20) kind=table]",
+        "column[fruit.processed.price type=DECIMAL(10, 2) kind=table]",
+        "column[fruit.raw.mood type=mood kind=table]",
+        "column[fruit.raw.name type=VARCHAR(20) kind=table]",
+        "column[fruit.raw.price type=DECIMAL(10, 2) kind=table]",
+    ]
+
+
+def test__shared_catalog(tmp_path):
+    catalog = sqlleaf.Lineage()
+    catalog.generate(COMMON_TABLES + "CREATE TABLE fruit.stock (name VARCHAR, qty INT);", dialect=DIALECT)
+    shared = catalog.object_mapping.freeze()
+    version = shared.version
+
+    with pytest.raises(sqlleaf.exception.SqlLeafException):
+        catalog.generate("CREATE TABLE fruit.extra (name VARCHAR);", dialect=DIALECT)
+
+    # Each instance registers its own DDL in an overlay, which only it sees
+    first = sqlleaf.Lineage()
+    first.object_mapping = shared.overlay()
+    first.generate(
+        """
+        CREATE TABLE fruit.local_stock (farm VARCHAR) INHERITS (fruit.stock);
+        CREATE TABLE fruit.orders (name VARCHAR, qty INT);
+        INSERT INTO fruit.processed (name, age) SELECT name, qty FROM fruit.stock;
+        """,
+        dialect=DIALECT,
+    )
+    second = sqlleaf.Lineage()
+    second.object_mapping = shared.overlay()
+    second.generate(
+        """
+        CREATE TABLE fruit.orders (id INT);
+        INSERT INTO fruit.processed (age) SELECT id FROM fruit.orders;
+        INSERT INTO fruit.processed (name, age) SELECT name, qty FROM fruit.stock;
+        """,
+        dialect=DIALECT,
+    )
+
+    first_edges = [(e.parent.friendly_name, e.child.friendly_name) for e in first.get_edges()]
+    second_edges = [(e.parent.friendly_name, e.child.friendly_name) for e in second.get_edges()]
+    assert ("column[fruit.local_stock.qty]", "column[fruit.processed.age]") in first_edges
+    assert ("column[fruit.orders.id]", "column[fruit.processed.age]") in second_edges
+    assert not any("local_stock" in parent for parent, child in second_edges)
+
+    # The shared catalog is unchanged, including the table that was inherited from
+    assert shared.version == version and shared.inheritance == {}
+    assert shared.find_query(kind="table", table=exp.to_table("fruit.orders"), raise_on_missing=False) is None
+    assert shared.find_query(kind="table", table=exp.to_table("fruit.stock")).inherited_by == []
+    assert first.object_mapping.find_query(kind="table", table=exp.to_table("stock")).inherited_by[0].child_table.name == "local_stock"
+    assert first.object_mapping.get_version(exp.to_table("fruit.orders")) > version
+
+    # A loaded catalog can be shared too
+    path = str(tmp_path / "mapping.pickle")
+    catalog.object_mapping.save(path)
+    loaded = sqlleaf.Lineage()
+    loaded.object_mapping = sqlleaf.mappings.ObjectMapping.load(path).freeze().overlay()
+    loaded.generate("INSERT INTO fruit.processed (name) SELECT name FROM fruit.raw;", dialect=DIALECT)
+    assert ("column[fruit.raw.name]", "column[fruit.processed.name]") in [(e.parent.friendly_name, e.child.friendly_name) for e in loaded.get_edges()]
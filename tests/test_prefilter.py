@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import sqlleaf
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__prefilter():
+    sql = COMMON_TABLES + """
+    GRANT SELECT ON fruit.raw TO reader;
+    COMMENT ON TABLE fruit.raw IS 'raw fruit';
+    SET search_path TO fruit;
+    BEGIN;
+    ALTER TABLE fruit.raw OWNER TO admin;
+    CREATE INDEX raw_name ON fruit.raw (name);
+    SELECT name FROM fruit.raw;
+    VACUUM ANALYZE fruit.raw;
+    COMMIT;
+    SELECT name INTO fruit.copied FROM fruit.raw;
+    INSERT INTO fruit.processed (name) SELECT name FROM fruit.raw;
+    """
+    unfiltered = sqlleaf.Lineage()
+    unfiltered.generate(sql, dialect=DIALECT)
+    lineage = sqlleaf.Lineage(prefilter=True)
+    lineage.generate(sql, dialect=DIALECT)
+
+    assert lineage.skipped == {
+        "grant": 1,
+        "comment": 1,
+        "set": 1,
+        "transaction": 2,
+        "owner": 1,
+        "create index": 1,
+        "select": 1,
+        "maintenance": 1,
+    }
+    assert [q.get_statement_index() for q in lineage.get_queries()] == ["0", "1", "11", "12"]
+    assert [e.id for e in lineage.get_edges()] == [e.id for e in unfiltered.get_edges()]
@@ -0,0 +1,74 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import sqlglot
+
+import sqlleaf
+from sqlleaf.processors.scheduler import StatementObjects, extract_objects, schedule_statements
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__resolve_dependencies():
+    sql = """
+    INSERT INTO fruit.cooked (name) SELECT UPPER(name) AS name FROM fruit.raw;
+    CREATE VIEW fruit.cooked_names AS SELECT name FROM fruit.cooked;
+    CREATE TABLE fruit.cooked (name VARCHAR);
+    """ + COMMON_TABLES
+
+    lineage = sqlleaf.Lineage()
+    lineage.generate(sql, dialect=DIALECT, resolve_dependencies=True)
+
+    assert [(type(q).__name__, q.get_statement_index()) for q in lineage.get_queries()] == [
+        ("TableQuery", "2"),
+        ("ViewQuery", "1"),
+        ("TableQuery", "3"),
+        ("InsertQuery", "0"),
+        ("TableQuery", "4"),
+    ]
+    paths = [[n.friendly_name for n in p.node_hops()] for p in lineage.get_paths()]
+    assert ["column[fruit.raw.name]", "function[UPPER]", "column[fruit.cooked.name]", "column[fruit.cooked_names.name]"] in paths
+
+
+def test__resolve_dependencies_across_files(tmp_path):
+    (tmp_path / "a_inserts.sql").write_text("INSERT INTO fruit.processed (age) SELECT 5 AS age;")
+    (tmp_path / "b_tables.sql").write_text(COMMON_TABLES)
+
+    lineage = sqlleaf.Lineage()
+    lineage.generate_from_files(str(tmp_path), dialect=DIALECT, resolve_dependencies=True)
+
+    assert [q.get_statement_index() for q in lineage.get_queries()] == ["1/0", "1/1", "0/0"]
+    assert [e.child.friendly_name for e in lineage.get_edges()] == ["column[fruit.processed.age]"]
+
+
+def test__schedule_statements_with_cycles():
+    objects = [
+        StatementObjects(creates=frozenset({("table", "a")}), references=frozenset({("table", "b")})),
+        StatementObjects(references=frozenset({("table", "c")})),
+        StatementObjects(creates=frozenset({("table", "b")}), references=frozenset({("table", "a")})),
+        StatementObjects(creates=frozenset({("table", "fruit.c")})),
+    ]
+    schedule = schedule_statements(objects)
+
+    assert schedule.cycles == [[0, 2]]
+    assert schedule.order == [0, 2, 3, 1]
+    assert schedule.generations == [[0, 2, 3], [1]]
+
+
+def test__schedule_statements_with_replaced_objects():
+    statements = [
+        ("CREATE TABLE tgt (x INT)", "table"),
+        ("CREATE TABLE t AS SELECT 1 AS x", "ctas"),
+        ("INSERT INTO tgt SELECT x FROM t", "insert"),
+        ("CREATE OR REPLACE TABLE t AS SELECT 2 AS y", "ctas"),
+        ("INSERT INTO tgt SELECT y FROM t", "insert"),
+    ]
+    objects = [extract_objects(sqlglot.parse_one(sql, dialect=DIALECT), kind) for sql, kind in statements]
+
+    # Each statement reads the definition of "t" that comes before it, so the order is unchanged
+    assert schedule_statements(objects).order == [0, 1, 2, 3, 4]
+    # A statement that comes before every definition follows the first one
+    assert schedule_statements(objects[2:] + objects[:2]).order == [1, 3, 0, 2, 4]
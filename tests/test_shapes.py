@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import sqlleaf
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__reuse_shapes():
+    sql = COMMON_TABLES + """
+    INSERT INTO fruit.processed (name, age) SELECT UPPER(name) AS name, 5 AS age FROM fruit.raw WHERE name = 'a';
+    INSERT INTO fruit.processed (name, age) SELECT UPPER(name) AS name, 6 AS age FROM fruit.raw WHERE name = 'b';
+    INSERT INTO fruit.processed (name, age) SELECT UPPER(name) AS name, -7 AS age FROM fruit.raw WHERE name = 'c';
+    INSERT INTO fruit.processed (name, age) SELECT LOWER('x') AS name, 1 + 1 AS age;
+    INSERT INTO fruit.processed (name, age) SELECT LOWER('y') AS name, 1 + 2 AS age;
+    """
+    processed = sqlleaf.Lineage()
+    processed.generate(sql, dialect=DIALECT)
+    reused = sqlleaf.Lineage(reuse_shapes=True)
+    reused.generate(sql, dialect=DIALECT)
+
+    # The second statement is reused. The third has a different shape (-7), and the last may have been folded (1 + 2).
+    assert reused.stats["reused_shapes"] == 1
+    assert sorted(n.full_name for n in reused.get_nodes()) == sorted(n.full_name for n in processed.get_nodes())
+    assert sorted(e.id for e in reused.get_edges()) == sorted(e.id for e in processed.get_edges())
+    assert sorted((e.id, e.query.get_statement_index()) for e in reused.get_edges()) == sorted(
+        (e.id, e.query.get_statement_index()) for e in processed.get_edges()
+    )
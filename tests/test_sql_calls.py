@@ -0,0 +1,37 @@
+import logging
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from sqlglot import exp
+
+import sqlleaf
+from sqlleaf import util
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__sql_calls_are_counted():
+    logger = logging.getLogger("sqlleaf")
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        lineage = sqlleaf.Lineage(count_sql_calls=True)
+        lineage.generate(COMMON_TABLES + "SELECT name INTO fruit.copied FROM fruit.raw;", dialect=DIALECT)
+    finally:
+        logger.setLevel(level)
+
+    counted = lineage.stats["sql_calls"]
+    assert counted > 0
+
+    # Calls are only counted while lineage is being generated
+    exp.Literal.number(1).sql()
+    assert lineage.stats["sql_calls"] == counted
+    assert exp.Expression.sql is util._ORIGINAL_SQL
+
+    # Calls are only counted when asked for
+    lineage = sqlleaf.Lineage()
+    lineage.generate(COMMON_TABLES + "SELECT name INTO fruit.copied FROM fruit.raw;", dialect=DIALECT)
+    assert lineage.stats["sql_calls"] == 0
@@ -2,13 +2,15 @@ import os
 import sys
 
 import pytest
+from sqlglot import exp
 
+import sqlleaf
 from sqlleaf.exception import SqlLeafException
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 
 
-from tests.new_fixtures import holder, is_subset
+from tests.new_fixtures import COMMON_TABLES, holder, is_subset
 from sqlleaf.objects.query_types import InsertQuery, SequenceQuery
 
 DIALECT = "postgres"
@@ -260,3 +262,49 @@ def test__simple_sequence(holder):
     assert [SequenceQuery, InsertQuery] == list(map(type, h.queries))
     assert len(h.nodes) == 2
     assert len(h.edges) == 1
+
+
+def test__inheritance_index(tmp_path):
+    lineage = sqlleaf.Lineage()
+    lineage.generate(COMMON_TABLES, dialect=DIALECT)
+    assert lineage.object_mapping.inheritance == {}
+
+    ddl = """
+    CREATE TABLE fruit.stock (name VARCHAR, qty INT);
+    CREATE TABLE fruit.local_stock (farm VARCHAR) INHERITS (fruit.stock);
+    """
+    lineage.generate(ddl, dialect=DIALECT)
+    mapping = lineage.object_mapping
+    assert mapping.inheritance == {("fruit", "stock"): {("fruit", "local_stock"): frozenset({"name", "qty"})}}
+    assert [q.child_table.name for q in mapping.find_inheritors(["stock"], "qty")] == ["local_stock"]
+    assert mapping.find_inheritors(["stock", "fruit"], "farm") == []
+    assert mapping.find_inheritors(["raw", "fruit"], "name") == []
+
+    # The index is saved with the mapping
+    path = str(tmp_path / "mapping.pickle")
+    mapping.save(path)
+    loaded = sqlleaf.Lineage()
+    loaded.object_mapping = sqlleaf.mappings.ObjectMapping.load(path)
+    loaded.generate("INSERT INTO fruit.processed (name, age) SELECT name, qty FROM fruit.stock;", dialect=DIALECT)
+
+    edges = [(e.parent.friendly_name, e.child.friendly_name) for e in loaded.get_edges()]
+    assert ("column[fruit.local_stock.qty]", "column[fruit.processed.age]") in edges
+
+
+def test__column_indexes():
+    lineage = sqlleaf.Lineage()
+    lineage.generate(COMMON_TABLES + "INSERT INTO fruit.processed (name) SELECT name FROM fruit.raw;", dialect=DIALECT)
+    table = lineage.object_mapping.find_query(kind="table", table=exp.to_table("fruit.raw"))
+    names = [c.name for c in table.get_column_defs()]
+
+    assert table.get_column_def(names[1]) is table.get_column_defs()[1]
+    assert table.get_column_position(names[1]) == 1
+    assert table.get_column_def("ctid") is None
+    assert table.get_column_position("ctid", include_system=True) == len(names)
+
+    # The index follows the table's columns when they're replaced
+    table.column_defs = table.column_defs[1:]
+    assert table.get_column_def(names[0]) is None and table.get_column_position(names[1]) == 0
+
+    insert = lineage.get_queries()[-1]
+    assert insert.is_column_selected("name") and not insert.is_column_selected("age")
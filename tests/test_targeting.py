@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+
+import sqlleaf
+from tests.new_fixtures import COMMON_TABLES
+
+DIALECT = "postgres"
+
+
+def test__targeted_lineage():
+    sql = COMMON_TABLES + """
+    CREATE TABLE fruit.other (name VARCHAR);
+    INSERT INTO fruit.processed (name) SELECT name FROM raw;
+    CREATE VIEW fruit.ripe AS SELECT name FROM fruit.processed;
+    INSERT INTO fruit.other (name) SELECT name FROM fruit.raw;
+    """
+    lineage = sqlleaf.Lineage()
+    lineage.generate(sql, dialect=DIALECT, targets=["fruit.ripe"])
+
+    # Every statement is collected, but only the queries upstream of the target have lineage
+    assert len(lineage.get_queries()) == 6
+    assert sorted({e.child.friendly_name.split(".")[1] for e in lineage.get_edges()}) == ["processed", "ripe"]
+    assert lineage.stats["untargeted_queries"] == 1
+
+    lineage = sqlleaf.Lineage()
+    lineage.generate(sql, dialect=DIALECT, targets=["processed"], direction="downstream")
+    assert sorted({e.child.friendly_name.split(".")[1] for e in lineage.get_edges()}) == ["processed", "ripe"]
+
+    with pytest.raises(sqlleaf.exception.SqlLeafException):
+        sqlleaf.Lineage().generate(sql, dialect=DIALECT, targets=["fruit.ripe"], direction="sideways")
+
+    # The queries of a MERGE read its USING source
+    sql = COMMON_TABLES + """
+    CREATE TABLE fruit.mid (name VARCHAR);
+    CREATE TABLE fruit.dst (name VARCHAR);
+    INSERT INTO fruit.mid (name) SELECT name FROM fruit.raw;
+    MERGE INTO fruit.dst AS d USING fruit.mid AS m ON d.name = m.name
+    WHEN MATCHED THEN UPDATE SET name = m.name
+    WHEN NOT MATCHED THEN INSERT (name) VALUES (m.name);
+    """
+    untargeted = sqlleaf.Lineage()
+    untargeted.generate(sql, dialect=DIALECT)
+    targeted = sqlleaf.Lineage()
+    targeted.generate(sql, dialect=DIALECT, targets=["fruit.dst"])
+    assert [e.id for e in targeted.get_edges()] == [e.id for e in untargeted.get_edges()]
+    assert ("column[fruit.raw.name]", "column[fruit.mid.name]") in [(e.parent.friendly_name, e.child.friendly_name) for e in targeted.get_edges()]